@@ -0,0 +1,65 @@
+"""
+Benchmark clean_dataset (bounds checks and barcode deduplication) for linear scaling.
+
+Usage:
+    python benchmarks/bench_cleaning.py                       # 1M, 5M and 10M rows
+    python benchmarks/bench_cleaning.py --rows 1000000 20000000 --chunk-size 1000000
+
+Each table is cleaned in chunks sharing one BarcodeDeduplicator, as
+utils.dataset.iter_training_chunks does. About 10% of the barcodes repeat,
+half of them zero-padded, and about 1% of the rows are outside the physical
+bounds. The time per million rows should stay flat as the table grows.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from bench_labeling import make_frame
+from utils.preprocess import BarcodeDeduplicator, clean_dataset
+
+
+def make_products(n_rows: int, seed: int = 0):
+    """Synthetic products with repeated barcodes and implausible values."""
+    rng = np.random.default_rng(seed)
+    df = make_frame(n_rows, seed).astype(np.float32)
+    ids = np.arange(n_rows, dtype=np.int64) + 3_000_000_000_000
+    repeats = rng.random(n_rows) < 0.1
+    ids[repeats] = rng.integers(ids[0], ids[0] + n_rows, repeats.sum())
+    codes = ids.astype(str).astype(object)
+    padded = repeats & (rng.random(n_rows) < 0.5)
+    codes[padded] = '0' + codes[padded]
+    df['code'] = codes
+    df.loc[rng.random(n_rows) < 0.005, 'fat_100g'] = 150.0
+    df.loc[rng.random(n_rows) < 0.005, 'energy_100g'] = 2000.0
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dataset cleaning")
+    parser.add_argument("--rows", type=int, nargs="*", default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12s} {'time':>8s} {'s/M rows':>9s} {'kept':>12s}  removed by rule")
+    for n_rows in args.rows:
+        df = make_products(n_rows)
+        deduplicator = BarcodeDeduplicator()
+        report = {}
+        kept = 0
+        started = time.perf_counter()
+        for start in range(0, n_rows, args.chunk_size):
+            chunk = df.iloc[start:start + args.chunk_size]
+            kept += len(clean_dataset(chunk, deduplicator=deduplicator, report=report))
+        elapsed = time.perf_counter() - started
+        print(f"{n_rows:>12,d} {elapsed:>7.2f}s {elapsed / n_rows * 1e6:>9.2f} {kept:>12,d}  {report}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark vectorized health labeling against the original iterrows loop.
+
+Usage:
+    python benchmarks/bench_labeling.py                  # 1M and 10M rows
+    python benchmarks/bench_labeling.py --rows 100000
+    python benchmarks/bench_labeling.py --legacy-max-rows 10000000   # time the loop on every size
+
+The row-by-row loop takes minutes at these sizes, so by default it is timed
+on at most --legacy-max-rows rows and extrapolated linearly beyond that.
+Both implementations are checked to produce identical labels on the rows
+the loop labeled.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from utils.preprocess import create_health_label
+
+
+def create_health_label_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    """The original row-by-row implementation, kept as the reference."""
+    df = df.copy()
+    health_labels = []
+    for idx, row in df.iterrows():
+        sugar = row.get('sugars_100g', 0)
+        fat = row.get('fat_100g', 0)
+        salt = row.get('salt_100g', 0)
+        is_unhealthy = sugar >= 10.0 or fat >= 10.0 or salt >= 1.0
+        is_healthy = sugar < 5.0 and fat < 3.0 and salt < 0.3
+        if is_unhealthy:
+            health_labels.append('Unhealthy')
+        elif is_healthy:
+            health_labels.append('Healthy')
+        else:
+            health_labels.append('Moderate')
+    df['health_label'] = health_labels
+    return df
+
+
+def make_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic nutrition table with a few missing values."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'energy_100g': rng.uniform(0, 900, n_rows),
+        'fat_100g': rng.exponential(6, n_rows),
+        'sugars_100g': rng.exponential(8, n_rows),
+        'salt_100g': rng.exponential(0.6, n_rows),
+        'fiber_100g': rng.exponential(2, n_rows),
+        'proteins_100g': rng.exponential(6, n_rows)
+    })
+    df.loc[rng.random(n_rows) < 0.01, 'salt_100g'] = np.nan
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark health labeling")
+    parser.add_argument("--rows", type=int, nargs="*", default=[1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=200_000,
+                        help="Largest size the iterrows loop is actually run on")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12s} {'vectorized':>12s} {'iterrows':>14s} {'speedup':>10s}")
+    for n_rows in args.rows:
+        df = make_frame(n_rows)
+
+        started = time.perf_counter()
+        labeled = create_health_label(df)
+        vectorized = time.perf_counter() - started
+
+        legacy_rows = min(n_rows, args.legacy_max_rows)
+        started = time.perf_counter()
+        reference = create_health_label_iterrows(df.iloc[:legacy_rows])
+        legacy = (time.perf_counter() - started) * n_rows / legacy_rows
+        assert (reference['health_label'].values == labeled['health_label'].values[:legacy_rows]).all()
+
+        estimated = "~" if legacy_rows < n_rows else " "
+        print(f"{n_rows:>12,d} {vectorized:>11.2f}s {estimated}{legacy:>12.1f}s {legacy / vectorized:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
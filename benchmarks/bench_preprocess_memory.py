@@ -0,0 +1,91 @@
+"""
+Benchmark peak memory of the preprocessing steps against the original copying versions.
+
+Usage:
+    python benchmarks/bench_preprocess_memory.py                # 5M rows
+    python benchmarks/bench_preprocess_memory.py --rows 20000000
+
+Runs clean -> label -> extract features on a float64 nutrition table, the
+way train_model.py does, and reports the peak RSS above the input table of
+each step. The original versions copied the whole frame at every step. The
+current ones keep float32 columns, share unchanged columns, and label into a
+one-byte categorical. Needs Linux (/proc/self/clear_refs) for per-step peaks.
+
+Labels match the original ones except for the rare row whose float64 value
+lies within float32 rounding of a threshold (about 1 in 20M here); those are
+labeled from the float32 value the model is trained on.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from bench_labeling import make_frame
+from utils.preprocess import (
+    FEATURE_ORDER,
+    clean_dataset,
+    create_health_label,
+    extract_features,
+    health_label_codes
+)
+from utils.process_memory import read_memory, read_peak_rss, reset_peak_rss
+
+
+def legacy_pipeline(df: pd.DataFrame):
+    """The original copying steps, kept as the reference."""
+    df_clean = df.loc[df[FEATURE_ORDER].dropna().index].copy()
+    df_labeled = df_clean.copy()
+    df_labeled['health_label'] = np.array(['Healthy', 'Moderate', 'Unhealthy'], dtype=object)[
+        health_label_codes(df_labeled)
+    ]
+    return df_labeled[FEATURE_ORDER].copy(), df_labeled['health_label']
+
+
+def lean_pipeline(df: pd.DataFrame):
+    """The current steps, as used by train_model.prepare_dataset and split_dataset."""
+    df = clean_dataset(df, inplace=True)
+    df = create_health_label(df, inplace=True, categorical=True)
+    return extract_features(df, copy=False), df['health_label']
+
+
+def measure(pipeline, n_rows: int):
+    """Run pipeline on a fresh table; return (seconds, peak MB above the input, result MB, labels)."""
+    df = make_frame(n_rows)
+    gc.collect()
+    baseline = read_memory()["rss_kb"]
+    reset_peak_rss()
+    started = time.perf_counter()
+    X, labels = pipeline(df)
+    elapsed = time.perf_counter() - started
+    peak = read_peak_rss()
+    result_mb = (X.memory_usage(index=False).sum() + labels.memory_usage(index=False)) / 2 ** 20
+    return elapsed, (peak - baseline) / 1024, result_mb, np.asarray(labels)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing peak memory")
+    parser.add_argument("--rows", type=int, nargs="*", default=[5_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>12s} {'input MB':>9s} {'version':>8s} {'time':>8s} {'peak MB':>9s} {'result MB':>10s}")
+    for n_rows in args.rows:
+        input_mb = n_rows * len(FEATURE_ORDER) * 8 / 2 ** 20
+        results = {}
+        for name, pipeline in (("legacy", legacy_pipeline), ("lean", lean_pipeline)):
+            elapsed, peak_mb, result_mb, results[name] = measure(pipeline, n_rows)
+            print(f"{n_rows:>12,d} {input_mb:>9.0f} {name:>8s} {elapsed:>7.2f}s {peak_mb:>9.0f} {result_mb:>10.0f}")
+            gc.collect()
+        mismatches = int((results["legacy"] != results["lean"]).sum())
+        print(f"{'':>12s} labels differing at float32 rounding: {mismatches}")
+        assert mismatches <= n_rows // 1_000_000 + 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Micro-benchmarks for ScanLabel AI hot paths.
+
+Times prediction, ingredient analysis, preprocessing, product extraction and
+response serialization, writes the results as JSON and compares them with a
+stored baseline. Timings are also normalized by a fixed calibration workload
+so a baseline recorded on one machine stays meaningful on another. The
+calibration runs before and after every benchmark, and medians are compared,
+so a momentary slowdown of the machine shifts both sides alike.
+
+Usage:
+    python benchmarks/run_benchmarks.py                     # run and compare with baseline.json
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --update-baseline   # record a new baseline
+    python benchmarks/run_benchmarks.py --quick             # shorter run (CI smoke test)
+
+Exit status is 1 if any benchmark regressed past its tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Allowed slowdown versus the baseline (normalized time) before a benchmark counts as regressed
+DEFAULT_TOLERANCE = 0.5
+
+# Benchmarks with a median under this many microseconds are dominated by timer and scheduler jitter
+NOISE_FLOOR_US = 20.0
+# Benchmarks whose timing swings with allocator and GC state (many short-lived objects)
+NOISY_BENCHMARKS = ("serialize_scan_response",)
+# Tolerance recorded in the baseline for benchmarks under the noise floor or in NOISY_BENCHMARKS
+NOISY_TOLERANCE = 1.0
+
+SAMPLE_PRODUCT = {
+    "status": 1,
+    "product": {
+        "product_name": "Chocolate Hazelnut Spread",
+        "brands": "Test Brand",
+        "ingredients_text": (
+            "Sugar, palm oil, hazelnuts (13%), skimmed milk powder (8.7%), fat-reduced cocoa (7.4%), "
+            "emulsifier: lecithins (soya), vanillin"
+        ),
+        "nutriments": {
+            "energy-kcal_100g": 539.0,
+            "fat_100g": 30.9,
+            "sugars_100g": 56.3,
+            "salt_100g": 0.107,
+            "fiber_100g": 0.0,
+            "proteins_100g": 6.3
+        }
+    }
+}
+
+# A long ingredient list (~20k characters), as seen on some composite products
+LONG_INGREDIENTS = ", ".join(
+    f"{name} ({i % 17}%)" for i, name in enumerate(
+        ["wheat flour", "sugar", "glucose-fructose syrup", "palm oil", "E621", "aspartame",
+         "skimmed milk powder", "soy lecithin", "sodium benzoate", "E150d", "dextrose", "maltodextrin",
+         "hazelnuts", "egg powder", "salt", "natural flavouring", "tartrazine", "water"] * 70
+    )
+)
+
+
+def calibrate(min_time: float = 0.2) -> float:
+    """Median time of a fixed mixed Python/numpy workload (microseconds) used to normalize results."""
+    data = np.arange(2000, dtype=np.float64)
+    words = ["sugar", "salt", "fat"] * 200
+
+    def workload():
+        total = 0.0
+        for word in words:
+            total += len(word.upper())
+        return total + float(np.sqrt(data).sum())
+
+    return _time(workload, min_time=min_time)[1]
+
+
+def _time(fn: Callable, min_time: float = 0.2, repeat: int = 5) -> Tuple[float, float]:
+    """
+    Time fn like timeit: pick a loop count that runs for about min_time,
+    repeat, and return (best, median) microseconds per call.
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / 5 or number >= 1_000_000:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / 5 / elapsed))
+    runs = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return min(runs), statistics.median(runs)
+
+
+def build_benchmarks() -> List[Tuple[str, Callable]]:
+    """Create the benchmark callables (all inputs prepared up front)."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from config import settings
+    from models.schemas import Nutrients, ScanResponse
+    from utils.allergen_detector import analyze_ingredients
+    from utils.data_fetch import extract_product_info
+    from utils.predict import load_model, predict_health, predict_health_batch
+    from utils.preprocess import preprocess_api_data
+    from utils.scoring import scorer
+
+    model = load_model(os.path.join(ROOT, settings.MODEL_PATH), fast=True)
+    if model is None:
+        raise SystemExit(f"No model at {settings.MODEL_PATH}; run train_model.py first")
+
+    nutrition = preprocess_api_data(SAMPLE_PRODUCT)
+    batch = np.random.default_rng(0).uniform(0, 60, size=(1000, 6))
+    short_ingredients = SAMPLE_PRODUCT["product"]["ingredients_text"]
+
+    def serialize_response():
+        scores = scorer.score(nutrition)
+        response = ScanResponse(
+            product_name="Chocolate Hazelnut Spread",
+            brand="Test Brand",
+            barcode="3017620422003",
+            health_prediction="Unhealthy",
+            nutrients=Nutrients(**{k: round(v, 2) for k, v in nutrition.items()}),
+            detected_allergens=["Milk", "Nuts", "Soy"],
+            detected_additives=[],
+            detected_sugar_indicators=["Sugar"],
+            message=scorer.message(scores, "Unhealthy", ["Milk", "Nuts", "Soy", "Sugar"])
+        ).model_dump()
+        response["nutrition_score"] = scores["score"]
+        response["daily_values"] = scores["daily_values"]
+        response["health_insights"] = scorer.insights(scores)
+        return JSONResponse(content=jsonable_encoder(response)).body
+
+    return [
+        ("predict_health_single", lambda: predict_health(nutrition, model)),
+        ("predict_health_batch_1000", lambda: predict_health_batch(batch, model)),
+        ("analyze_ingredients_short", lambda: analyze_ingredients(short_ingredients)),
+        ("analyze_ingredients_long", lambda: analyze_ingredients(LONG_INGREDIENTS)),
+        ("preprocess_api_data", lambda: preprocess_api_data(SAMPLE_PRODUCT)),
+        ("extract_product_info", lambda: extract_product_info(SAMPLE_PRODUCT)),
+        ("score_nutrition", lambda: scorer.score(nutrition)),
+        ("serialize_scan_response", serialize_response),
+    ]
+
+
+def benchmark_tolerance(name: str, median_us: float) -> Optional[float]:
+    """Tolerance to record for a benchmark, or None for the default."""
+    if median_us < NOISE_FLOOR_US or name in NOISY_BENCHMARKS:
+        return NOISY_TOLERANCE
+    return None
+
+
+def run(quick: bool = False, only: Optional[List[str]] = None) -> Dict:
+    """
+    Run the benchmarks.
+
+    Args:
+        quick: Use shorter timing runs
+        only: Names of benchmarks to run (default: all)
+
+    Returns:
+        Results dictionary (environment, calibration and per-benchmark timings)
+    """
+    min_time = 0.05 if quick else 0.2
+    # Calibrations interleaved with the benchmarks; their median normalizes all of them
+    calibrations = [calibrate(min_time)]
+    timings = {}
+    for name, fn in build_benchmarks():
+        if only and name not in only:
+            continue
+        fn()  # warm up caches and lazy imports
+        timings[name] = _time(fn, min_time=min_time)
+        calibrations.append(calibrate(min_time))
+    calibration = statistics.median(calibrations)
+
+    results = {}
+    for name, (best, median) in timings.items():
+        results[name] = {
+            "best_us": round(best, 3),
+            "median_us": round(median, 3),
+            "normalized": round(median / calibration, 5)
+        }
+        tolerance = benchmark_tolerance(name, median)
+        if tolerance is not None:
+            results[name]["tolerance"] = tolerance
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "system": platform.system()
+        },
+        "calibration_us": round(calibration, 3),
+        "results": results
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Compare normalized timings with a baseline.
+
+    A benchmark regresses when its normalized time exceeds the baseline by
+    more than its tolerance (the baseline entry's 'tolerance', or the default).
+
+    Returns:
+        One entry per benchmark present in both, with 'name', 'ratio' and 'regressed'
+    """
+    report = []
+    for name, base in baseline.get("results", {}).items():
+        current = results.get("results", {}).get(name)
+        if current is None:
+            continue
+        allowed = base.get("tolerance", tolerance)
+        ratio = current["normalized"] / base["normalized"] if base["normalized"] else 1.0
+        report.append({"name": name, "ratio": round(ratio, 3), "tolerance": allowed, "regressed": ratio > 1.0 + allowed})
+    return report
+
+
+def main() -> int:
+    """Parse arguments, run, write results and check for regressions."""
+    parser = argparse.ArgumentParser(description="Run ScanLabel AI micro-benchmarks")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown (0.5 = 50%%)")
+    parser.add_argument("--quick", action="store_true", help="Shorter timing runs")
+    parser.add_argument("--only", nargs="*", help="Run only these benchmarks")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    results = run(quick=args.quick, only=args.only)
+
+    for name, r in results["results"].items():
+        print(f"{name:28s} best {r['best_us']:>12.2f} us   median {r['median_us']:>12.2f} us")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    report = compare(results, baseline, args.tolerance)
+    regressions = [entry for entry in report if entry["regressed"]]
+    for entry in report:
+        status = "REGRESSED" if entry["regressed"] else "ok"
+        print(f"{entry['name']:28s} {entry['ratio']:6.2f}x baseline  {status}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed past tolerance")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
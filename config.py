@@ -22,13 +22,53 @@ class Settings(BaseSettings):
     PORT: int = Field(default=8000)
     DEBUG: bool = Field(default=False)
     RELOAD: bool = Field(default=False)
+    # Worker processes for serve.py (forked after the model is preloaded)
+    WEB_CONCURRENCY: int = Field(default=1)
+    # Seconds between per-worker memory reports from serve.py (0 disables)
+    MEMORY_REPORT_INTERVAL: float = Field(default=300.0)
     
     # Model Settings
     MODEL_PATH: str = Field(default="model.pkl")
+    # Extra models the registry may load (*.pkl files and *.forest artifacts); the newest one wins
+    MODEL_DIR: str = Field(default="saved_models")
+    # Seconds between checks for a new model file (0 disables hot reload)
+    MODEL_WATCH_INTERVAL: float = Field(default=10.0)
+    # Previously active model versions kept in memory for rollback
+    MODEL_HISTORY_SIZE: int = Field(default=3)
+    # Load the model on the first prediction instead of at startup (serve.py always preloads)
+    MODEL_LAZY_LOAD: bool = Field(default=True)
+    # Token required by /admin endpoints (unset disables them)
+    ADMIN_TOKEN: Optional[str] = Field(default=None)
+    # Serve predictions from a flattened, verified copy of the forest
+    MODEL_FAST_INFERENCE: bool = Field(default=True)
+    # Micro-batching of concurrent predictions (window 0 disables batching)
+    INFERENCE_BATCH_WINDOW_MS: float = Field(default=1.0)
+    INFERENCE_MAX_BATCH_SIZE: int = Field(default=64)
+    # Memoized predictions, keyed by split-threshold intervals (0 disables)
+    PREDICTION_CACHE_SIZE: int = Field(default=4096)
+    # Resolve products clearly inside the threshold rules without the model
+    RULE_FAST_PATH_ENABLED: bool = Field(default=True)
+    # Relative distance from a threshold at which the rules count as decisive
+    RULE_FAST_PATH_MARGIN: float = Field(default=0.1)
+    # Share of rule-decided products also run through the model to track agreement
+    RULE_AGREEMENT_SAMPLE_RATE: float = Field(default=0.01)
+    # Candidate model evaluated in the background on a sample of live scans (unset disables)
+    SHADOW_MODEL_PATH: Optional[str] = Field(default=None)
+    # Share of model predictions also sent to the shadow model
+    SHADOW_SAMPLE_RATE: float = Field(default=0.1)
+    # Samples waiting for the shadow model; further samples are dropped
+    SHADOW_QUEUE_SIZE: int = Field(default=1000)
     
     # Open Food Facts API Settings
     OFF_API_BASE_URL: str = Field(default="https://world.openfoodfacts.org/api/v0")
     OFF_API_TIMEOUT: int = Field(default=10)
+    # Successful product lookups are cached in-process (seconds / entries)
+    OFF_CACHE_TTL: int = Field(default=3600)
+    OFF_CACHE_SIZE: int = Field(default=2048)
+    
+    # WebSocket Scan Session Settings
+    # Codes remembered per /ws/scan session for duplicate suppression
+    WS_SCAN_SESSION_MAX_CODES: int = Field(default=500)
     
     # Spoonacular API Settings (for food image recognition - fallback)
     SPOONACULAR_API_KEY: Optional[str] = Field(default=None)
@@ -47,6 +87,30 @@ class Settings(BaseSettings):
     OPENROUTER_MODEL: str = Field(default="google/gemini-2.0-flash-exp:free")
     OPENROUTER_TIMEOUT: int = Field(default=30)
 
+    # Admission Control Settings
+    # Concurrent requests per endpoint class, and how many more may wait for a slot
+    ADMISSION_SCAN_CONCURRENCY: int = Field(default=32)
+    ADMISSION_SCAN_QUEUE: int = Field(default=64)
+    ADMISSION_IMAGE_CONCURRENCY: int = Field(default=4)
+    ADMISSION_IMAGE_QUEUE: int = Field(default=8)
+    ADMISSION_AI_CONCURRENCY: int = Field(default=4)
+    ADMISSION_AI_QUEUE: int = Field(default=8)
+    ADMISSION_QUEUE_TIMEOUT: float = Field(default=5.0)
+    ADMISSION_RETRY_AFTER: int = Field(default=5)
+
+    # Background Job Settings (async /recommend-alternatives)
+    JOBS_MAX_WORKERS: int = Field(default=4)
+    JOBS_MAX_PENDING: int = Field(default=64)
+    # Seconds a finished job's result stays pollable
+    JOBS_RESULT_TTL: int = Field(default=600)
+    # Longest long-poll wait accepted by GET /jobs/{job_id}
+    JOBS_MAX_WAIT: float = Field(default=25.0)
+    # SQLite file shared by all worker processes so any worker can answer a job poll
+    # (unset keeps jobs in process memory, which only works with a single worker)
+    JOBS_STORE_PATH: Optional[str] = Field(default="jobs.sqlite3")
+    # Directory for runtime state files; a relative JOBS_STORE_PATH is resolved against it
+    DATA_DIR: str = Field(default="data")
+
     # Logging Settings
     LOG_LEVEL: str = Field(default="INFO")
     LOG_FORMAT: str = Field(default="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -56,6 +120,51 @@ class Settings(BaseSettings):
     TRAINING_RANDOM_STATE: int = Field(default=42)
     TRAINING_N_ESTIMATORS: int = Field(default=100)
     TRAINING_MAX_DEPTH: int = Field(default=10)
+    # Local OFF CSV/TSV export or JSONL(.gz) dump to train on (unset: synthetic sample data)
+    TRAINING_DATA_PATH: Optional[str] = Field(default=None)
+    # Rows read per chunk when streaming the export
+    TRAINING_CHUNK_SIZE: int = Field(default=100_000)
+    # Stop reading the export after this many rows (unset reads all of it)
+    TRAINING_MAX_ROWS: Optional[int] = Field(default=None)
+    # Train on a class-balanced sample of this many rows drawn from the whole export (unset keeps all rows)
+    TRAINING_SAMPLE_SIZE: Optional[int] = Field(default=None)
+    # Worker processes parsing a JSONL dump (0 parses in the training process)
+    TRAINING_PARSE_WORKERS: int = Field(default=0)
+    # Reuse the cleaned, labeled table from an earlier run when source and thresholds are unchanged
+    TRAINING_DATASET_CACHE: bool = Field(default=True)
+    TRAINING_CACHE_DIR: str = Field(default="dataset_cache")
+    # Cached tables kept in TRAINING_CACHE_DIR; the least recently used beyond this are deleted
+    TRAINING_CACHE_KEEP: int = Field(default=3)
+    # Replace the trained forest with the smallest compressed candidate that passes the accuracy gate
+    TRAINING_COMPRESS: bool = Field(default=False)
+    # Share of the training split held out to choose the compressed candidate (the test split stays untouched)
+    TRAINING_COMPRESSION_VALIDATION_SIZE: float = Field(default=0.2)
+    # Maximum validation accuracy drop accepted for a compressed model
+    TRAINING_COMPRESSION_TOLERANCE: float = Field(default=0.005)
+    # Search forest parameters (successive halving across worker processes) before training
+    TRAINING_SEARCH: bool = Field(default=False)
+    # Configurations sampled from the search grid
+    TRAINING_SEARCH_CANDIDATES: int = Field(default=24)
+    # Worker processes for the search (0: one per CPU)
+    TRAINING_SEARCH_WORKERS: int = Field(default=0)
+    # Validation accuracy given up per millisecond of single-row inference latency
+    TRAINING_SEARCH_LATENCY_WEIGHT: float = Field(default=0.01)
+    TRAINING_SEARCH_REPORT: str = Field(default="search_report.json")
+    # Record wall time, CPU time and peak memory per training stage and write a JSON report
+    TRAINING_PROFILE: bool = Field(default=False)
+    TRAINING_PROFILE_REPORT: str = Field(default="training_profile.json")
+    # Also dump cProfile stats of the whole run to this file (unset: no cProfile)
+    TRAINING_PROFILE_CPROFILE: Optional[str] = Field(default=None)
+    # Also record the tracemalloc peak of Python allocations (slows training down)
+    TRAINING_PROFILE_TRACEMALLOC: bool = Field(default=False)
+    # JSONL file the API appends scanned products to for incremental training (unset disables)
+    SCAN_SAMPLES_PATH: Optional[str] = Field(default=None)
+    # Incremental updates: trees added per update, forest size cap (oldest trees dropped),
+    # newest scanned samples used and replayed rows of the original training data
+    INCREMENTAL_NEW_TREES: int = Field(default=10)
+    INCREMENTAL_MAX_TREES: int = Field(default=100)
+    INCREMENTAL_WINDOW_SIZE: int = Field(default=50_000)
+    INCREMENTAL_REPLAY_SIZE: int = Field(default=20_000)
     
     # Health Classification Thresholds
     SUGAR_HEALTHY_THRESHOLD: float = Field(default=5.0)
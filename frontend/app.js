@@ -40,6 +40,11 @@ let scanConfidence = 0;
 let scanAttempts = 0;
 const MAX_SCAN_ATTEMPTS = 10;
 
+// Continuous camera scanning session (one WebSocket for all detected codes)
+const WS_SCAN_URL = API_BASE_URL.replace(/^http/, 'ws') + '/ws/scan';
+let scanSocket = null;
+let lastSentCode = null;
+
 // Initialize ZXing (modern, accurate barcode reader)
 let codeReader = null;
 try {
@@ -198,9 +203,13 @@ async function startCamera() {
         startCameraBtn.classList.add('hidden');
         stopCameraBtn.classList.remove('hidden');
 
+        // Open (or reuse) the scan session so detected codes skip per-request HTTP overhead
+        openScanSocket();
+
         // Start scanning
         scanning = true;
         lastScannedCode = null;
+        lastSentCode = null;
         scanConfidence = 0;
         scanAttempts = 0;
 
@@ -235,6 +244,52 @@ async function startCamera() {
 
 // ZXing scanner handles everything automatically via decodeFromVideoDevice
 
+// Open the scan session WebSocket, reusing it if already connected
+function openScanSocket() {
+    if (!('WebSocket' in window)) return null;
+    if (scanSocket && (scanSocket.readyState === WebSocket.OPEN || scanSocket.readyState === WebSocket.CONNECTING)) {
+        return scanSocket;
+    }
+
+    try {
+        scanSocket = new WebSocket(WS_SCAN_URL);
+    } catch (error) {
+        console.log('Scan WebSocket unavailable, using HTTP:', error);
+        scanSocket = null;
+        return null;
+    }
+
+    scanSocket.onopen = () => console.log('Scan session connected:', WS_SCAN_URL);
+    scanSocket.onmessage = (event) => handleScanSocketMessage(JSON.parse(event.data));
+    scanSocket.onclose = () => {
+        console.log('Scan session closed');
+        scanSocket = null;
+    };
+    scanSocket.onerror = (error) => console.log('Scan session error:', error);
+    return scanSocket;
+}
+
+// Send a detected barcode over the scan session; returns false if the session is not open
+function sendBarcodeOverSocket(code) {
+    if (!scanSocket || scanSocket.readyState !== WebSocket.OPEN) return false;
+    scanSocket.send(JSON.stringify({ barcode: code }));
+    return true;
+}
+
+// Handle results streamed back from the scan session
+function handleScanSocketMessage(message) {
+    if (message.type === 'result') {
+        hideLoading();
+        hideAll();
+        barcodeInput.value = message.barcode;
+        displayResult(message.data);
+    } else if (message.type === 'error') {
+        hideLoading();
+        showError(`Error: ${message.detail}`);
+    }
+    // 'duplicate': the server already answered this code in this session
+}
+
 // Validate EAN-13 checksum (professional-grade validation)
 function validateEAN13Checksum(code) {
     if (code.length !== 13) return false;
@@ -321,6 +376,14 @@ function handleBarcodeDetected(code, codeResult) {
     // Check if same code detected multiple times (confidence check)
     if (lastScannedCode === code) {
         scanConfidence++;
+        // Continuous mode: stream each confirmed code over the scan session and keep the camera running
+        if (scanConfidence >= requiredConfidence && scanSocket && scanSocket.readyState === WebSocket.OPEN) {
+            if (code !== lastSentCode && sendBarcodeOverSocket(code)) {
+                lastSentCode = code;
+                showLoading();
+            }
+            return;
+        }
         if (scanConfidence >= requiredConfidence) {
             stopCamera();
             barcodeInput.value = code;
@@ -969,7 +1032,8 @@ async function getHealthierAlternatives() {
     try {
         console.log('Requesting alternatives for:', currentProductData.product_name);
 
-        const response = await fetch(`${API_BASE_URL}/recommend-alternatives`, {
+        // Submit as a background job so no server worker is held while the AI generates
+        const response = await fetch(`${API_BASE_URL}/recommend-alternatives?mode=async`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -985,7 +1049,12 @@ async function getHealthierAlternatives() {
             throw new Error(errorData.detail || 'Failed to get alternatives');
         }
 
-        const data = await response.json();
+        const job = await response.json();
+        let data = await waitForJob(job.job_id);
+        if (data === null) {
+            // The job record was not found (e.g. expired); ask again synchronously
+            data = await fetchAlternativesSync();
+        }
         console.log('Received alternatives:', data.source, '- Count:', data.alternatives?.length);
         displayAlternatives(data);
 
@@ -1008,6 +1077,47 @@ async function getHealthierAlternatives() {
     }
 }
 
+// Synchronous alternatives request, used when a background job cannot be followed
+async function fetchAlternativesSync() {
+    const response = await fetch(`${API_BASE_URL}/recommend-alternatives`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Cache-Control': 'no-cache, no-store, must-revalidate',
+            'Pragma': 'no-cache'
+        },
+        body: JSON.stringify(currentProductData),
+        cache: 'no-store'
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.detail || 'Failed to get alternatives');
+    }
+    return data;
+}
+
+// Long-poll a background job until it finishes; returns its result,
+// or null if the server does not know the job (404)
+async function waitForJob(jobId) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/jobs/${jobId}?wait=20`, { cache: 'no-store' });
+        if (response.status === 404) {
+            return null;
+        }
+        const job = await response.json();
+
+        if (!response.ok) {
+            throw new Error(job.detail || 'Failed to get alternatives');
+        }
+        if (job.status === 'succeeded') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error((job.error && job.error.detail) || 'Failed to get alternatives');
+        }
+    }
+}
+
 function displayAlternatives(data) {
     const alternativesResults = document.getElementById('alternativesResults');
     const alternativesSource = document.getElementById('alternativesSource');
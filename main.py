@@ -2,23 +2,45 @@
 FastAPI backend for ScanLabel AI - Food health analysis system.
 """
 
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Request
+import time
+
+# Cold-start timing: module imports, startup hook, and time since process start
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Header, Query, UploadFile, File, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from collections import OrderedDict
 from typing import Optional
+import json
 import os
+import secrets
 
 from config import settings
 from utils.logger import logger
-from utils.data_fetch import fetch_product_by_barcode, extract_product_info
+from utils.data_fetch import fetch_product_by_barcode, extract_product_info, is_product_cached, product_cache
 from utils.preprocess import preprocess_api_data
-from utils.predict import load_model, predict_health
+from utils.model_registry import registry
 from utils.allergen_detector import analyze_ingredients
 from utils.food_recognition import get_food_info_from_image, get_fallback_nutrition
 from utils.openrouter_client import get_alternative_with_fallback
+from utils.scoring import scorer
+from utils.admission import limiters
+from utils.jobs import jobs
+from utils.batching import batcher
+from utils.prediction_cache import prediction_cache
+from utils.rule_fast_path import LABEL_SOURCE_MODEL, LABEL_SOURCE_RULES, rule_fast_path
+from utils.shadow import shadow
+from utils.scan_samples import scan_samples
+from utils.process_memory import process_age, read_memory
+from utils.exceptions import ModelLoadError, OverloadedError
+from utils.fast_forest import ARTIFACT_SUFFIX
 from models.schemas import ScanResponse
 
+cold_start = {"import_ms": round((time.perf_counter() - _import_started) * 1000, 1)}
+
 def safe_print(text, **kwargs):
     """Print text handling unicode encoding errors."""
     try:
@@ -131,6 +153,23 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         status_code=exc.status_code,
         content={"detail": exc.detail},
         headers={
+            **(exc.headers or {}),
+            "Access-Control-Allow-Origin": origin if origin != "*" else "*",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, HEAD",
+            "Access-Control-Allow-Headers": "*",
+        }
+    )
+
+# Load shedding: requests over the admission limits fail fast with 503
+@app.exception_handler(OverloadedError)
+async def overloaded_exception_handler(request: Request, exc: OverloadedError):
+    """Return 503 with Retry-After and CORS headers for shed requests."""
+    origin = request.headers.get("origin", "*")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={
+            "Retry-After": str(exc.retry_after),
             "Access-Control-Allow-Origin": origin if origin != "*" else "*",
             "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, HEAD",
             "Access-Control-Allow-Headers": "*",
@@ -165,28 +204,39 @@ frontend_dir = os.path.join(os.path.dirname(__file__), "frontend")
 if os.path.exists(frontend_dir):
     app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
 
-# Load model at startup
-model = None
-
-
 @app.on_event("startup")
 async def startup_event():
-    """Load the trained model when the server starts."""
-    global model
-    try:
-        model_path = settings.MODEL_PATH
-        logger.info(f"Loading model from {model_path}")
-        model = load_model(model_path)
-        
-        if model is None:
-            logger.warning("Model not loaded. Please run train_model.py first.")
-        else:
-            logger.info("Model loaded successfully!")
-    except Exception as e:
-        logger.error(f"Error loading model: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        model = None
+    """Load (or defer loading) the trained model and watch for new versions."""
+    started = time.perf_counter()
+    if registry.current is not None:
+        # Preloaded by serve.py before forking; shared copy-on-write
+        logger.info(f"Using preloaded model {registry.version}")
+    elif registry.lazy:
+        logger.info("Model will be loaded on the first prediction (MODEL_LAZY_LOAD)")
+    else:
+        try:
+            logger.info(f"Loading model from {settings.MODEL_PATH}")
+            await run_in_threadpool(registry.reload)
+            logger.info(f"Model {registry.version} loaded successfully!")
+        except ModelLoadError as e:
+            logger.warning(f"Model not loaded ({e}). Please run train_model.py first.")
+    registry.start_watching()
+
+    cold_start["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    age = process_age()
+    if age is not None:
+        cold_start["ready_after_process_start_ms"] = round(age * 1000, 1)
+    current = registry.current
+    cold_start["model_load_ms"] = round(current.load_ms, 1) if current is not None else None
+    logger.info(f"Cold start: {cold_start}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background job pool and the model watcher, and write pending scan samples."""
+    jobs.shutdown()
+    registry.stop_watching()
+    scan_samples.flush()
 
 
 @app.get("/api")
@@ -198,8 +248,13 @@ async def api_info():
         "endpoints": {
             "/scan": "Scan a product by barcode",
             "/scan-image": "Scan food from image",
-            "/recommend-alternatives": "Get AI-powered healthier alternatives",
+            "/ws/scan": "Continuous barcode scanning session (WebSocket)",
+            "/recommend-alternatives": "Get AI-powered healthier alternatives (?mode=async for a background job)",
+            "/jobs/{job_id}": "Poll a background job (?wait= for long polling)",
             "/health": "API health check",
+            "/metrics": "Runtime metrics (admission control, inference batching, caches)",
+            "/admin/models": "Model versions, hot reload and rollback (requires ADMIN_TOKEN)",
+            "/admin/models/shadow": "Shadow-evaluate a candidate model on live traffic (requires ADMIN_TOKEN)",
             "/docs": "API documentation"
         }
     }
@@ -237,6 +292,41 @@ async def scan_product(
     Returns:
         JSON response with product information and health analysis
     """
+    return await admit_barcode_scan(barcode)
+
+
+async def admit_barcode_scan(barcode: str) -> dict:
+    """
+    Run analyze_barcode under the 'scan' admission limit.
+    Products already in the product cache need no upstream call, so they
+    bypass admission control and are served even when the server is busy.
+    
+    Raises:
+        OverloadedError: If the scan class is at capacity
+    """
+    if barcode and barcode.strip() and is_product_cached(barcode):
+        return await run_in_threadpool(analyze_barcode, barcode)
+    
+    async with limiters['scan'].slot():
+        return await run_in_threadpool(analyze_barcode, barcode)
+
+
+def analyze_barcode(barcode: str) -> dict:
+    """
+    Fetch, score and analyze a product by barcode.
+    Shared by the /scan endpoint and /ws/scan sessions; blocking, so callers
+    run it in the threadpool.
+    
+    Args:
+        barcode: Product barcode to scan
+        
+    Returns:
+        Response dictionary with product information and health analysis
+        
+    Raises:
+        HTTPException: If the barcode is invalid, the product is not found
+            or the analysis fails
+    """
     try:
         # Validate barcode
         if not barcode or not barcode.strip():
@@ -303,12 +393,26 @@ async def scan_product(
         
         print("Nutrition data preprocessed", flush=True)
 
+        # Score nutrition once: rule label, score, daily values and insights
+        scores = scorer.score(nutrition_data)
+
+        # Keep the product for incremental training (SCAN_SAMPLES_PATH)
+        scan_samples.record(barcode, nutrition_data)
+
         # Predict health level
         print("Predicting health level...", flush=True)
         health_prediction = None
-        if model is not None:
+        label_source = None
+        model_version = None
+        current = registry.get()
+        if current is not None:
             try:
-                health_prediction = predict_health(nutrition_data, model)
+                health_prediction, label_source = batcher.predict_health_with_source(nutrition_data, current.model)
+                # Only labels the model produced are attributed to it
+                if label_source == LABEL_SOURCE_MODEL:
+                    model_version = current.version
+                if health_prediction is not None:
+                    shadow.submit(nutrition_data, health_prediction, model_version, label_source)
             except Exception as e:
                 logger.error(f"Error in predict_health: {e}")
                 print(f"WARNING: Model prediction failed: {e}", flush=True)
@@ -316,17 +420,8 @@ async def scan_product(
         # If model prediction fails, use rule-based fallback
         if health_prediction is None:
             print("Using rule-based fallback...", flush=True)
-            # Simple rule-based classification as fallback
-            sugar = nutrition_data.get('sugars_100g', 0)
-            fat = nutrition_data.get('fat_100g', 0)
-            salt = nutrition_data.get('salt_100g', 0)
-            
-            if sugar >= 10 or fat >= 10 or salt >= 1:
-                health_prediction = "Unhealthy"
-            elif sugar < 5 and fat < 3 and salt < 0.3:
-                health_prediction = "Healthy"
-            else:
-                health_prediction = "Moderate"
+            health_prediction = scores['label']
+            label_source = LABEL_SOURCE_RULES
         
         print(f"Health prediction: {health_prediction}", flush=True)
 
@@ -342,12 +437,9 @@ async def scan_product(
             ingredient_analysis['sugar_indicators']
         )
         
-        # Generate health message
-        message = generate_health_message(health_prediction, nutrition_data, detected_items)
-        
-        # Calculate nutrition score and daily values
-        nutrition_score_data = calculate_nutrition_score(nutrition_data)
-        health_insights = generate_health_insights(nutrition_data, health_prediction)
+        # Generate health message and insights from the scoring result
+        message = scorer.message(scores, health_prediction, detected_items)
+        health_insights = scorer.insights(scores)
         
         # Build response using Pydantic models
         from models.schemas import Nutrients
@@ -396,13 +488,15 @@ async def scan_product(
                 'detected_sugar_indicators': response.detected_sugar_indicators,
                 'message': response.message,
             }
-        response_dict['nutrition_score'] = nutrition_score_data['score']
-        response_dict['daily_values'] = nutrition_score_data['daily_values']
+        response_dict['nutrition_score'] = scores['score']
+        response_dict['daily_values'] = scores['daily_values']
         response_dict['health_insights'] = health_insights
+        response_dict['model_version'] = model_version
+        response_dict['label_source'] = label_source
         
         safe_print(f"\nSUCCESS! Product analyzed: {product_info.get('product_name', 'Unknown')}", flush=True)
         print(f"   Health: {health_prediction}", flush=True)
-        print(f"   Score: {nutrition_score_data['score']}/100", flush=True)
+        print(f"   Score: {scores['score']}/100", flush=True)
         print("=" * 60 + "\n", flush=True)
         logger.info(f"Successfully analyzed product: {product_info.get('product_name', 'Unknown')}")
         return response_dict
@@ -413,7 +507,7 @@ async def scan_product(
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
-        print(f"\nERROR in scan_product: {e}", flush=True)
+        print(f"\nERROR in analyze_barcode: {e}", flush=True)
         print(f"Traceback:\n{error_trace}", flush=True)
         logger.error(f"Error processing barcode scan: {e}")
         logger.error(f"Traceback: {error_trace}")
@@ -423,154 +517,148 @@ async def scan_product(
         )
 
 
-def calculate_nutrition_score(nutrition_data: dict) -> dict:
-    """Calculate nutrition score and daily value percentages."""
-    # Daily recommended values (for adults)
-    DAILY_ENERGY = 2000  # kcal
-    DAILY_SUGAR = 50  # g
-    DAILY_FAT = 70  # g
-    DAILY_SALT = 6  # g
-    DAILY_FIBER = 30  # g
-    DAILY_PROTEIN = 50  # g
-    
-    energy = nutrition_data.get('energy_100g', 0)
-    sugar = nutrition_data.get('sugars_100g', 0)
-    fat = nutrition_data.get('fat_100g', 0)
-    salt = nutrition_data.get('salt_100g', 0)
-    fiber = nutrition_data.get('fiber_100g', 0)
-    protein = nutrition_data.get('proteins_100g', 0)
-    
-    # Calculate daily value percentages
-    dv = {
-        'energy': min(100, (energy / DAILY_ENERGY) * 100),
-        'sugar': min(100, (sugar / DAILY_SUGAR) * 100),
-        'fat': min(100, (fat / DAILY_FAT) * 100),
-        'salt': min(100, (salt / DAILY_SALT) * 100),
-        'fiber': min(100, (fiber / DAILY_FIBER) * 100),
-        'protein': min(100, (protein / DAILY_PROTEIN) * 100)
-    }
-    
-    # Calculate health score (0-100)
-    score = 100
-    score -= min(30, dv['sugar'] * 0.3)  # Penalize high sugar
-    score -= min(25, dv['fat'] * 0.25)    # Penalize high fat
-    score -= min(25, dv['salt'] * 0.25)  # Penalize high salt
-    score += min(10, dv['fiber'] * 0.1)  # Reward fiber
-    score += min(10, dv['protein'] * 0.1)  # Reward protein
-    
-    score = max(0, min(100, score))
-    
-    return {
-        'score': round(score, 1),
-        'daily_values': dv,
-        'warnings': []
-    }
-
-def generate_health_insights(nutrition_data: dict, health_prediction: str) -> list:
-    """Generate detailed health insights."""
-    insights = []
-    sugar = nutrition_data.get('sugars_100g', 0)
-    fat = nutrition_data.get('fat_100g', 0)
-    salt = nutrition_data.get('salt_100g', 0)
-    fiber = nutrition_data.get('fiber_100g', 0)
-    protein = nutrition_data.get('proteins_100g', 0)
-    
-    # Sugar insights
-    if sugar >= 22.5:
-        insights.append({"type": "warning", "text": f"Very high sugar ({sugar:.1f}g) - exceeds daily limit in small portions"})
-    elif sugar >= 10:
-        insights.append({"type": "caution", "text": f"High sugar content ({sugar:.1f}g) - consume in moderation"})
-    elif sugar < 5:
-        insights.append({"type": "positive", "text": f"Low sugar content ({sugar:.1f}g) - good choice"})
-    
-    # Fat insights
-    if fat >= 17.5:
-        insights.append({"type": "warning", "text": f"Very high fat ({fat:.1f}g) - limit consumption"})
-    elif fat >= 10:
-        insights.append({"type": "caution", "text": f"High fat content ({fat:.1f}g)"})
-    elif fat < 3:
-        insights.append({"type": "positive", "text": f"Low fat content ({fat:.1f}g)"})
-    
-    # Salt insights
-    if salt >= 1.5:
-        insights.append({"type": "warning", "text": f"Very high salt ({salt:.2f}g) - may increase blood pressure"})
-    elif salt >= 1:
-        insights.append({"type": "caution", "text": f"High salt content ({salt:.2f}g)"})
-    elif salt < 0.3:
-        insights.append({"type": "positive", "text": f"Low salt content ({salt:.2f}g)"})
-    
-    # Fiber insights
-    if fiber >= 6:
-        insights.append({"type": "positive", "text": f"High fiber ({fiber:.1f}g) - supports digestion"})
-    elif fiber < 3:
-        insights.append({"type": "info", "text": f"Low fiber ({fiber:.1f}g) - consider adding fiber-rich foods"})
-    
-    # Protein insights
-    if protein >= 10:
-        insights.append({"type": "positive", "text": f"Good protein content ({protein:.1f}g) - supports muscle health"})
-    elif protein < 3:
-        insights.append({"type": "info", "text": f"Low protein ({protein:.1f}g)"})
-    
-    return insights
-
-def generate_health_message(
-    health_prediction: str,
-    nutrition_data: dict,
-    detected_items: list
-) -> str:
+@app.websocket("/ws/scan")
+async def scan_websocket(websocket: WebSocket):
     """
-    Generate a human-readable health message based on prediction and analysis.
+    Continuous barcode scanning session over a single WebSocket.
     
-    Args:
-        health_prediction: Predicted health level
-        nutrition_data: Nutrition values
-        detected_items: List of detected allergens/additives
-        
-    Returns:
-        Health message string
+    The client sends barcodes as text, either raw ("5449000000996") or as
+    JSON ({"barcode": "5449000000996", "force": false}). For every new code
+    the server replies with {"type": "result", "barcode", "data"} or
+    {"type": "error", "barcode", "status_code", "detail"}. Codes already
+    answered in this session are not analyzed again; the server replies
+    {"type": "duplicate", "barcode"} unless "force" is set. Server-side
+    failures (5xx) are not remembered, so resending the code retries it.
     """
-    sugar = nutrition_data.get('sugars_100g', 0)
-    fat = nutrition_data.get('fat_100g', 0)
-    salt = nutrition_data.get('salt_100g', 0)
-    
-    messages = []
-    
-    if health_prediction == "Healthy":
-        messages.append("This product appears to be a healthy choice.")
-    elif health_prediction == "Moderate":
-        messages.append("This product has moderate nutritional value — consume in moderation.")
-    else:
-        messages.append("This product has high levels of sugar, fat, or salt — consume occasionally.")
-    
-    # Add specific warnings
-    if sugar >= 10:
-        messages.append(f"High sugar content ({sugar:.1f}g per 100g).")
-    if fat >= 10:
-        messages.append(f"High fat content ({fat:.1f}g per 100g).")
-    if salt >= 1:
-        messages.append(f"High salt content ({salt:.1f}g per 100g).")
-    
-    if detected_items:
-        messages.append(f"Contains: {', '.join(detected_items[:5])}.")
+    await websocket.accept()
+    # Barcodes answered in this session, oldest first
+    seen = OrderedDict()
+    logger.info("Scan WebSocket session opened")
     
-    return " ".join(messages)
+    try:
+        while True:
+            message = await websocket.receive_text()
+            
+            force = False
+            try:
+                payload = json.loads(message)
+            except ValueError:
+                payload = message
+            if isinstance(payload, dict):
+                barcode = str(payload.get('barcode') or '')
+                force = bool(payload.get('force', False))
+            else:
+                barcode = str(payload)
+            barcode = barcode.strip()
+            
+            if not barcode:
+                await websocket.send_json({
+                    "type": "error",
+                    "barcode": barcode,
+                    "status_code": 400,
+                    "detail": "Barcode is required"
+                })
+                continue
+            
+            if barcode in seen and not force:
+                seen.move_to_end(barcode)
+                await websocket.send_json({"type": "duplicate", "barcode": barcode})
+                continue
+            
+            try:
+                data = await admit_barcode_scan(barcode)
+                reply = {"type": "result", "barcode": barcode, "data": data}
+                remember = True
+            except HTTPException as e:
+                # Only deterministic client errors (bad or unknown barcode) are
+                # remembered; upstream failures may succeed when sent again
+                remember = 400 <= e.status_code < 500 and e.status_code not in (408, 429)
+                reply = {
+                    "type": "error",
+                    "barcode": barcode,
+                    "status_code": e.status_code,
+                    "detail": e.detail
+                }
+            except OverloadedError as e:
+                # Not remembered as seen, so the client may send the code again
+                await websocket.send_json({
+                    "type": "error",
+                    "barcode": barcode,
+                    "status_code": 503,
+                    "detail": str(e),
+                    "retry_after": e.retry_after
+                })
+                continue
+            
+            if remember:
+                seen[barcode] = True
+                seen.move_to_end(barcode)
+                while len(seen) > settings.WS_SCAN_SESSION_MAX_CODES:
+                    seen.popitem(last=False)
+            else:
+                seen.pop(barcode, None)
+            
+            await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        logger.info(f"Scan WebSocket session closed ({len(seen)} codes scanned)")
 
 
 @app.post("/recommend-alternatives")
-async def recommend_alternatives(request: Request):
+async def recommend_alternatives(
+    request: Request,
+    mode: str = Query("sync", pattern="^(sync|async)$", description="'sync' waits for the result, 'async' returns a job id immediately")
+):
     """
     Recommend healthier food alternatives for a scanned product.
     Uses AI (OpenRouter) to generate personalized, healthier options.
 
     Request body should contain product and nutrition data from a scan.
+    With mode=async the request is queued as a background job and answered
+    with 202 and a job id; poll GET /jobs/{job_id} or subscribe to
+    /ws/jobs/{job_id} for the result.
 
     Returns:
-        JSON response with 3-5 healthier alternative recommendations
+        JSON response with 3-5 healthier alternative recommendations,
+        or the queued job record in async mode
     """
     try:
         # Parse request body
         body = await request.json()
+    except Exception as e:
+        logger.error(f"Invalid alternatives request body: {e}")
+        raise HTTPException(status_code=400, detail="Request body must be valid JSON")
+
+    if mode == "async":
+        record = jobs.submit("alternatives", generate_alternatives, body)
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": record["job_id"],
+                "status": record["status"],
+                "status_url": f"/jobs/{record['job_id']}"
+            }
+        )
 
+    async with limiters['ai'].slot():
+        return await run_in_threadpool(generate_alternatives, body)
+
+
+def generate_alternatives(body: dict) -> dict:
+    """
+    Generate healthier alternatives for a scanned product.
+    Blocking (may wait on the LLM for up to OPENROUTER_TIMEOUT), so callers
+    run it in the threadpool or the background job pool.
+
+    Args:
+        body: Scan result (product, nutrients and detected items)
+
+    Returns:
+        Dictionary with alternatives and product metadata
+
+    Raises:
+        HTTPException: If alternatives could not be generated
+    """
+    try:
         # Extract required data
         product_name = body.get('product_name', 'Unknown Product')
         brand = body.get('brand', 'Unknown Brand')
@@ -635,7 +723,7 @@ async def recommend_alternatives(request: Request):
         error_trace = traceback.format_exc()
         logger.error(f"Error generating alternatives: {e}")
         logger.error(f"Traceback: {error_trace}")
-        print(f"\nERROR in recommend_alternatives: {e}", flush=True)
+        print(f"\nERROR in generate_alternatives: {e}", flush=True)
         print(f"Traceback:\n{error_trace}", flush=True)
         raise HTTPException(
             status_code=500,
@@ -643,6 +731,45 @@ async def recommend_alternatives(request: Request):
         )
 
 
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish before answering (long poll)")
+):
+    """
+    Get the status and result of a background job.
+
+    Args:
+        job_id: Job id returned on submission
+        wait: Optional long-poll time, capped at JOBS_MAX_WAIT
+
+    Returns:
+        Job record with status ('queued', 'running', 'succeeded', 'failed'),
+        result and error
+    """
+    record = await jobs.wait(job_id, min(wait, settings.JOBS_MAX_WAIT))
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return record
+
+
+@app.websocket("/ws/jobs/{job_id}")
+async def job_websocket(websocket: WebSocket, job_id: str):
+    """
+    Push a background job's record to the client once it finishes, then close.
+    Sends {"status": "not_found"} for unknown or expired jobs.
+    """
+    await websocket.accept()
+    try:
+        record = jobs.get(job_id)
+        while record is not None and record["status"] in ("queued", "running"):
+            record = await jobs.wait(job_id, settings.JOBS_MAX_WAIT)
+        await websocket.send_json(record if record is not None else {"job_id": job_id, "status": "not_found"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
 @app.options("/scan-image")
 async def scan_food_image_options(request: Request):
     """Handle CORS preflight for /scan-image"""
@@ -708,7 +835,8 @@ async def scan_food_image(file: UploadFile = File(...)):
         print(f"   Size: {len(image_data):,} bytes", flush=True)
         logger.info(f"Processing food image (size: {len(image_data)} bytes)")
         print(f"   Calling Google Vision API...", flush=True)
-        food_info = get_food_info_from_image(image_data)
+        async with limiters['image'].slot():
+            food_info = await run_in_threadpool(get_food_info_from_image, image_data)
 
         if food_info:
             safe_print(f"Food recognized: {food_info.get('food_name', 'Unknown')}", flush=True)
@@ -757,31 +885,32 @@ async def scan_food_image(file: UploadFile = File(...)):
                     detail=f"Recognized '{food_name}' but nutrition information is not available. Please try a different food item or scan a barcode."
                 )
         
+        # Score nutrition once: rule label, score, daily values and insights
+        scores = scorer.score(nutrition_data)
+        
         # Predict health level using ML model
         health_prediction = None
-        if model is not None:
-            health_prediction = predict_health(nutrition_data, model)
+        label_source = None
+        model_version = None
+        current = await run_in_threadpool(registry.get)
+        if current is not None:
+            health_prediction, label_source = await run_in_threadpool(
+                batcher.predict_health_with_source, nutrition_data, current.model
+            )
+            if label_source == LABEL_SOURCE_MODEL:
+                model_version = current.version
+            if health_prediction is not None:
+                shadow.submit(nutrition_data, health_prediction, model_version, label_source)
         
         # Fallback if model fails
         if health_prediction is None:
-            sugar = nutrition_data.get('sugars_100g', 0)
-            fat = nutrition_data.get('fat_100g', 0)
-            salt = nutrition_data.get('salt_100g', 0)
-            
-            if sugar >= 10 or fat >= 10 or salt >= 1:
-                health_prediction = "Unhealthy"
-            elif sugar < 5 and fat < 3 and salt < 0.3:
-                health_prediction = "Healthy"
-            else:
-                health_prediction = "Moderate"
-        
-        # Calculate nutrition score and insights
-        nutrition_score_data = calculate_nutrition_score(nutrition_data)
-        health_insights = generate_health_insights(nutrition_data, health_prediction)
+            health_prediction = scores['label']
+            label_source = LABEL_SOURCE_RULES
         
-        # Generate health message
+        # Generate health message and insights
+        health_insights = scorer.insights(scores)
         detected_items = []
-        message = generate_health_message(health_prediction, nutrition_data, detected_items)
+        message = scorer.message(scores, health_prediction, detected_items)
         
         # Build response
         from models.schemas import Nutrients
@@ -803,20 +932,22 @@ async def scan_food_image(file: UploadFile = File(...)):
             'detected_additives': [],
             'detected_sugar_indicators': [],
             'message': message,
-            'nutrition_score': nutrition_score_data['score'],
-            'daily_values': nutrition_score_data['daily_values'],
+            'nutrition_score': scores['score'],
+            'daily_values': scores['daily_values'],
             'health_insights': health_insights,
+            'model_version': model_version,
+            'label_source': label_source,
             'source': 'image_recognition'
         }
         
         safe_print(f"\nSUCCESS! Food analyzed: {food_name}", flush=True)
         print(f"   Health: {health_prediction}", flush=True)
-        print(f"   Score: {nutrition_score_data['score']}/100", flush=True)
+        print(f"   Score: {scores['score']}/100", flush=True)
         print("=" * 60 + "\n", flush=True)
         logger.info(f"Successfully analyzed food from image: {food_name}")
         return response_dict
         
-    except HTTPException:
+    except (HTTPException, OverloadedError):
         raise
     except Exception as e:
         import traceback
@@ -837,8 +968,10 @@ async def health_check():
     try:
         print("Health check called", flush=True)
         health_data = {
-            "status": "healthy" if model is not None else "unhealthy",
-            "model_loaded": model is not None,
+            # A lazy registry is healthy before its first prediction if it has a model to load
+            "status": "healthy" if registry.current is not None or (registry.lazy and registry.sources()) else "unhealthy",
+            "model_loaded": registry.current is not None,
+            "model_version": registry.version,
             "version": settings.API_VERSION
         }
         print(f"Health check response: {health_data}", flush=True)
@@ -857,6 +990,131 @@ async def health_check():
         }
 
 
+def require_admin(token: Optional[str]) -> None:
+    """Reject admin calls unless ADMIN_TOKEN is configured and matches."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not token or not secrets.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def model_file_path(file: str) -> str:
+    """Path of a .pkl model or .forest artifact named inside MODEL_DIR."""
+    if os.path.basename(file) != file or not file.endswith((".pkl", ARTIFACT_SUFFIX)):
+        raise HTTPException(status_code=400, detail=f"file must be a .pkl or {ARTIFACT_SUFFIX} name inside MODEL_DIR")
+    path = os.path.join(settings.MODEL_DIR, file)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Model file {file} not found")
+    return path
+
+
+@app.get("/admin/models")
+async def list_models(x_admin_token: Optional[str] = Header(None)):
+    """Active model version, versions kept for rollback and reload counters."""
+    require_admin(x_admin_token)
+    return registry.stats()
+
+
+@app.post("/admin/models/reload")
+async def reload_model(
+    file: Optional[str] = Query(None, description="Model .pkl or .forest name inside MODEL_DIR (default: newest source)"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Load, validate and activate a model, and pin it for every worker.
+
+    Loading runs in a worker thread; requests keep using the current
+    version until the new one is swapped in. Other workers switch on their
+    next watcher check (MODEL_WATCH_INTERVAL).
+    """
+    require_admin(x_admin_token)
+    path = model_file_path(file) if file else None
+    try:
+        activated = await run_in_threadpool(registry.reload, path, True)
+    except ModelLoadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"status": "activated", **activated.describe()}
+
+
+@app.post("/admin/models/rollback")
+async def rollback_model(
+    version: Optional[str] = Query(None, description="Version to restore (default: previous)"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Reactivate a previously active model version kept in memory, and pin it for every worker."""
+    require_admin(x_admin_token)
+    try:
+        activated = registry.rollback(version, pin=True)
+    except ModelLoadError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "activated", **activated.describe()}
+
+
+@app.get("/admin/models/shadow")
+async def shadow_status(x_admin_token: Optional[str] = Header(None)):
+    """Shadow candidate and its disagreement with the live model."""
+    require_admin(x_admin_token)
+    return shadow.stats()
+
+
+@app.post("/admin/models/shadow")
+async def set_shadow_model(
+    file: str = Query(..., description="Model .pkl or .forest name inside MODEL_DIR"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Load a candidate model and evaluate it in the background on a sample of
+    live predictions. Responses keep coming from the active model.
+    """
+    require_admin(x_admin_token)
+    path = model_file_path(file)
+    try:
+        candidate = await run_in_threadpool(shadow.set_candidate, path)
+    except ModelLoadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"status": "shadowing", **candidate.describe()}
+
+
+@app.delete("/admin/models/shadow")
+async def clear_shadow_model(x_admin_token: Optional[str] = Header(None)):
+    """Stop shadow evaluation."""
+    require_admin(x_admin_token)
+    shadow.clear()
+    return {"status": "stopped"}
+
+
+@app.post("/admin/models/shadow/promote")
+async def promote_shadow_model(x_admin_token: Optional[str] = Header(None)):
+    """Activate the shadow candidate as the serving model (pinned for every worker) and stop shadowing it."""
+    require_admin(x_admin_token)
+    candidate = shadow.candidate
+    if candidate is None:
+        raise HTTPException(status_code=409, detail="No shadow model to promote")
+    activated = registry.activate(candidate, pin=True)
+    shadow.clear()
+    return {"status": "activated", **activated.describe()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics: admission control, background jobs, inference batching, rule fast path, model versions, shadow evaluation, scan sample collection, process memory and cache statistics."""
+    return {
+        "admission": {name: limiter.stats() for name, limiter in limiters.items()},
+        "jobs": jobs.stats(),
+        "inference": batcher.stats(),
+        "rules": rule_fast_path.stats(),
+        "model": registry.stats(),
+        "shadow": shadow.stats(),
+        "scan_samples": scan_samples.stats(),
+        "cold_start": cold_start,
+        "process": {"pid": os.getpid(), **read_memory()},
+        "caches": {
+            "products": product_cache.stats(),
+            "predictions": prediction_cache.stats()
+        }
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", settings.PORT))
@@ -0,0 +1,177 @@
+"""
+Multi-process server for ScanLabel AI.
+
+Loads the model and static tables once in the parent process, freezes the
+GC heap, then forks worker processes that share those pages copy-on-write
+and accept connections on one shared listening socket.
+
+Usage:
+    python serve.py                      # WEB_CONCURRENCY workers (default 1)
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Keep the GC from touching (and so un-sharing) preloaded objects before fork
+gc.disable()
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+from config import settings
+from utils.logger import logger
+from utils.process_memory import read_memory
+
+
+def preload():
+    """
+    Import the app and load the model and static tables in this process.
+
+    Returns:
+        The FastAPI app, with the model registry already loaded
+    """
+    import main
+    from utils.exceptions import ModelLoadError
+
+    logger.info(f"Preloading model from {settings.MODEL_PATH}")
+    try:
+        main.registry.reload()
+    except ModelLoadError as e:
+        logger.warning(f"Model not loaded ({e}). Please run train_model.py first.")
+
+    # Move everything allocated so far into the permanent generation,
+    # so collections in the workers never write to these shared pages
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preload complete, {gc.get_freeze_count()} objects frozen")
+    return main.app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, host: str, port: int) -> None:
+    """Serve the app on the shared socket until told to stop."""
+    gc.enable()
+    config = uvicorn.Config(app, host=host, port=port, log_level=settings.LOG_LEVEL.lower())
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn_worker(app, sock: socket.socket, host: str, port: int) -> int:
+    """Fork one worker process and return its pid."""
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            run_worker(app, sock, host, port)
+        finally:
+            os._exit(0)
+    logger.info(f"Started worker {pid}")
+    return pid
+
+
+def log_memory_report(workers) -> None:
+    """Log resident, proportional and unique memory of the parent and each worker."""
+    parent = read_memory("self")
+    if not parent:
+        logger.info("Memory report unavailable (no /proc)")
+        return
+
+    logger.info(f"Memory parent {os.getpid()}: rss={parent['rss_kb']}kB pss={parent['pss_kb']}kB uss={parent['uss_kb']}kB")
+    total_uss = 0
+    for pid in sorted(workers):
+        mem = read_memory(pid)
+        if not mem:
+            continue
+        total_uss += mem['uss_kb']
+        logger.info(
+            f"Memory worker {pid}: rss={mem['rss_kb']}kB pss={mem['pss_kb']}kB "
+            f"uss={mem['uss_kb']}kB shared={mem['shared_kb']}kB"
+        )
+    if workers:
+        logger.info(f"Average private memory per worker: {total_uss // len(workers)}kB")
+
+
+def serve(workers: int, host: str, port: int, report_interval: float) -> None:
+    """Preload, fork workers and supervise them (restarting any that die)."""
+    app = preload()
+    sock = bind_socket(host, port)
+    logger.info(f"Listening on {host}:{port} with {workers} worker(s)")
+
+    if workers <= 1:
+        run_worker(app, sock, host, port)
+        return
+
+    children = {spawn_worker(app, sock, host, port) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + min(5.0, report_interval) if report_interval > 0 else None
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+
+        if pid:
+            children.discard(pid)
+            if not stopping:
+                logger.warning(f"Worker {pid} exited with status {status}, restarting")
+                children.add(spawn_worker(app, sock, host, port))
+            continue
+
+        if next_report is not None and time.monotonic() >= next_report:
+            log_memory_report(children)
+            next_report = time.monotonic() + report_interval
+        time.sleep(0.5)
+
+    logger.info("All workers stopped")
+
+
+def main():
+    """Parse arguments and start the server."""
+    parser = argparse.ArgumentParser(description="Run ScanLabel AI with preloaded, forked workers")
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="Number of worker processes")
+    parser.add_argument("--host", default=settings.HOST, help="Bind host")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", settings.PORT)), help="Bind port")
+    parser.add_argument(
+        "--memory-report-interval",
+        type=float,
+        default=settings.MEMORY_REPORT_INTERVAL,
+        help="Seconds between per-worker memory reports (0 disables)"
+    )
+    args = parser.parse_args()
+
+    serve(args.workers, args.host, args.port, args.memory_report_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -71,6 +71,25 @@ def unhealthy_nutrition_data():
     }
 
 
+@pytest.fixture(scope="session")
+def training_frame():
+    """Labeled synthetic training data, as produced by train_model.py."""
+    from train_model import download_dataset
+    from utils.preprocess import clean_dataset, create_health_label
+    return create_health_label(clean_dataset(download_dataset()))
+
+
+@pytest.fixture(scope="session")
+def trained_model(training_frame):
+    """Small RandomForestClassifier trained on the synthetic training data."""
+    from sklearn.ensemble import RandomForestClassifier
+    from utils.preprocess import extract_features
+
+    model = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=42)
+    model.fit(extract_features(training_frame).values, training_frame['health_label'].values)
+    return model
+
+
 
 
 
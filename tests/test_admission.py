@@ -0,0 +1,74 @@
+"""
+Tests for admission control and load shedding.
+"""
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import main
+from utils.admission import ConcurrencyLimiter
+from utils.exceptions import OverloadedError
+
+
+def make_limiter(max_concurrent=1, max_queued=1, queue_timeout=1.0):
+    return ConcurrencyLimiter(
+        "test",
+        max_concurrent=max_concurrent,
+        max_queued=max_queued,
+        queue_timeout=queue_timeout,
+        retry_after=7
+    )
+
+
+def test_limiter_queues_then_rejects():
+    """Test that requests wait in the bounded queue and overflow is rejected."""
+    async def scenario():
+        limiter = make_limiter()
+        await limiter.acquire()
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        with pytest.raises(OverloadedError) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.retry_after == 7
+
+        # Releasing hands the slot to the queued request
+        limiter.release()
+        await waiter
+        assert limiter.active == 1
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats['active'] == 0
+    assert stats['admitted'] == 2
+    assert stats['rejected'] == 1
+
+
+def test_limiter_queue_timeout():
+    """Test that queued requests give up after the queue timeout."""
+    async def scenario():
+        limiter = make_limiter(queue_timeout=0.01)
+        async with limiter.slot():
+            with pytest.raises(OverloadedError):
+                await limiter.acquire()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats['timed_out'] == 1
+    assert stats['active'] == 0
+    assert stats['queued'] == 0
+
+
+def test_scan_sheds_load_with_retry_after(monkeypatch):
+    """Test that a saturated scan class returns 503 with Retry-After."""
+    monkeypatch.setitem(main.limiters, 'scan', make_limiter(max_concurrent=0, max_queued=0))
+
+    client = TestClient(main.app)
+    response = client.get("/scan?barcode=1234567890123")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert client.get("/metrics").json()["admission"]["scan"]["rejected"] == 1
@@ -4,6 +4,7 @@ Integration tests for FastAPI endpoints.
 
 import pytest
 from fastapi.testclient import TestClient
+import main
 from main import app
 
 
@@ -58,9 +59,57 @@ def test_scan_endpoint_missing_barcode(client):
     assert response.status_code == 422  # Validation error
 
 
+def test_ws_scan_session(client, monkeypatch, sample_product_data):
+    """Test streaming barcodes over a scan WebSocket session."""
+    calls = []
 
+    def fake_fetch(barcode):
+        calls.append(barcode)
+        return sample_product_data if barcode == "5449000000996" else None
 
+    monkeypatch.setattr(main, "fetch_product_by_barcode", fake_fetch)
 
+    with client.websocket_connect("/ws/scan") as ws:
+        ws.send_text('{"barcode": "5449000000996"}')
+        result = ws.receive_json()
+        assert result["type"] == "result"
+        assert result["data"]["product_name"] == "Test Product"
+        assert result["data"]["health_prediction"] in ["Healthy", "Moderate", "Unhealthy"]
 
+        # Duplicates within the session are answered without a new lookup
+        ws.send_text("5449000000996")
+        assert ws.receive_json() == {"type": "duplicate", "barcode": "5449000000996"}
 
+        ws.send_text("0000000000000")
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert error["status_code"] == 404
 
+    assert calls == ["5449000000996", "0000000000000"]
+
+
+def test_ws_scan_retries_server_errors(client, monkeypatch, sample_product_data):
+    """Test that a code which failed with a 5xx is looked up again when resent."""
+    calls = []
+
+    def flaky_fetch(barcode):
+        calls.append(barcode)
+        if len(calls) == 1:
+            raise RuntimeError("upstream unavailable")
+        return sample_product_data
+
+    monkeypatch.setattr(main, "fetch_product_by_barcode", flaky_fetch)
+
+    with client.websocket_connect("/ws/scan") as ws:
+        ws.send_text("5449000000996")
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert error["status_code"] >= 500
+
+        ws.send_text("5449000000996")
+        assert ws.receive_json()["type"] == "result"
+
+        ws.send_text("5449000000996")
+        assert ws.receive_json() == {"type": "duplicate", "barcode": "5449000000996"}
+
+    assert calls == ["5449000000996", "5449000000996"]
@@ -0,0 +1,54 @@
+"""
+Tests for micro-batched inference.
+"""
+
+import threading
+from utils.batching import MicroBatcher
+from utils.predict import predict_health
+
+
+def test_concurrent_predictions_are_batched(trained_model, healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test that concurrent callers share batches and each get their own label."""
+    batcher = MicroBatcher(window=0.05, max_batch_size=8)
+    rows = [healthy_nutrition_data, unhealthy_nutrition_data] * 8
+    results = [None] * len(rows)
+    start = threading.Barrier(len(rows))
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.predict_health(rows[i], trained_model)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(rows))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [predict_health(row, trained_model) for row in rows]
+    stats = batcher.stats()
+    assert stats["requests"] == len(rows)
+    assert stats["batches"] < len(rows)
+    assert stats["max_batch_seen"] <= 8
+
+
+def test_batching_disabled_predicts_inline(trained_model, healthy_nutrition_data):
+    """Test that a zero window predicts without the batching thread."""
+    batcher = MicroBatcher(window=0, max_batch_size=8)
+
+    assert batcher.predict_health(healthy_nutrition_data, trained_model) == 'Healthy'
+    assert batcher._thread is None
+    assert batcher.stats()["batches"] == 1
+
+
+def test_batch_failure_returns_none(healthy_nutrition_data):
+    """Test that a failing model makes every waiting caller fall back."""
+    class BrokenModel:
+        classes_ = None
+
+        def predict(self, X):
+            raise RuntimeError("broken")
+
+    batcher = MicroBatcher(window=0.01, max_batch_size=4)
+
+    assert batcher.predict_health(healthy_nutrition_data, BrokenModel()) is None
+    assert batcher.stats()["failed"] == 1
@@ -0,0 +1,55 @@
+"""
+Tests for the micro-benchmark runner (mechanics only, no timing assertions).
+"""
+
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import run_benchmarks
+
+
+def test_compare_flags_regressions():
+    """Test that only benchmarks slower than their tolerance are flagged."""
+    baseline = {"results": {
+        "fast": {"normalized": 1.0},
+        "strict": {"normalized": 1.0, "tolerance": 0.1},
+        "removed": {"normalized": 1.0}
+    }}
+    results = {"results": {"fast": {"normalized": 1.4}, "strict": {"normalized": 1.2}, "new": {"normalized": 9.0}}}
+
+    report = {entry["name"]: entry for entry in run_benchmarks.compare(results, baseline, tolerance=0.5)}
+
+    assert set(report) == {"fast", "strict"}
+    assert not report["fast"]["regressed"]
+    assert report["strict"]["regressed"]
+
+
+@pytest.mark.slow
+def test_quick_run_produces_results():
+    """Test that a quick run times every requested benchmark and is JSON serializable."""
+    results = run_benchmarks.run(quick=True, only=["preprocess_api_data", "extract_product_info"])
+
+    assert set(results["results"]) == {"preprocess_api_data", "extract_product_info"}
+    assert results["calibration_us"] > 0
+    assert all(r["best_us"] > 0 and r["normalized"] > 0 for r in results["results"].values())
+    json.dumps(results)
+
+
+def test_baseline_covers_all_benchmarks():
+    """Test that the committed baseline has an entry for every benchmark."""
+    with open(run_benchmarks.BASELINE_PATH) as f:
+        baseline = json.load(f)
+
+    names = {name for name, _ in run_benchmarks.build_benchmarks()}
+    assert names == set(baseline["results"])
+
+
+def test_noisy_benchmarks_get_a_wider_tolerance():
+    """Test that sub-20 us and serialization benchmarks are recorded with the noisy tolerance."""
+    assert run_benchmarks.benchmark_tolerance("score_nutrition", 8.0) == run_benchmarks.NOISY_TOLERANCE
+    assert run_benchmarks.benchmark_tolerance("serialize_scan_response", 150.0) == run_benchmarks.NOISY_TOLERANCE
+    assert run_benchmarks.benchmark_tolerance("analyze_ingredients_long", 40_000.0) is None
@@ -0,0 +1,55 @@
+"""
+Tests for post-training model compression.
+"""
+
+from sklearn.model_selection import train_test_split
+from train_model import split_dataset, split_validation
+from utils.compression import compress_forest, distill_tree, prune_trees
+from utils.preprocess import extract_features
+
+
+def _split(training_frame):
+    X = extract_features(training_frame).values
+    y = training_frame['health_label'].values
+    return train_test_split(X, y, test_size=0.2, random_state=0)
+
+
+def test_prune_and_distill(trained_model, training_frame):
+    """Test the pruned and distilled candidates are valid smaller forests."""
+    X_train, X_test, _, _ = _split(training_frame)
+
+    pruned = prune_trees(trained_model, 5)
+    student = distill_tree(trained_model, X_train, max_depth=6)
+
+    assert len(pruned.estimators_) == 5
+    assert len(trained_model.estimators_) == 20
+    assert len(student.estimators_) == 1
+    assert (student.predict(X_test) == trained_model.predict(X_test)).mean() > 0.95
+
+
+def test_compress_forest_respects_tolerance(trained_model, training_frame):
+    """Test that the chosen model passes the accuracy gate and is no larger."""
+    X_train, X_test, y_train, y_test = _split(training_frame)
+
+    best, report = compress_forest(
+        trained_model, X_train, y_train, X_test, y_test,
+        tolerance=0.01, tree_counts=(5,), depths=(6,)
+    )
+
+    full = report[0]
+    chosen = [entry for entry in report if entry.get("chosen")]
+    assert len(chosen) == 1
+    assert chosen[0]["accuracy"] >= full["accuracy"] - 0.01
+    assert chosen[0]["size_bytes"] <= full["size_bytes"]
+    assert {"size_bytes", "load_ms", "latency_us"} <= set(chosen[0])
+    assert len(best.estimators_) == chosen[0]["n_trees"]
+
+
+def test_validation_split_is_disjoint_from_test(training_frame):
+    """Test that the compression validation set comes from the training split only."""
+    X_train, X_test, y_train, _ = split_dataset(training_frame, 0.2, 0)
+    X_fit, X_val, _, _ = split_validation(X_train, y_train, 0.25, 0)
+
+    assert X_val.index.intersection(X_test.index).empty
+    assert X_val.index.intersection(X_fit.index).empty
+    assert len(X_fit) + len(X_val) == len(X_train)
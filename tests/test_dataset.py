@@ -0,0 +1,140 @@
+"""
+Tests for streaming training data ingestion.
+"""
+
+import gzip
+import json
+import numpy as np
+import pandas as pd
+from utils.dataset import (
+    FEATURE_DTYPE,
+    iter_jsonl_products,
+    iter_training_chunks,
+    load_training_data,
+    read_csv_chunks,
+    read_jsonl_batches
+)
+from utils.scoring import FEATURE_ORDER
+
+OFF_HEADER = [
+    'code', 'product_name', 'energy-kcal_100g', 'energy_100g', 'fat_100g', 'sugars_100g',
+    'salt_100g', 'fiber_100g', 'proteins_100g', 'unused_column'
+]
+OFF_ROWS = [
+    ['0001', 'Water "still"', '0', '0', '0', '0', '0.01', '0', '0', 'x'],
+    ['0002', 'Spread', '539', '2255', '30.9', '56.3', '0.107', '0', '6.3', 'x'],
+    ['0003', 'Only kJ', '', '418.4', '1', '2', '0.1', '3', '5', 'x'],
+    ['0004', 'Missing fat', '100', '418', '', '2', '0.1', '3', '5', 'x'],
+    ['0005', 'Soup', '40', '167', '4', '6', '0.5', '1', '2', 'x']
+]
+
+
+def write_export(path, sep):
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in [OFF_HEADER] + OFF_ROWS:
+            f.write(sep.join(row) + '\n')
+    return str(path)
+
+
+def test_read_only_needed_columns(tmp_path):
+    """Test that only the needed columns are read, with compact dtypes, in bounded chunks."""
+    path = write_export(tmp_path / "products.csv", '\t')
+
+    chunks = list(read_csv_chunks(path, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert 'product_name' not in chunks[0].columns and 'unused_column' not in chunks[0].columns
+    assert chunks[0]['fat_100g'].dtype == FEATURE_DTYPE
+    assert chunks[0]['code'].iloc[0] == '0001'
+
+
+def test_chunks_are_cleaned_and_labeled(tmp_path):
+    """Test that each chunk is normalized, cleaned and labeled as it is read."""
+    path = write_export(tmp_path / "products.csv", ',')
+
+    chunks = list(iter_training_chunks(path, chunk_size=2))
+    df = load_training_data(path, chunk_size=2)
+
+    assert sum(len(chunk) for chunk in chunks) == len(df) == 4
+    assert list(df['code']) == ['0001', '0002', '0003', '0005']
+    assert list(df['health_label']) == ['Healthy', 'Unhealthy', 'Healthy', 'Moderate']
+    assert all(df[name].dtype == FEATURE_DTYPE for name in FEATURE_ORDER)
+    # kcal preferred, kJ converted when kcal is missing
+    assert df['energy_100g'].iloc[1] == np.float32(539)
+    assert np.isclose(df['energy_100g'].iloc[2], 100.0)
+
+
+def test_duplicates_and_implausible_rows_dropped_across_chunks(tmp_path):
+    """Test that a repeated barcode in a later chunk and impossible values are dropped."""
+    path = str(tmp_path / "products.csv")
+    rows = OFF_ROWS + [
+        ['002', 'Spread again', '539', '2255', '30.9', '56.3', '0.107', '0', '6.3', 'x'],
+        ['0006', 'Impossible', '100', '418', '130', '2', '0.1', '3', '5', 'x']
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in [OFF_HEADER] + rows:
+            f.write(','.join(row) + '\n')
+
+    df = load_training_data(path, chunk_size=2)
+    assert list(df['code']) == ['0001', '0002', '0003', '0005']
+
+
+def test_max_rows_and_empty_file(tmp_path):
+    """Test stopping early and loading an export without usable rows."""
+    path = write_export(tmp_path / "products.csv", '\t')
+    assert len(load_training_data(path, chunk_size=2, max_rows=2)) == 2
+
+    empty = tmp_path / "empty.csv"
+    empty.write_text(','.join(OFF_HEADER) + '\n')
+    df = load_training_data(str(empty))
+    assert len(df) == 0 and 'health_label' in df.columns
+
+
+def write_dump(path):
+    products = [
+        {"code": "0001", "nutriments": {"energy-kcal_100g": 20, "fat_100g": 0.5, "sugars_100g": 1, "salt_100g": 0.1,
+                                        "fiber_100g": 0, "proteins_100g": 1}},
+        {"code": "0002", "nutriments": {}},
+        {"code": "0003", "nutriments": {"energy-kj_100g": 2255, "fat_100g": 30.9, "sugars_100g": 56.3, "salt_100g": 0.2,
+                                        "fiber_100g": 3, "proteins_100g": 6}},
+        {"code": "0004", "nutriments": {"fat_100g": "n/a"}},
+        {"code": "0005", "nutriments": {"energy-kcal_100g": 50, "sugars_100g": 5}}
+    ]
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for i, product in enumerate(products):
+            f.write(json.dumps(product) + '\n')
+            if i == 0:
+                f.write('{not json\n')
+    return str(path)
+
+
+def test_jsonl_dump_is_streamed(tmp_path):
+    """Test reading a gzipped JSONL dump line by line into columnar batches."""
+    path = write_dump(tmp_path / "products.jsonl.gz")
+
+    assert [p["code"] for p in iter_jsonl_products(path)] == ['0001', '0002', '0003', '0004', '0005']
+    batches = list(read_jsonl_batches(path, batch_size=2))
+    df = load_training_data(path, chunk_size=2)
+    removed = {}
+    list(iter_training_chunks(path, chunk_size=2, report=removed))
+
+    # Same extraction as live scans (kJ converted, empty products skipped), but
+    # unreported nutrients stay NaN so cleaning drops them like empty CSV cells
+    assert sum(len(batch) for batch in batches) == 3
+    assert batches[0]['fat_100g'].dtype == FEATURE_DTYPE
+    assert np.isnan(batches[2]['fat_100g'].iloc[0])
+    assert removed['missing'] == 1
+    assert list(df['code']) == ['0001', '0003']
+    assert list(df['health_label']) == ['Healthy', 'Unhealthy']
+    assert np.isclose(df['energy_100g'].iloc[1], 2255 / 4.184)
+
+
+def test_jsonl_parsing_in_worker_processes(tmp_path):
+    """Test that parallel parsing yields the same batches in file order."""
+    path = write_dump(tmp_path / "products.jsonl.gz")
+
+    serial = pd.concat(read_jsonl_batches(path, batch_size=1))
+    parallel = pd.concat(read_jsonl_batches(path, batch_size=1, workers=2))
+
+    assert list(parallel['code']) == list(serial['code'])
+    assert np.array_equal(parallel['fiber_100g'].values, serial['fiber_100g'].values, equal_nan=True)
@@ -0,0 +1,135 @@
+"""
+Tests for the on-disk training table cache.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import train_model
+from config import Settings, settings
+from utils.dataset_cache import (
+    cached_dataset,
+    dataset_key,
+    dataset_path_for,
+    load_dataset,
+    save_dataset,
+    source_fingerprint
+)
+
+
+def labeled_frame():
+    return pd.DataFrame({
+        'code': ['0001', '0002', '0003'],
+        'energy_100g': [20.0, 539.0, 150.0],
+        'fat_100g': [0.5, 30.9, 4.0],
+        'sugars_100g': [1.0, 56.3, 6.0],
+        'salt_100g': [0.1, 0.1, 0.5],
+        'fiber_100g': [2.0, 0.0, 1.0],
+        'proteins_100g': [5.0, 6.3, 2.0],
+        'health_label': ['Healthy', 'Unhealthy', 'Moderate']
+    })
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    """Test saving and memory-mapping a labeled table."""
+    df = labeled_frame()
+    save_dataset(df, str(tmp_path / "entry"), key="k1")
+
+    loaded = load_dataset(str(tmp_path / "entry"), key="k1")
+
+    assert list(loaded['health_label']) == list(df['health_label'])
+    assert np.array_equal(loaded['sugars_100g'], df['sugars_100g'].astype(np.float32))
+    assert list(loaded['code']) == ['0001', '0002', '0003']
+    assert loaded['fat_100g'].dtype == np.float32
+    assert load_dataset(str(tmp_path / "entry"), key="other") is None
+    assert load_dataset(str(tmp_path / "missing")) is None
+
+
+def test_key_tracks_source_and_thresholds(tmp_path):
+    """Test that changing the source file or a threshold changes the key."""
+    source = tmp_path / "products.csv"
+    source.write_text("a\n1\n")
+    key = dataset_key(source_fingerprint(str(source)), max_rows=None)
+
+    assert dataset_key(source_fingerprint(str(source)), max_rows=None) == key
+    assert dataset_key(source_fingerprint(str(source)), max_rows=10) != key
+    assert dataset_key(source_fingerprint(str(source)), Settings(SUGAR_HEALTHY_THRESHOLD=4.0), max_rows=None) != key
+    source.write_text("a\n1\n2\n")
+    assert dataset_key(source_fingerprint(str(source)), max_rows=None) != key
+    assert source_fingerprint(None) != source_fingerprint(str(source))
+
+
+def test_cached_dataset_builds_once(tmp_path):
+    """Test that the table is built on a miss and reused on a hit."""
+    calls = []
+
+    def build():
+        calls.append(1)
+        return labeled_frame()
+
+    first = cached_dataset(build, str(tmp_path), key="abc")
+    second = cached_dataset(build, str(tmp_path), key="abc")
+
+    assert len(calls) == 1
+    assert list(first['health_label']) == list(second['health_label'])
+
+
+def test_only_recent_entries_are_kept(tmp_path):
+    """Test that the least recently used entries beyond keep are deleted."""
+    cache_dir = str(tmp_path)
+    for i, key in enumerate(["k1", "k2", "k3"]):
+        cached_dataset(labeled_frame, cache_dir, key=key)
+        os.utime(os.path.join(dataset_path_for(cache_dir, key), "meta.json"), (i, i))
+
+    # The hit makes k1 the most recently used, so k2 is the oldest
+    cached_dataset(labeled_frame, cache_dir, key="k1", keep=2)
+    assert os.path.exists(dataset_path_for(cache_dir, "k1"))
+    assert not os.path.exists(dataset_path_for(cache_dir, "k2"))
+    assert os.path.exists(dataset_path_for(cache_dir, "k3"))
+
+    cached_dataset(labeled_frame, cache_dir, key="k4", keep=2)
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        os.path.basename(dataset_path_for(cache_dir, key)) for key in ["k1", "k4"]
+    )
+
+
+def test_unreadable_source_is_not_cached_under_its_key(monkeypatch, tmp_path):
+    """Test that the synthetic fallback for an unreadable file is cached under the synthetic key."""
+    source = tmp_path / "products.csv"
+    source.write_text("not,a,valid\nexport\n")
+    monkeypatch.setattr(settings, "TRAINING_DATA_PATH", str(source))
+    monkeypatch.setattr(settings, "TRAINING_DATASET_CACHE", True)
+    monkeypatch.setattr(settings, "TRAINING_CACHE_DIR", str(tmp_path / "cache"))
+
+    def unreadable(*args, **kwargs):
+        raise OSError("truncated file")
+
+    monkeypatch.setattr(train_model, "load_training_data", unreadable)
+    df = train_model.load_labeled_dataset()
+    assert len(df) > 0
+
+    params = dict(
+        max_rows=settings.TRAINING_MAX_ROWS,
+        sample_size=settings.TRAINING_SAMPLE_SIZE,
+        random_state=settings.TRAINING_RANDOM_STATE
+    )
+    source_key = dataset_key(source_fingerprint(str(source)), **params)
+    synthetic_key = dataset_key(source_fingerprint(None), **params)
+    assert load_dataset(dataset_path_for(settings.TRAINING_CACHE_DIR, source_key)) is None
+    assert load_dataset(dataset_path_for(settings.TRAINING_CACHE_DIR, synthetic_key)) is not None
+
+
+def test_streamed_export_is_not_cleaned_twice(monkeypatch, tmp_path):
+    """Test that prepare_dataset leaves tables from load_training_data as they are."""
+    source = tmp_path / "products.csv"
+    source.write_text("code\n1\n")
+    labeled = labeled_frame()
+    monkeypatch.setattr(train_model, "load_training_data", lambda *args, **kwargs: labeled)
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("already cleaned and labeled")
+
+    monkeypatch.setattr(train_model, "clean_dataset", unexpected)
+    monkeypatch.setattr(train_model, "create_health_label", unexpected)
+
+    assert train_model.prepare_dataset(str(source)) is labeled
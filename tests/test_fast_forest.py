@@ -0,0 +1,139 @@
+"""
+Tests for the flattened random forest evaluator.
+"""
+
+import json
+import os
+import joblib
+import pytest
+import numpy as np
+import train_model
+from config import settings
+from utils.compression import prune_trees
+from utils.fast_forest import FlatForest, artifact_path_for, compile_forest, load_forest, save_forest, verification_corpus, verify_against
+from utils.predict import load_model, predict_health_batch
+
+
+def test_flat_forest_matches_sklearn(trained_model):
+    """Test that flattened probabilities and labels match scikit-learn."""
+    forest = FlatForest.from_sklearn(trained_model)
+    X = verification_corpus(forest, n_random=500)
+
+    assert np.allclose(forest.flat_proba(X), trained_model.predict_proba(X), rtol=0, atol=1e-9)
+    assert list(forest.predict(X)) == list(trained_model.predict(X))
+    assert verify_against(forest, trained_model, X)
+
+
+def test_flat_forest_single_row(trained_model, healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test the single-row path through predict_health_batch."""
+    forest = compile_forest(trained_model)
+
+    assert isinstance(forest, FlatForest)
+    assert forest.estimator is trained_model
+    assert list(predict_health_batch([healthy_nutrition_data], forest)) == ['Healthy']
+    assert list(predict_health_batch([unhealthy_nutrition_data], forest)) == ['Unhealthy']
+
+
+def test_flat_forest_rejects_bad_input(trained_model):
+    """Test input validation mirrors scikit-learn."""
+    forest = FlatForest.from_sklearn(trained_model)
+
+    with pytest.raises(ValueError):
+        forest.predict(np.zeros((1, 3)))
+    with pytest.raises(ValueError):
+        forest.predict(np.array([[np.nan, 0, 0, 0, 0, 0]]))
+
+
+def test_compile_forest_passes_through_other_models():
+    """Test that non-forest models are returned unchanged."""
+    model = object()
+
+    assert compile_forest(model) is model
+    assert compile_forest(None) is None
+
+
+def test_forest_artifact_round_trip(tmp_path, trained_model):
+    """Test saving and memory-mapping a flattened forest."""
+    forest = FlatForest.from_sklearn(trained_model)
+    model_path = tmp_path / "model.pkl"
+    joblib.dump(trained_model, model_path)
+    save_forest(forest, str(tmp_path / "model.forest"), source_path=str(model_path))
+
+    loaded = load_forest(str(tmp_path / "model.forest"))
+    X = verification_corpus(forest, n_random=200)
+    assert loaded.fingerprint() == forest.fingerprint()
+    assert list(loaded.predict(X)) == list(forest.predict(X))
+
+    # The sibling artifact is used only while the pickle is unchanged
+    assert isinstance(load_model(str(model_path), fast=True), FlatForest)
+    assert load_model(str(model_path), fast=True).estimator is None
+    joblib.dump(trained_model.estimators_[0], model_path)
+    assert not isinstance(load_model(str(model_path), fast=True), FlatForest)
+
+
+def test_save_replaces_artifact_atomically(tmp_path, trained_model):
+    """Test that re-saving swaps the whole directory and mapped arrays stay readable."""
+    path = str(tmp_path / "model.forest")
+    forest = FlatForest.from_sklearn(trained_model)
+    save_forest(forest, path)
+    mapped = load_forest(path)
+    X = verification_corpus(forest, n_random=50)
+    before = list(mapped.predict(X))
+
+    smaller = FlatForest.from_sklearn(prune_trees(trained_model, 1))
+    save_forest(smaller, path)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model.forest"]
+    assert load_forest(path).fingerprint() == smaller.fingerprint()
+    assert list(mapped.predict(X)) == before
+
+
+def test_save_model_replaces_the_file(tmp_path, trained_model):
+    """Test that the model is written beside the target and renamed onto it."""
+    model_path = tmp_path / "model.pkl"
+    model_path.write_bytes(b"old")
+
+    train_model.save_model(trained_model, str(model_path))
+
+    assert joblib.load(model_path).n_estimators == trained_model.n_estimators
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model.forest", "model.pkl"]
+
+
+def test_load_checks_headers_without_hashing(tmp_path, trained_model):
+    """Test that loading trusts meta.json's fingerprint and rejects arrays that do not match it."""
+    path = tmp_path / "model.forest"
+    save_forest(FlatForest.from_sklearn(trained_model), str(path))
+    meta = json.loads((path / "meta.json").read_text())
+    meta["fingerprint"] = "from-meta"
+    (path / "meta.json").write_text(json.dumps(meta))
+    assert load_forest(str(path)).fingerprint() == "from-meta"
+
+    np.save(path / "value.npy", np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        load_forest(str(path))
+
+
+def test_old_format_artifact_falls_back_to_pickle(tmp_path, trained_model):
+    """Test that an artifact without array headers in meta.json is refused and the pickle is served."""
+    model_path = tmp_path / "model.pkl"
+    joblib.dump(trained_model, model_path)
+    save_forest(FlatForest.from_sklearn(trained_model), str(tmp_path / "model.forest"), source_path=str(model_path))
+    meta = json.loads((tmp_path / "model.forest" / "meta.json").read_text())
+    del meta["arrays"]
+    meta["format"] = 1
+    (tmp_path / "model.forest" / "meta.json").write_text(json.dumps(meta))
+
+    with pytest.raises(ValueError):
+        load_forest(str(tmp_path / "model.forest"))
+    loaded = load_model(str(model_path), fast=True)
+    assert isinstance(loaded, FlatForest) and loaded.estimator is not None
+
+
+def test_bundled_artifact_is_current():
+    """Test that the committed model.forest has the current format and matches model.pkl."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    model_path = os.path.join(root, settings.MODEL_PATH)
+    loaded = load_model(model_path, fast=True)
+    assert isinstance(loaded, FlatForest) and loaded.estimator is None
+    assert loaded.fingerprint() == FlatForest.from_sklearn(joblib.load(model_path)).fingerprint()
+    assert load_forest(artifact_path_for(model_path)).n_nodes == loaded.n_nodes
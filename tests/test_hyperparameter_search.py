@@ -0,0 +1,43 @@
+"""
+Tests for the parallel hyperparameter search.
+"""
+
+from utils.hyperparameter_search import candidate_score, sample_configurations, search_hyperparameters, write_search_report
+from utils.preprocess import extract_features
+
+
+def test_sample_configurations():
+    """Test full-grid expansion and reproducible random sampling."""
+    grid = {"n_estimators": [5, 10], "max_depth": [2, 4, 6]}
+
+    assert len(sample_configurations(grid)) == 6
+    assert sample_configurations(grid, 3, random_state=1) == sample_configurations(grid, 3, random_state=1)
+    assert len(sample_configurations(grid, 3)) == 3
+
+
+def test_latency_penalty():
+    """Test that slower candidates score lower at equal accuracy."""
+    fast = {"accuracy": 0.99, "latency_us": 50.0}
+    slow = {"accuracy": 0.99, "latency_us": 500.0}
+
+    assert candidate_score(fast, 0.01) > candidate_score(slow, 0.01)
+    assert candidate_score(fast, 0.0) == candidate_score(slow, 0.0)
+
+
+def test_successive_halving(tmp_path, training_frame):
+    """Test that each round keeps 1/factor of the candidates on factor times more rows."""
+    df = training_frame.sample(3000, random_state=0)
+    grid = {"n_estimators": [3, 5], "max_depth": [1, 4]}
+
+    best, report = search_hyperparameters(
+        extract_features(df).values, df['health_label'].values,
+        grid=grid, n_candidates=None, factor=2, min_rows=200, workers=1
+    )
+
+    rounds = [[entry for entry in report if entry["round"] == r] for r in range(2)]
+    assert [len(r) for r in rounds] == [4, 2]
+    assert rounds[1][0]["train_rows"] == 2 * rounds[0][0]["train_rows"]
+    assert best == max(rounds[1], key=lambda entry: entry["score"])["params"]
+
+    write_search_report(str(tmp_path / "report.json"), best, report)
+    assert (tmp_path / "report.json").exists()
@@ -0,0 +1,89 @@
+"""
+Tests for scan sample collection and incremental model updates.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from utils.dataset import load_training_data
+from utils.incremental import add_trees, build_update_window, incremental_update
+from utils.preprocess import extract_features
+from utils.scan_samples import ScanSampleStore
+
+
+def test_scan_samples_round_trip(tmp_path, healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test that scanned products are written once and load as labeled training data."""
+    path = str(tmp_path / "samples.jsonl")
+    store = ScanSampleStore(path, flush_every=2)
+
+    assert store.record("123", healthy_nutrition_data)
+    assert not store.record(" 123 ", healthy_nutrition_data)
+    assert store.record("456", unhealthy_nutrition_data)
+    assert store.stats()["written"] == 2
+    assert json.loads(open(path).readline())["code"] == "123"
+
+    df = load_training_data(path)
+    assert list(df['health_label']) == ['Healthy', 'Unhealthy']
+    assert np.isclose(df['energy_100g'].iloc[0], healthy_nutrition_data['energy_100g'])
+    assert not ScanSampleStore(None).record("789", healthy_nutrition_data)
+
+
+def test_add_trees_warm_start_and_cap(trained_model, training_frame):
+    """Test that trees are added to a copy and the oldest are dropped past the cap."""
+    window = build_update_window(training_frame.tail(500), training_frame, replay_size=300)
+    X, y = window.drop(columns='health_label'), window['health_label'].values
+    n_trees = len(trained_model.estimators_)
+
+    grown = add_trees(trained_model, X, y, n_new_trees=5, max_trees=None)
+    capped = add_trees(trained_model, X, y, n_new_trees=5, max_trees=n_trees)
+
+    assert len(trained_model.estimators_) == n_trees
+    assert len(grown.estimators_) == n_trees + 5
+    assert len(capped.estimators_) == n_trees
+    assert capped.estimators_[-1] is not trained_model.estimators_[-1]
+
+    with pytest.raises(ValueError):
+        add_trees(trained_model, X[y == 'Healthy'], y[y == 'Healthy'])
+
+
+def test_incremental_update_report(trained_model, training_frame):
+    """Test a full update with replay data and a holdout."""
+    new_samples = pd.DataFrame({
+        'energy_100g': [50.0, 550.0], 'fat_100g': [0.5, 30.0], 'sugars_100g': [1.0, 50.0],
+        'salt_100g': [0.05, 0.2], 'fiber_100g': [2.0, 3.0], 'proteins_100g': [1.0, 6.0],
+        'health_label': ['Healthy', 'Unhealthy']
+    })
+
+    updated, report = incremental_update(
+        trained_model, new_samples, replay=training_frame, holdout=training_frame.sample(500, random_state=0),
+        n_new_trees=3, max_trees=None, replay_size=600
+    )
+
+    assert report["new_samples"] == 2
+    assert report["trees_after"] == report["trees_before"] + 3
+    assert report["accuracy_after"] >= 0.95
+    assert list(updated.predict(new_samples.drop(columns='health_label'))) == ['Healthy', 'Unhealthy']
+
+
+def test_add_trees_to_distilled_model(trained_model, training_frame):
+    """Test that new trees grown on a distilled one-tree forest are not all the same tree."""
+    from utils.compression import distill_tree
+
+    X = extract_features(training_frame)
+    y = training_frame['health_label'].values
+    student = distill_tree(trained_model, X.values, max_depth=4)
+
+    grown = add_trees(
+        student, X.values, y, n_new_trees=5, max_trees=None,
+        tree_params={'bootstrap': True, 'max_features': 'sqrt', 'max_depth': 8}
+    )
+
+    new_trees = [tree.tree_ for tree in grown.estimators_[1:]]
+    assert len(new_trees) == 5
+    assert any(
+        not np.array_equal(new_trees[0].threshold, tree.threshold) or not np.array_equal(new_trees[0].feature, tree.feature)
+        for tree in new_trees[1:]
+    )
+    assert grown.bootstrap and grown.max_features == 'sqrt'
+    assert student.n_estimators == 1 and not student.bootstrap
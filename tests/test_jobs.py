@@ -0,0 +1,106 @@
+"""
+Tests for background jobs and the async alternatives API.
+"""
+
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import main
+from utils.exceptions import OverloadedError
+from config import Settings
+from utils.jobs import JobManager, build_job_manager
+
+
+@pytest.fixture
+def client():
+    """Create test client."""
+    return TestClient(main.app)
+
+
+def test_async_alternatives_job(client, monkeypatch, sample_nutrition_data):
+    """Test submitting alternatives as a job and long-polling the result."""
+    def fake_alternatives(**kwargs):
+        return {"alternatives": [{"name": "Water"}], "source": "test"}
+
+    monkeypatch.setattr(main, "get_alternative_with_fallback", fake_alternatives)
+
+    body = {"product_name": "Cola", "brand": "X", "nutrients": sample_nutrition_data}
+    response = client.post("/recommend-alternatives?mode=async", json=body)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["status_url"] == f"/jobs/{job_id}"
+
+    job = client.get(f"/jobs/{job_id}?wait=5").json()
+    assert job["status"] == "succeeded"
+    assert job["result"]["alternatives"] == [{"name": "Water"}]
+    assert job["result"]["product_name"] == "Cola"
+
+    # Finished jobs are pushed immediately over the job WebSocket
+    with client.websocket_connect(f"/ws/jobs/{job_id}") as ws:
+        assert ws.receive_json()["status"] == "succeeded"
+
+
+def test_unknown_job_returns_404(client):
+    """Test polling a job id that does not exist."""
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_failed_job_records_error():
+    """Test that HTTP errors raised by a job are stored on its record."""
+    manager = JobManager(max_workers=1, max_pending=4, result_ttl=60)
+
+    def failing():
+        raise HTTPException(status_code=500, detail="boom")
+
+    record = manager.submit("test", failing)
+    job = asyncio.run(manager.wait(record["job_id"], timeout=5))
+
+    assert job["status"] == "failed"
+    assert job["error"] == {"status_code": 500, "detail": "boom"}
+    manager.shutdown()
+
+
+def test_job_manager_rejects_when_full():
+    """Test that submissions beyond max_pending are shed."""
+    manager = JobManager(max_workers=1, max_pending=1, result_ttl=60)
+    release = threading.Event()
+
+    manager.submit("test", release.wait)
+    with pytest.raises(OverloadedError):
+        manager.submit("test", release.wait)
+
+    release.set()
+    manager.shutdown()
+    assert manager.stats()["rejected"] == 1
+
+
+def test_jobs_visible_to_other_workers(tmp_path):
+    """Test that a job run by one worker process can be polled through another's manager."""
+    store_path = str(tmp_path / "jobs.sqlite3")
+    owner = JobManager(max_workers=1, max_pending=4, result_ttl=60, store_path=store_path)
+    other = JobManager(max_workers=1, max_pending=4, result_ttl=60, store_path=store_path)
+    release = threading.Event()
+
+    record = owner.submit("test", lambda: release.wait(5) and {"answer": 42})
+    assert other.get(record["job_id"])["status"] in ("queued", "running")
+
+    release.set()
+    job = asyncio.run(other.wait(record["job_id"], timeout=5))
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"answer": 42}
+    assert other.get("does-not-exist") is None
+    assert other.stats()["stored"] == 1
+
+
+def test_job_store_is_created_on_first_use(tmp_path):
+    """Test that building the job manager writes nothing until a job is stored."""
+    manager = build_job_manager(Settings(DATA_DIR=str(tmp_path / "data")))
+    store_path = tmp_path / "data" / "jobs.sqlite3"
+    assert not store_path.exists()
+
+    record = manager.submit("test", lambda: {"answer": 42})
+    assert store_path.exists()
+    assert asyncio.run(manager.wait(record["job_id"], timeout=5))["status"] == "succeeded"
+    manager.shutdown()
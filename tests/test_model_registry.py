@@ -0,0 +1,172 @@
+"""
+Tests for the versioned model registry.
+"""
+
+import os
+import threading
+import time
+import joblib
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+import main
+from config import settings
+from utils.exceptions import ModelLoadError
+from utils.fast_forest import FlatForest, save_forest
+from utils.model_registry import ModelRegistry
+from utils.preprocess import extract_features
+
+
+@pytest.fixture
+def model_files(tmp_path, trained_model, training_frame):
+    """Two different valid models and one invalid file on disk."""
+    other = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=1)
+    other.fit(extract_features(training_frame).values, training_frame['health_label'].values)
+
+    first, second, bad = tmp_path / "first.pkl", tmp_path / "second.pkl", tmp_path / "bad.pkl"
+    joblib.dump(trained_model, first)
+    joblib.dump(other, second)
+    joblib.dump({"not": "a model"}, bad)
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+    os.utime(bad, (0, 0))
+    return first, second, bad
+
+
+def test_reload_and_rollback(model_files):
+    """Test swapping versions in and rolling back instantly."""
+    first, second, _ = model_files
+    registry = ModelRegistry(model_path=str(first), models_dir=None, fast=True)
+
+    v1 = registry.reload()
+    v2 = registry.reload(str(second))
+
+    assert v1.version != v2.version
+    assert registry.version == v2.version
+    assert registry.rollback().version == v1.version
+    assert registry.model is v1.model
+    assert registry.stats()["rollbacks"] == 1
+
+
+def test_invalid_model_keeps_current(model_files):
+    """Test that a model failing validation is never activated."""
+    first, _, bad = model_files
+    registry = ModelRegistry(model_path=str(first), fast=False)
+    current = registry.reload()
+
+    with pytest.raises(ModelLoadError):
+        registry.reload(str(bad))
+
+    assert registry.current is current
+    assert registry.stats()["failed_reloads"] == 1
+
+
+def test_watcher_picks_newest_file(model_files, tmp_path):
+    """Test that a newer file in the models directory is loaded on the next check."""
+    first, second, _ = model_files
+    registry = ModelRegistry(model_path=str(first), models_dir=str(tmp_path), fast=True)
+
+    # bad.pkl is the oldest, second.pkl the newest source
+    assert registry.check_for_update().path == str(second)
+    assert registry.check_for_update() is None
+
+    os.utime(first, (3, 3))
+    assert registry.check_for_update().path == str(first)
+
+
+def test_admin_endpoints(monkeypatch, model_files):
+    """Test that admin endpoints need the token and report versions."""
+    first, second, _ = model_files
+    registry = ModelRegistry(model_path=str(first), fast=True)
+    registry.reload()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(settings, "MODEL_DIR", str(second.parent))
+    client = TestClient(main.app)
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    assert client.get("/admin/models").status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/models", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    headers = {"X-Admin-Token": "secret"}
+    assert client.post("/admin/models/reload?file=../x.pkl", headers=headers).status_code == 400
+    reloaded = client.post("/admin/models/reload?file=second.pkl", headers=headers).json()
+    assert reloaded["path"] == str(second)
+    assert client.get("/health").json()["model_version"] == reloaded["version"]
+
+    rolled_back = client.post("/admin/models/rollback", headers=headers).json()
+    assert rolled_back["path"] == str(first)
+
+
+def test_lazy_registry_loads_on_first_use(model_files):
+    """Test that a lazy registry loads nothing until get() is called."""
+    first, _, _ = model_files
+    registry = ModelRegistry(model_path=str(first), fast=True, lazy=True)
+
+    assert registry.current is None
+    assert registry.get().path == str(first)
+    assert registry.current.load_ms > 0
+
+
+def test_reload_endpoint_accepts_forest_artifacts(monkeypatch, model_files, tmp_path):
+    """Test that a .forest artifact in MODEL_DIR can be activated by name."""
+    first, second, _ = model_files
+    save_forest(FlatForest.from_sklearn(joblib.load(second)), str(tmp_path / "second.forest"))
+    registry = ModelRegistry(model_path=str(first), fast=True)
+    registry.reload()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(settings, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+    headers = {"X-Admin-Token": "secret"}
+
+    reloaded = client.post("/admin/models/reload?file=second.forest", headers=headers)
+    assert reloaded.status_code == 200
+    assert reloaded.json()["path"] == str(tmp_path / "second.forest")
+    assert client.post("/admin/models/reload?file=second.txt", headers=headers).status_code == 400
+    assert client.post("/admin/models/reload?file=missing.forest", headers=headers).status_code == 404
+
+
+def test_activate_waits_for_a_running_reload(model_files):
+    """Test that activate is serialized with reload and rollback."""
+    first, second, _ = model_files
+    registry = ModelRegistry(model_path=str(first), fast=True)
+    registry.reload()
+    candidate = registry.load(str(second))
+
+    with registry._load_lock:
+        activating = threading.Thread(target=registry.activate, args=(candidate,))
+        activating.start()
+        activating.join(0.2)
+        assert activating.is_alive()
+        assert registry.current.path == str(first)
+    activating.join(5)
+    assert registry.current.path == str(second)
+
+
+def test_pin_reaches_every_worker(model_files, tmp_path):
+    """Test that a rollback pinned by one worker's registry is applied by another's watcher."""
+    first, second, _ = model_files
+    pin_path = str(tmp_path / "pins" / "active_model.json")
+    workers = [ModelRegistry(model_path=str(first), models_dir=str(tmp_path), fast=True, pin_path=pin_path) for _ in range(2)]
+    for registry in workers:
+        registry.check_for_update()
+    assert all(registry.current.path == str(second) for registry in workers)
+
+    # Admin reload of first.pkl, then rollback to second.pkl, both on worker 0
+    workers[0].reload(str(first), pin=True)
+    assert workers[1].check_for_update().path == str(first)
+    rolled_back = workers[0].rollback(pin=True)
+    assert rolled_back.path == str(second)
+    assert workers[1].check_for_update().version == rolled_back.version
+    assert workers[1].check_for_update() is None
+
+    # A worker started later honours the pin too, although first.pkl is not the newest file
+    workers[0].reload(str(first), pin=True)
+    late = ModelRegistry(model_path=str(first), models_dir=str(tmp_path), fast=True, pin_path=pin_path)
+    assert late.reload().path == str(first)
+
+    # A model file written after the pin supersedes it everywhere
+    os.utime(second, (time.time() + 60, time.time() + 60))
+    assert all(registry.check_for_update().path == str(second) for registry in (workers[1], late))
@@ -0,0 +1,57 @@
+"""
+Tests for model prediction utilities.
+"""
+
+import pytest
+import numpy as np
+from utils.exceptions import PredictionError
+from utils.predict import features_to_matrix, predict_health, predict_health_batch
+from utils.scoring import FEATURE_ORDER
+
+
+def test_predict_health_batch_from_dicts(trained_model, healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test batch prediction from a list of nutrition dictionaries."""
+    labels = predict_health_batch([healthy_nutrition_data, unhealthy_nutrition_data], trained_model)
+
+    assert list(labels) == ['Healthy', 'Unhealthy']
+
+
+def test_predict_health_batch_matches_single(trained_model):
+    """Test that one batch call matches per-row predictions."""
+    X = np.random.default_rng(0).uniform(0, 30, size=(50, 6))
+
+    labels, proba = predict_health_batch(X, trained_model, return_proba=True)
+
+    assert proba.shape == (50, len(trained_model.classes_))
+    assert np.allclose(proba.sum(axis=1), 1.0)
+    assert list(labels) == list(trained_model.predict(X))
+    for row, label in zip(X, labels):
+        assert predict_health(dict(zip(FEATURE_ORDER, row)), trained_model) == label
+
+
+def test_predict_health_batch_errors(trained_model):
+    """Test error handling for missing models and malformed input."""
+    with pytest.raises(PredictionError):
+        predict_health_batch(np.zeros((2, 6)), None)
+    with pytest.raises(PredictionError):
+        predict_health_batch(np.zeros((2, 5)), trained_model)
+
+    assert predict_health({'sugars_100g': 1.0}, None) is None
+    assert len(predict_health_batch([], trained_model)) == 0
+
+
+def test_features_to_matrix_fills_missing():
+    """Test that missing or None nutrition values become 0."""
+    X = features_to_matrix([{'fat_100g': 2.0, 'salt_100g': None}])
+
+    assert X.shape == (1, 6)
+    assert X[0, 1] == 2.0
+    assert X[0, 3] == 0.0
+
+
+
+
+
+
+
+
@@ -0,0 +1,61 @@
+"""
+Tests for memoized predictions.
+"""
+
+import numpy as np
+from utils.batching import MicroBatcher
+from utils.fast_forest import FlatForest
+from utils.prediction_cache import PredictionCache
+from utils.predict import features_to_matrix, predict_health_batch
+
+
+def test_quantized_keys_are_exact(trained_model):
+    """Test that rows sharing a key always share a prediction."""
+    cache = PredictionCache(maxsize=1024)
+    X = np.round(np.random.default_rng(0).uniform(0, 30, size=(2000, 6)), 1)
+
+    labels = predict_health_batch(X, trained_model)
+    seen = {}
+    for row, label in zip(X, labels):
+        key = cache.key(row, trained_model)
+        assert seen.setdefault(key, label) == label
+    # Near-identical profiles collapse onto far fewer keys
+    assert len(seen) < len(X)
+
+
+def test_batcher_uses_cache(trained_model, healthy_nutrition_data):
+    """Test that repeated profiles are served from the cache."""
+    cache = PredictionCache(maxsize=16)
+    batcher = MicroBatcher(window=0, max_batch_size=1, cache=cache)
+
+    first = batcher.predict_health(healthy_nutrition_data, trained_model)
+    nudged = dict(healthy_nutrition_data, fiber_100g=healthy_nutrition_data['fiber_100g'] + 1e-4)
+    second = batcher.predict_health(nudged, trained_model)
+
+    assert first == second == 'Healthy'
+    assert batcher.requests == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_cache_invalidated_on_model_change(trained_model, healthy_nutrition_data):
+    """Test that a different model version clears and re-keys the cache."""
+    cache = PredictionCache(maxsize=16)
+    row = features_to_matrix([healthy_nutrition_data])
+    key = cache.key(row, trained_model)
+    cache.set(key, 'Healthy')
+
+    other = FlatForest.from_sklearn(trained_model)
+    other.value = other.value[:, ::-1].copy()
+    new_key = cache.key(row, other)
+
+    assert new_key[0] != key[0]
+    assert cache.get(new_key) is None
+    assert cache.stats()['size'] == 0
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_non_forest_models_are_not_cached():
+    """Test that models without split thresholds bypass the cache."""
+    cache = PredictionCache(maxsize=16)
+
+    assert cache.key(np.zeros(6), object()) is None
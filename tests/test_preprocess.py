@@ -5,10 +5,15 @@ Tests for preprocessing utilities.
 import pytest
 import pandas as pd
 import numpy as np
+from config import Settings
+from utils.scoring import FEATURE_ORDER
 from utils.preprocess import (
+    BarcodeDeduplicator,
     clean_dataset,
     create_health_label,
     extract_features,
+    label_chunks,
+    normalize_barcodes,
     preprocess_api_data
 )
 
@@ -54,6 +59,107 @@ def test_create_health_label():
     assert labeled.iloc[2]['health_label'] == 'Unhealthy'
 
 
+def test_create_health_label_edge_cases():
+    """Test thresholds are inclusive for Unhealthy and NaN or missing columns behave like the row loop."""
+    df = pd.DataFrame({
+        'sugars_100g': [4.99, 5.0, 10.0, np.nan, 1.0],
+        'fat_100g': [2.9, 1.0, 1.0, 1.0, 1.0],
+        'salt_100g': [0.29, 0.1, 0.1, 0.1, 1.0]
+    })
+
+    labels = list(create_health_label(df)['health_label'])
+    assert labels == ['Healthy', 'Moderate', 'Unhealthy', 'Moderate', 'Unhealthy']
+    assert 'health_label' not in df.columns
+
+    # A missing column counts as 0
+    no_salt = create_health_label(df[['sugars_100g', 'fat_100g']].iloc[:1])
+    assert no_salt.iloc[0]['health_label'] == 'Healthy'
+
+
+def test_create_health_label_uses_settings_and_chunks():
+    """Test that thresholds come from Settings and chunking does not change labels."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'sugars_100g': rng.uniform(0, 20, 1000),
+        'fat_100g': rng.uniform(0, 20, 1000),
+        'salt_100g': rng.uniform(0, 2, 1000)
+    })
+
+    whole = create_health_label(df, chunk_size=None)['health_label']
+    assert list(create_health_label(df, chunk_size=7)['health_label']) == list(whole)
+    assert list(pd.concat(label_chunks([df.iloc[:300], df.iloc[300:]]))['health_label']) == list(whole)
+
+    lenient = Settings(SUGAR_UNHEALTHY_THRESHOLD=100.0, FAT_UNHEALTHY_THRESHOLD=100.0, SALT_UNHEALTHY_THRESHOLD=100.0)
+    assert 'Unhealthy' not in set(create_health_label(df, config=lenient)['health_label'])
+
+
+def test_preprocessing_is_compact_and_avoids_copies():
+    """Test float32 cleaning, in-place labeling and copy-free feature extraction."""
+    df = pd.DataFrame({
+        'code': ['1', '2', '3'],
+        'energy_100g': [100.0, np.nan, 300.0],
+        'fat_100g': [1.0, 5.0, 15.0],
+        'sugars_100g': [2.0, 7.0, 12.0],
+        'salt_100g': [0.1, 0.5, 1.5],
+        'fiber_100g': [2.0, 3.0, 4.0],
+        'proteins_100g': [10.0, 15.0, 20.0]
+    })
+
+    cleaned = clean_dataset(df)
+    assert list(cleaned.index) == [0, 2] and list(cleaned['code']) == ['1', '3']
+    assert all(cleaned[name].dtype == np.float32 for name in FEATURE_ORDER)
+    assert df['fat_100g'].dtype == np.float64
+    assert clean_dataset(df, dtype=None)['fat_100g'].dtype == np.float64
+
+    # Nothing to drop: inplace converts and returns the same frame
+    complete = df.dropna().reset_index(drop=True)
+    assert clean_dataset(complete, inplace=True) is complete
+    assert complete['fat_100g'].dtype == np.float32
+
+    labeled = create_health_label(complete, inplace=True, categorical=True)
+    assert labeled is complete
+    assert list(labeled['health_label']) == ['Healthy', 'Unhealthy']
+    assert list(labeled['health_label'].cat.categories) == ['Healthy', 'Moderate', 'Unhealthy']
+
+    shared = extract_features(labeled, copy=False)
+    assert np.shares_memory(shared['fat_100g'].to_numpy(), labeled['fat_100g'].to_numpy())
+    assert not np.shares_memory(extract_features(labeled)['fat_100g'].to_numpy(), labeled['fat_100g'].to_numpy())
+
+
+def test_clean_dataset_physical_bounds_and_duplicates():
+    """Test that implausible values and repeated barcodes are removed and counted per rule."""
+    df = pd.DataFrame({
+        'code': ['0123', ' 123', '456', None, None, '789', '790', '791', '792'],
+        'energy_100g': [100.0, 100.0, 100.0, 100.0, 100.0, 950.0, 900.5, 100.0, 100.0],
+        'fat_100g': [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 120.0, -1.0],
+        'sugars_100g': [1.0] * 9,
+        'salt_100g': [0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, np.nan, 0.1],
+        'fiber_100g': [1.0] * 9,
+        'proteins_100g': [1.0] * 9
+    })
+
+    report = {'duplicate_barcode': 5}
+    cleaned = clean_dataset(df, report=report)
+
+    # Rows without a barcode are never duplicates; 900.5 kcal is within rounding of 900
+    assert list(cleaned['code']) == ['0123', '456', None, None, '790']
+    assert report == {
+        'missing': 1, 'negative': 1, 'over_100g': 0, 'energy_over_900kcal': 1, 'duplicate_barcode': 6
+    }
+    assert len(clean_dataset(df, deduplicate=False)) == 6
+
+
+def test_barcode_deduplicator_across_chunks():
+    """Test that barcodes are normalized and remembered across chunks."""
+    assert list(normalize_barcodes(np.array(['0012 ', None, 123, '7'], dtype=object))) == ['12', '', '123', '7']
+    assert list(normalize_barcodes(np.array([b'0042']))) == ['42']
+
+    deduplicator = BarcodeDeduplicator()
+    assert list(deduplicator.first_seen(np.array(['1', '01', '2', ''], dtype=object))) == [True, False, True, True]
+    assert list(deduplicator.first_seen(np.array(['002', '3', '3', None], dtype=object))) == [False, True, False, True]
+    assert len(deduplicator) == 3
+
+
 def test_extract_features():
     """Test feature extraction."""
     data = {
@@ -93,6 +199,22 @@ def test_preprocess_api_data_invalid():
     assert result is None
 
 
+def test_preprocess_api_data_missing_values():
+    """Test that unreported nutrients are 0 for scans and NaN when asked for training."""
+    product = {'product': {'nutriments': {'energy-kj_100g': 418.4, 'sugars_100g': 5, 'fat_100g': 0}}}
+
+    scan = preprocess_api_data(product)
+    assert scan['fiber_100g'] == 0 and scan['fat_100g'] == 0
+
+    training = preprocess_api_data(product, missing=np.nan)
+    assert np.isclose(training['energy_100g'], 100.0)
+    assert training['fat_100g'] == 0
+    assert np.isnan(training['fiber_100g'])
+
+    no_energy = preprocess_api_data({'product': {'nutriments': {'sugars_100g': 5}}}, missing=np.nan)
+    assert np.isnan(no_energy['energy_100g'])
+
+
 
 
 
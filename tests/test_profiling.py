@@ -0,0 +1,65 @@
+"""
+Tests for the training pipeline profiler.
+"""
+
+import json
+import numpy as np
+import pytest
+from utils.process_memory import read_peak_rss
+from utils.profiling import PipelineProfiler
+
+
+def test_stages_record_time_and_peak_memory(tmp_path):
+    """Test that nested stages are timed and an outer peak covers its children."""
+    profiler = PipelineProfiler(trace_python_memory=True)
+    with profiler.stage("dataset"):
+        with profiler.stage("load"):
+            data = np.ones(4_000_000)  # ~32 MB
+            del data
+        with profiler.stage("label"):
+            pass
+
+    stages = {entry["path"]: entry for entry in profiler.stages}
+    assert list(stages) == ["dataset/load", "dataset/label", "dataset"]
+    assert all(entry["wall_s"] >= 0 and entry["cpu_s"] >= 0 for entry in stages.values())
+    assert stages["dataset/load"]["peak_traced_kb"] >= 30_000
+    assert stages["dataset/label"]["peak_traced_kb"] < 30_000
+    assert stages["dataset"]["peak_traced_kb"] >= stages["dataset/load"]["peak_traced_kb"]
+    if read_peak_rss() is not None:
+        assert stages["dataset"]["peak_rss_kb"] >= stages["dataset/load"]["peak_rss_kb"] > 0
+
+    report_path = tmp_path / "profile.json"
+    profile_path = tmp_path / "profile.prof"
+    profiler.write(str(report_path), str(profile_path))
+    report = json.loads(report_path.read_text())
+    assert [entry["path"] for entry in report["stages"]] == list(stages)
+    assert not profile_path.exists()
+
+
+def test_stage_is_recorded_when_it_raises():
+    """Test that a failing stage is still recorded."""
+    profiler = PipelineProfiler()
+    with pytest.raises(RuntimeError):
+        with profiler.stage("fit"):
+            raise RuntimeError("boom")
+    assert [entry["path"] for entry in profiler.stages] == ["fit"]
+
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    """Test that a disabled profiler is a no-op."""
+    profiler = PipelineProfiler(enabled=False, trace_python_memory=True, cprofile=True)
+    with profiler.stage("fit"):
+        pass
+    assert profiler.stages == []
+
+
+def test_cprofile_dump(tmp_path):
+    """Test that cProfile stats are written when enabled."""
+    import pstats
+
+    profiler = PipelineProfiler(cprofile=True)
+    with profiler.stage("fit"):
+        sorted(range(1000), reverse=True)
+    profile_path = tmp_path / "profile.prof"
+    profiler.write(str(tmp_path / "profile.json"), str(profile_path))
+    assert pstats.Stats(str(profile_path)).total_calls > 0
@@ -0,0 +1,65 @@
+"""
+Tests for the rule-first prediction fast path.
+"""
+
+import numpy as np
+from utils.batching import MicroBatcher
+from utils.predict import features_to_matrix
+from utils.rule_fast_path import LABEL_SOURCE_MODEL, LABEL_SOURCE_RULES, RuleFastPath
+from utils.scoring import HEALTHY, UNDECIDED, UNHEALTHY, scorer
+
+
+def test_decisive_margin():
+    """Test that only products clear of the thresholds are decided by rules."""
+    codes = scorer.decisive(
+        sugar=[1.0, 4.9, 12.0, 10.5, 1.0],
+        fat=[1.0, 1.0, 1.0, 1.0, 1.0],
+        salt=[0.1, 0.1, 0.1, 0.1, np.nan],
+        margin=0.1
+    )
+
+    assert list(codes) == [HEALTHY, UNDECIDED, UNHEALTHY, UNDECIDED, UNDECIDED]
+
+
+def test_decisive_rows_skip_the_model(healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test that decisive rows never call the model and ambiguous ones do."""
+    rules = RuleFastPath(scorer, margin=0.1, sample_rate=0.0)
+    calls = []
+
+    def model_predict():
+        calls.append(1)
+        return 'Moderate'
+
+    assert rules.predict(features_to_matrix([healthy_nutrition_data]), model_predict) == 'Healthy'
+    assert rules.predict(features_to_matrix([unhealthy_nutrition_data]), model_predict) == 'Unhealthy'
+    assert calls == []
+
+    ambiguous = dict(healthy_nutrition_data, sugars_100g=7.0)
+    assert rules.predict(features_to_matrix([ambiguous]), model_predict) == 'Moderate'
+    stats = rules.stats()
+    assert stats["decided_by_rules"] == 2
+    assert stats["sent_to_model"] == 1
+    assert stats["ambiguous_agreement"] == 1.0
+
+
+def test_agreement_sampling(trained_model, unhealthy_nutrition_data):
+    """Test that sampled decisive rows are checked against the model."""
+    rules = RuleFastPath(scorer, margin=0.1, sample_rate=1.0)
+    batcher = MicroBatcher(window=0, max_batch_size=1, rules=rules)
+
+    assert batcher.predict_health(unhealthy_nutrition_data, trained_model) == 'Unhealthy'
+    assert rules.stats()["decisive_checked"] == 1
+    assert rules.stats()["decisive_agreement"] == 1.0
+
+
+def test_label_source(trained_model, healthy_nutrition_data):
+    """Test that the batcher reports whether the rules or the model gave the label."""
+    batcher = MicroBatcher(window=0, max_batch_size=1, rules=RuleFastPath(scorer, margin=0.1, sample_rate=1.0))
+
+    assert batcher.predict_health_with_source(healthy_nutrition_data, trained_model) == ('Healthy', LABEL_SOURCE_RULES)
+    label, source = batcher.predict_health_with_source(dict(healthy_nutrition_data, sugars_100g=7.0), trained_model)
+    assert source == LABEL_SOURCE_MODEL and label is not None
+    assert batcher.predict_health_with_source(healthy_nutrition_data, None) == (None, None)
+
+    no_rules = MicroBatcher(window=0, max_batch_size=1, rules=None)
+    assert no_rules.predict_health_with_source(healthy_nutrition_data, trained_model)[1] == LABEL_SOURCE_MODEL
@@ -0,0 +1,85 @@
+"""
+Tests for stratified reservoir sampling.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.dataset import load_training_data
+from utils.sampling import StratifiedReservoirSampler, balanced_quotas
+
+
+def labeled_stream(n_rows, shares=(0.05, 0.15, 0.8), seed=1):
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(['Healthy', 'Moderate', 'Unhealthy'], n_rows, p=list(shares))
+    return pd.DataFrame({'row': np.arange(n_rows), 'health_label': pd.Categorical(labels)})
+
+
+def sample_stream(df, size, chunk_size, random_state=3):
+    sampler = StratifiedReservoirSampler(size, random_state=random_state)
+    for start in range(0, len(df), chunk_size):
+        sampler.add(df.iloc[start:start + chunk_size])
+    return sampler.sample()
+
+
+def test_balanced_quotas():
+    """Test that small classes give what they have and the rest is shared evenly."""
+    assert list(balanced_quotas(np.array([100, 2, 100]), 10)) == [4, 2, 4]
+    assert list(balanced_quotas(np.array([5, 5, 5]), 100)) == [5, 5, 5]
+    assert balanced_quotas(np.array([50, 50, 50]), 10).sum() == 10
+
+
+def test_sample_is_balanced_reproducible_and_in_stream_order():
+    """Test that the sample is class-balanced and depends on the seed, not the chunking."""
+    df = labeled_stream(100_000)
+
+    sample = sample_stream(df, 3000, chunk_size=1000)
+
+    assert sample['health_label'].value_counts().to_dict() == {'Healthy': 1000, 'Moderate': 1000, 'Unhealthy': 1000}
+    assert sample['row'].is_monotonic_increasing
+    assert sample['row'].equals(sample_stream(df, 3000, chunk_size=33_333)['row'])
+    assert not sample['row'].equals(sample_stream(df, 3000, chunk_size=1000, random_state=4)['row'])
+
+
+def test_sample_is_uniform_within_a_class():
+    """Test that rows late in the stream are as likely to be kept as early ones."""
+    df = labeled_stream(60_000, shares=(0.5, 0.25, 0.25))
+    sample = sample_stream(df, 6000, chunk_size=500)
+    healthy = sample.loc[sample['health_label'] == 'Healthy', 'row']
+    # Healthy rows are spread evenly over the stream, so about half the sample comes from each half
+    assert abs((healthy < 30_000).mean() - 0.5) < 0.05
+
+
+def test_small_stream_and_rare_class():
+    """Test that a stream smaller than the sample is kept whole and rare classes are made up for."""
+    df = labeled_stream(1000, shares=(0.01, 0.49, 0.5))
+    assert len(sample_stream(df, 5000, chunk_size=100)) == 1000
+
+    counts = sample_stream(df, 300, chunk_size=100)['health_label'].value_counts()
+    n_healthy = (df['health_label'] == 'Healthy').sum()
+    assert counts['Healthy'] == n_healthy and counts.sum() == 300
+
+    with pytest.raises(ValueError):
+        StratifiedReservoirSampler(0)
+
+
+def test_load_training_data_sample(tmp_path):
+    """Test sampling while streaming an export."""
+    rng = np.random.default_rng(0)
+    n_rows = 3000
+    export = pd.DataFrame({
+        'code': np.arange(n_rows).astype(str),
+        'energy_100g': rng.uniform(0, 500, n_rows),
+        'fat_100g': rng.exponential(6, n_rows),
+        'sugars_100g': rng.exponential(8, n_rows),
+        'salt_100g': rng.exponential(0.6, n_rows),
+        'fiber_100g': rng.exponential(2, n_rows),
+        'proteins_100g': rng.exponential(6, n_rows)
+    })
+    path = str(tmp_path / "products.csv")
+    export.to_csv(path, index=False)
+
+    df = load_training_data(path, chunk_size=250, sample_size=300, random_state=7)
+    assert len(df) == 300
+    assert df['health_label'].value_counts().min() == 100
+    assert df['code'].equals(load_training_data(path, chunk_size=1000, sample_size=300, random_state=7)['code'])
@@ -0,0 +1,77 @@
+"""
+Tests for the nutrition scoring engine.
+"""
+
+import pytest
+import numpy as np
+from config import Settings
+from utils.scoring import NutritionScorer, nutrition_to_array, scorer
+
+
+def test_score_healthy_product(healthy_nutrition_data):
+    """Test scoring of a product below every healthy threshold."""
+    result = scorer.score(healthy_nutrition_data)
+
+    assert result['label'] == 'Healthy'
+    assert 0 <= result['score'] <= 100
+    assert 'sugar_low' in result['insight_codes']
+    assert set(result['daily_values']) == {'energy', 'fat', 'sugar', 'salt', 'fiber', 'protein'}
+
+
+def test_score_unhealthy_product(unhealthy_nutrition_data):
+    """Test scoring of a product over the unhealthy thresholds."""
+    result = scorer.score(unhealthy_nutrition_data)
+
+    assert result['label'] == 'Unhealthy'
+    assert 'sugar_very_high' in result['insight_codes']
+    assert result['daily_values']['salt'] == pytest.approx(2.0 / 6.0 * 100)
+
+    message = scorer.message(result, 'Unhealthy', ['Milk'])
+    assert "High sugar content (50.0g per 100g)." in message
+    assert message.endswith("Contains: Milk.")
+
+
+def test_score_batch_matches_single(sample_nutrition_data, healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test that batch scoring matches scoring products one by one."""
+    products = [sample_nutrition_data, healthy_nutrition_data, unhealthy_nutrition_data]
+    batch = scorer.score_batch(np.vstack([nutrition_to_array(p) for p in products]))
+
+    for i, product in enumerate(products):
+        single = scorer.score(product)
+        assert batch['labels'][i] == single['label']
+        assert round(float(batch['scores'][i]), 1) == single['score']
+        assert scorer.insight_names(batch['insight_codes'][i]) == single['insight_codes']
+
+
+def test_insights_render_text(sample_nutrition_data):
+    """Test rendering insight codes as display insights."""
+    insights = scorer.insights(scorer.score(sample_nutrition_data))
+
+    assert {"type": "info", "text": "Low fiber (2.0g) - consider adding fiber-rich foods"} in insights
+    assert all(set(i) == {"type", "text"} for i in insights)
+
+
+def test_scorer_uses_settings_thresholds(sample_nutrition_data):
+    """Test that thresholds are read from Settings."""
+    strict = NutritionScorer(Settings(SUGAR_UNHEALTHY_THRESHOLD=7.0))
+
+    assert scorer.score(sample_nutrition_data)['label'] == 'Moderate'
+    assert strict.score(sample_nutrition_data)['label'] == 'Unhealthy'
+
+
+def test_single_product_path_matches_batch():
+    """Test that the scalar single-product path agrees with score_batch, thresholds and NaN included."""
+    rng = np.random.default_rng(0)
+    rows = rng.uniform(0, 1, (500, 6)) * np.array([900, 40, 60, 3, 15, 30])
+    # Values exactly on every threshold, and a NaN row
+    rows[0, 1:4] = [scorer.fat_healthy, scorer.sugar_healthy, scorer.salt_healthy]
+    rows[1, 1:4] = [scorer.fat_unhealthy, scorer.sugar_unhealthy, scorer.salt_unhealthy]
+    rows[2, 2] = np.nan
+    batch = scorer.score_batch(rows)
+
+    for i, row in enumerate(rows):
+        single = scorer.score(row)
+        assert single['label'] == batch['labels'][i]
+        np.testing.assert_array_equal(single['score'], round(float(batch['scores'][i]), 1))
+        np.testing.assert_array_equal(list(single['daily_values'].values()), batch['daily_values'][i])
+        assert single['insight_codes'] == scorer.insight_names(batch['insight_codes'][i])
@@ -0,0 +1,153 @@
+"""
+Tests for shadow evaluation of candidate models.
+"""
+
+import time
+import joblib
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+import main
+from config import settings
+from utils.batching import MicroBatcher
+from utils.exceptions import ModelLoadError
+from utils.model_registry import ModelRegistry
+from utils.predict import predict_health
+from utils.preprocess import extract_features
+from utils.rule_fast_path import LABEL_SOURCE_MODEL, LABEL_SOURCE_RULES, RuleFastPath
+from utils.scoring import scorer
+from utils.shadow import ShadowEvaluator
+
+
+@pytest.fixture
+def candidate_path(tmp_path, training_frame):
+    """A small candidate model on disk."""
+    candidate = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=1)
+    candidate.fit(extract_features(training_frame).values, training_frame['health_label'].values)
+    path = tmp_path / "candidate.pkl"
+    joblib.dump(candidate, path)
+    return str(path)
+
+
+def test_disagreement_is_recorded(candidate_path, healthy_nutrition_data, unhealthy_nutrition_data):
+    """Test that agreement and disagreement with the live labels are counted."""
+    shadow = ShadowEvaluator(sample_rate=1.0)
+    candidate = shadow.set_candidate(candidate_path)
+    healthy = predict_health(healthy_nutrition_data, candidate.model)
+
+    shadow.evaluate([
+        (healthy_nutrition_data, healthy, "live"),
+        (unhealthy_nutrition_data, healthy, "live")
+    ])
+
+    stats = shadow.stats()
+    assert stats["compared"] == 2
+    assert stats["disagreements"] == 1
+    assert stats["disagreement_rate"] == 0.5
+    assert stats["recent_disagreements"][0]["live"] == healthy
+    assert stats["recent_disagreements"][0]["features"]["sugars_100g"] == unhealthy_nutrition_data["sugars_100g"]
+
+
+def test_submit_runs_in_background(candidate_path, healthy_nutrition_data):
+    """Test that sampled predictions are evaluated by the worker thread."""
+    shadow = ShadowEvaluator(model_path=candidate_path, sample_rate=1.0)
+
+    assert shadow.submit(healthy_nutrition_data, "Healthy", "live")
+    deadline = time.monotonic() + 5
+    while shadow.stats()["compared"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert shadow.stats()["compared"] == 1
+    assert shadow.candidate.path == candidate_path
+
+
+def test_disabled_and_full_queue(candidate_path, healthy_nutrition_data):
+    """Test that nothing is queued without a candidate and a full queue drops samples."""
+    assert not ShadowEvaluator(sample_rate=1.0).submit(healthy_nutrition_data, "Healthy")
+
+    shadow = ShadowEvaluator(sample_rate=1.0, queue_size=1)
+    shadow.set_candidate(candidate_path)
+    shadow._ensure_worker()
+    # Hold the queue full so the worker cannot drain it before the second put
+    with shadow._queue.mutex:
+        shadow._queue.queue.append((healthy_nutrition_data, "Healthy", None))
+    assert not shadow.submit(healthy_nutrition_data, "Healthy")
+    assert shadow.stats()["dropped"] == 1
+
+
+def test_invalid_candidate_rejected(tmp_path):
+    """Test that a file that is not a model cannot be shadowed."""
+    bad = tmp_path / "bad.pkl"
+    joblib.dump({"not": "a model"}, bad)
+
+    with pytest.raises(ModelLoadError):
+        ShadowEvaluator().set_candidate(str(bad))
+
+
+def test_shadow_admin_endpoints(monkeypatch, tmp_path, candidate_path, trained_model):
+    """Test starting a shadow candidate and promoting it to the serving model."""
+    live_path = tmp_path / "live.pkl"
+    joblib.dump(trained_model, live_path)
+    registry = ModelRegistry(model_path=str(live_path), fast=True)
+    registry.reload()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "shadow", ShadowEvaluator(sample_rate=1.0))
+    monkeypatch.setattr(settings, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+    headers = {"X-Admin-Token": "secret"}
+
+    assert client.post("/admin/models/shadow/promote", headers=headers).status_code == 409
+    started = client.post("/admin/models/shadow?file=candidate.pkl", headers=headers).json()
+    assert started["path"] == candidate_path
+    assert client.get("/admin/models/shadow", headers=headers).json()["candidate"]["version"] == started["version"]
+
+    promoted = client.post("/admin/models/shadow/promote", headers=headers).json()
+    assert promoted["version"] == started["version"] == registry.version
+    assert main.shadow.candidate is None
+
+
+def test_rule_labels_are_not_shadowed(candidate_path, healthy_nutrition_data):
+    """Test that only labels the live model produced are queued."""
+    shadow = ShadowEvaluator(sample_rate=1.0)
+    shadow.set_candidate(candidate_path)
+
+    assert not shadow.submit(healthy_nutrition_data, "Healthy", None, label_source=LABEL_SOURCE_RULES)
+    assert shadow.stats()["skipped_rules"] == 1
+    assert shadow.stats()["sampled"] == 0
+
+
+def test_scan_shadows_model_labels_only(monkeypatch, tmp_path, candidate_path, trained_model, sample_product_data):
+    """Test that a scan the rules decide carries no model version and is not shadowed."""
+    live_path = tmp_path / "live.pkl"
+    joblib.dump(trained_model, live_path)
+    registry = ModelRegistry(model_path=str(live_path), fast=True)
+    registry.reload()
+    shadow = ShadowEvaluator(sample_rate=1.0)
+    shadow.set_candidate(candidate_path)
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "shadow", shadow)
+    monkeypatch.setattr(main, "batcher", MicroBatcher(
+        window=0, max_batch_size=1, rules=RuleFastPath(scorer, margin=0.1, sample_rate=0.0)
+    ))
+    products = {
+        "1": dict(sample_product_data['product'], nutriments={
+            'energy-kcal_100g': 50.0, 'fat_100g': 1.0, 'sugars_100g': 2.0,
+            'salt_100g': 0.1, 'fiber_100g': 5.0, 'proteins_100g': 3.0
+        }),
+        "2": dict(sample_product_data['product'], nutriments={
+            'energy-kcal_100g': 200.0, 'fat_100g': 5.0, 'sugars_100g': 7.0,
+            'salt_100g': 0.5, 'fiber_100g': 2.0, 'proteins_100g': 10.0
+        })
+    }
+    monkeypatch.setattr(main, "fetch_product_by_barcode", lambda barcode: {'status': 1, 'product': products[barcode]})
+
+    decided = main.analyze_barcode("1")
+    assert decided["label_source"] == LABEL_SOURCE_RULES
+    assert decided["model_version"] is None
+    assert shadow.stats()["sampled"] == 0
+
+    predicted = main.analyze_barcode("2")
+    assert predicted["label_source"] == LABEL_SOURCE_MODEL
+    assert predicted["model_version"] == registry.version
+    assert shadow.stats()["sampled"] == 1
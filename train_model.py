@@ -8,6 +8,7 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
+import argparse
 import joblib
 import os
 import sys
@@ -15,13 +16,22 @@ import sys
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from config import settings
+from utils.compression import compress_forest
+from utils.dataset import load_training_data
+from utils.dataset_cache import cached_dataset, dataset_key, source_fingerprint
+from utils.exceptions import DatasetLoadError
+from utils.incremental import incremental_update
+from utils.hyperparameter_search import search_hyperparameters, write_search_report
+from utils.fast_forest import FlatForest, artifact_path_for, compile_forest, save_forest
 from utils.preprocess import clean_dataset, create_health_label, extract_features
+from utils.profiling import PipelineProfiler
 from utils.logger import get_logger
 
 logger = get_logger()
 
 
-def download_dataset(url: str = None, local_path: str = None) -> pd.DataFrame:
+def download_dataset(url: str = None, local_path: str = None, fallback: bool = True) -> pd.DataFrame:
     """
     Load Open Food Facts dataset.
     
@@ -31,21 +41,33 @@ def download_dataset(url: str = None, local_path: str = None) -> pd.DataFrame:
     
     Args:
         url: Optional URL to download dataset from
-        local_path: Optional path to local CSV file
+        local_path: Optional path to a local OFF CSV/TSV export or JSONL(.gz) dump
+        fallback: Use the synthetic dataset if local_path cannot be read
         
     Returns:
         DataFrame with product data
+        
+    Raises:
+        DatasetLoadError: If local_path cannot be read and fallback is False
     """
-    # If local file exists, use it
+    # If local file exists, stream it in chunks (cleaned, labeled and optionally sampled as it is read)
     if local_path and os.path.exists(local_path):
         logger.info(f"Loading dataset from {local_path}...")
-        # Read in chunks to handle large files
         try:
-            df = pd.read_csv(local_path, low_memory=False, nrows=50000)  # Limit rows for faster training
-            logger.info(f"Loaded {len(df)} rows from local file")
+            df = load_training_data(
+                local_path,
+                chunk_size=settings.TRAINING_CHUNK_SIZE,
+                max_rows=settings.TRAINING_MAX_ROWS,
+                workers=settings.TRAINING_PARSE_WORKERS,
+                sample_size=settings.TRAINING_SAMPLE_SIZE,
+                random_state=settings.TRAINING_RANDOM_STATE
+            )
+            logger.info(f"Loaded {len(df)} usable rows from local file")
             return df
         except Exception as e:
             logger.error(f"Error loading local file: {e}")
+            if not fallback:
+                raise DatasetLoadError(f"Could not load training data from {local_path}: {e}") from e
     
     # Otherwise, create a sample dataset for demonstration
     # In production, download from: https://world.openfoodfacts.org/data/openfoodfacts-products.jsonl.gz
@@ -97,9 +119,9 @@ def download_dataset(url: str = None, local_path: str = None) -> pd.DataFrame:
     return df
 
 
-def train_model(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42):
+def split_dataset(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42):
     """
-    Train RandomForestClassifier on nutrition data.
+    Split labeled data into training and held-out sets.
     
     Args:
         df: DataFrame with features and health_label
@@ -107,23 +129,71 @@ def train_model(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42
         random_state: Random seed for reproducibility
         
     Returns:
-        Trained model and test accuracy
+        X_train, X_test, y_train, y_test
     """
-    # Extract features and target
-    X = extract_features(df)
+    # Splitting copies the rows, so the features need not be copied first
+    X = extract_features(df, copy=False)
     y = df['health_label']
+    return _stratified_split(X, y, test_size, random_state)
+
+
+def split_validation(X_train: pd.DataFrame, y_train: pd.Series, validation_size: float, random_state: int = 42):
+    """
+    Hold out a validation set from the training split, leaving the test split untouched.
     
+    Args:
+        X_train, y_train: Training split from split_dataset
+        validation_size: Proportion of the training split to hold out
+        random_state: Random seed for reproducibility
+        
+    Returns:
+        X_fit, X_val, y_fit, y_val
+    """
+    return _stratified_split(X_train, y_train, validation_size, random_state)
+
+
+def _stratified_split(X, y, test_size: float, random_state: int):
     # Split data (remove stratify if classes are too imbalanced)
     try:
-        X_train, X_test, y_train, y_test = train_test_split(
+        return train_test_split(
             X, y, test_size=test_size, random_state=random_state, stratify=y
         )
     except ValueError:
         # If stratification fails, split without it
         logger.warning("Stratified split failed, using regular split")
-        X_train, X_test, y_train, y_test = train_test_split(
+        return train_test_split(
             X, y, test_size=test_size, random_state=random_state
         )
+
+
+def train_model(
+    df: pd.DataFrame,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    params: dict = None,
+    profiler: PipelineProfiler = None,
+    validation_size: float = 0.0
+):
+    """
+    Train RandomForestClassifier on nutrition data.
+    
+    Args:
+        df: DataFrame with features and health_label
+        test_size: Proportion of data to use for testing
+        random_state: Random seed for reproducibility
+        params: Forest parameters (default: TRAINING_N_ESTIMATORS and TRAINING_MAX_DEPTH)
+        profiler: Records the split, fit and evaluate stages
+        validation_size: Proportion of the training split left out of the fit
+            (see split_validation), e.g. to choose a compressed model on it
+        
+    Returns:
+        Trained model and test accuracy
+    """
+    profiler = profiler or PipelineProfiler(enabled=False)
+    with profiler.stage("split"):
+        X_train, X_test, y_train, y_test = split_dataset(df, test_size, random_state)
+        if validation_size > 0:
+            X_train, _, y_train, _ = split_validation(X_train, y_train, validation_size, random_state)
     
     logger.info(f"\nTraining set size: {len(X_train)}")
     logger.info(f"Test set size: {len(X_test)}")
@@ -132,18 +202,20 @@ def train_model(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42
     
     # Train RandomForestClassifier
     logger.info("\nTraining RandomForestClassifier...")
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        random_state=random_state,
-        n_jobs=-1
-    )
+    params = params or {
+        'n_estimators': settings.TRAINING_N_ESTIMATORS,
+        'max_depth': settings.TRAINING_MAX_DEPTH
+    }
+    logger.info(f"Parameters: {params}")
+    model = RandomForestClassifier(random_state=random_state, n_jobs=-1, **params)
     
-    model.fit(X_train, y_train)
+    with profiler.stage("fit"):
+        model.fit(X_train, y_train)
     
     # Evaluate model
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
+    with profiler.stage("evaluate"):
+        y_pred = model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
     
     logger.info(f"\nModel Accuracy: {accuracy:.4f}")
     logger.info("\nClassification Report:")
@@ -152,7 +224,7 @@ def train_model(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42
     # Feature importance
     logger.info("\nFeature Importances:")
     feature_importance = pd.DataFrame({
-        'feature': X.columns,
+        'feature': X_train.columns,
         'importance': model.feature_importances_
     }).sort_values('importance', ascending=False)
     logger.info(f"\n{feature_importance}")
@@ -160,44 +232,266 @@ def train_model(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42
     return model, accuracy
 
 
-def main():
-    """
-    Main training pipeline.
+def prepare_dataset(
+    local_path: str = None,
+    profiler: PipelineProfiler = None,
+    fallback: bool = True
+) -> pd.DataFrame:
     """
-    logger.info("=" * 60)
-    logger.info("ScanLabel AI - Model Training Pipeline")
-    logger.info("=" * 60)
+    Load, clean and label the training data (pipeline steps 1-3).
     
+    Args:
+        local_path: Optional path to a local OFF export or dump
+        profiler: Records the load, clean and label stages
+        fallback: Use the synthetic dataset if local_path cannot be read
+        
+    Returns:
+        Cleaned DataFrame with a health_label column
+        
+    Raises:
+        DatasetLoadError: If local_path cannot be read and fallback is False
+    """
+    profiler = profiler or PipelineProfiler(enabled=False)
     # Step 1: Load dataset
     logger.info("\n[Step 1] Loading dataset...")
-    df = download_dataset()
+    with profiler.stage("load"):
+        df = download_dataset(local_path=local_path, fallback=fallback)
+    
+    # load_training_data cleans and labels each chunk as it streams, so only the synthetic data needs it
+    if 'health_label' in df.columns:
+        logger.info("Dataset is already cleaned and labeled")
+        logger.info("\nHealth label distribution:")
+        logger.info(f"{df['health_label'].value_counts()}")
+        return df
     
     # Step 2: Clean data
     logger.info("\n[Step 2] Cleaning dataset...")
-    df_clean = clean_dataset(df)
-    logger.info(f"Cleaned dataset: {len(df_clean)} rows (removed {len(df) - len(df_clean)} rows)")
+    # Each step replaces the previous frame, so at most two are alive at once
+    n_loaded = len(df)
+    removed = {}
+    with profiler.stage("clean"):
+        df = clean_dataset(df, inplace=True, report=removed)
+    logger.info(f"Cleaned dataset: {len(df)} rows (removed {n_loaded - len(df)} rows: {removed})")
     
     # Step 3: Create health labels
     logger.info("\n[Step 3] Creating health labels...")
-    df_labeled = create_health_label(df_clean)
+    with profiler.stage("label"):
+        df_labeled = create_health_label(df, inplace=True, categorical=True)
     logger.info("\nHealth label distribution:")
     logger.info(f"{df_labeled['health_label'].value_counts()}")
+    return df_labeled
+
+
+def search_parameters(df: pd.DataFrame) -> dict:
+    """
+    Search forest parameters on the training split and write the report.
     
-    # Step 4: Train model
-    logger.info("\n[Step 4] Training model...")
-    model, accuracy = train_model(df_labeled)
+    Args:
+        df: DataFrame with features and health_label
+        
+    Returns:
+        Best forest parameters
+    """
+    X_train, _, y_train, _ = split_dataset(df, settings.TRAINING_TEST_SIZE, settings.TRAINING_RANDOM_STATE)
+    best, report = search_hyperparameters(
+        X_train.values, np.asarray(y_train),
+        n_candidates=settings.TRAINING_SEARCH_CANDIDATES,
+        latency_weight=settings.TRAINING_SEARCH_LATENCY_WEIGHT,
+        workers=settings.TRAINING_SEARCH_WORKERS,
+        random_state=settings.TRAINING_RANDOM_STATE
+    )
+    write_search_report(settings.TRAINING_SEARCH_REPORT, best, report)
+    logger.info(f"Search report saved to {settings.TRAINING_SEARCH_REPORT}")
+    return best
+
+
+def load_labeled_dataset(profiler: PipelineProfiler = None) -> pd.DataFrame:
+    """
+    Cleaned, labeled training table, reused from the dataset cache when the
+    source data and thresholds are unchanged (TRAINING_DATASET_CACHE).
     
-    # Step 5: Save model
-    logger.info("\n[Step 5] Saving model...")
-    model_path = 'model.pkl'
-    joblib.dump(model, model_path)
+    Args:
+        profiler: Records a 'dataset' stage, with load/clean/label inside it on a cache miss
+    """
+    profiler = profiler or PipelineProfiler(enabled=False)
+    data_path = settings.TRAINING_DATA_PATH
+    with profiler.stage("dataset"):
+        if not settings.TRAINING_DATASET_CACHE:
+            return prepare_dataset(data_path, profiler)
+        if data_path and os.path.exists(data_path):
+            try:
+                return _cached_labeled_dataset(data_path, profiler)
+            except DatasetLoadError as e:
+                # Fall back as prepare_dataset does, but cache the synthetic table under its own key
+                logger.error(f"{e}; using the synthetic dataset")
+        return _cached_labeled_dataset(None, profiler)
+
+
+def _cached_labeled_dataset(data_path: str, profiler: PipelineProfiler) -> pd.DataFrame:
+    """Cached table for data_path (None for the synthetic dataset); read errors are raised, not cached."""
+    key = dataset_key(
+        source_fingerprint(data_path),
+        max_rows=settings.TRAINING_MAX_ROWS,
+        sample_size=settings.TRAINING_SAMPLE_SIZE,
+        random_state=settings.TRAINING_RANDOM_STATE
+    )
+    return cached_dataset(
+        lambda: prepare_dataset(data_path, profiler, fallback=False),
+        settings.TRAINING_CACHE_DIR,
+        key,
+        keep=settings.TRAINING_CACHE_KEEP
+    )
+
+
+def save_model(model, model_path: str) -> None:
+    """
+    Save the model and its flattened, verified copy that the API memory-maps
+    instead of unpickling.
+    """
+    # Write next to the target and rename, so watchers never load a half-written pickle
+    tmp_path = f"{model_path}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, model_path)
     logger.info(f"Model saved to {model_path}")
     
+    forest = compile_forest(model)
+    if isinstance(forest, FlatForest):
+        artifact_path = artifact_path_for(model_path)
+        save_forest(forest, artifact_path, source_path=model_path)
+        logger.info(f"Forest artifact saved to {artifact_path}")
+
+
+def main(search: bool = None, profile: bool = None):
+    """
+    Main training pipeline.
+    
+    Args:
+        search: Search forest parameters before training (default: TRAINING_SEARCH)
+        profile: Write a per-stage time and memory report (default: TRAINING_PROFILE)
+    """
+    logger.info("=" * 60)
+    logger.info("ScanLabel AI - Model Training Pipeline")
+    logger.info("=" * 60)
+    
+    profiler = PipelineProfiler(
+        enabled=settings.TRAINING_PROFILE if profile is None else profile,
+        trace_python_memory=settings.TRAINING_PROFILE_TRACEMALLOC,
+        cprofile=bool(settings.TRAINING_PROFILE_CPROFILE)
+    )
+    
+    # Steps 1-3: Load, clean and label, or reuse the cached table
+    df_labeled = load_labeled_dataset(profiler)
+    
+    # Step 4: Train model (optionally with searched parameters)
+    params = None
+    if settings.TRAINING_SEARCH if search is None else search:
+        logger.info("\n[Step 4a] Searching forest parameters...")
+        # Only the parent process is measured; search workers are separate processes
+        with profiler.stage("search"):
+            params = search_parameters(df_labeled)
+    logger.info("\n[Step 4] Training model...")
+    # Compression picks its model on a validation set, which the full forest must not be fit on
+    validation_size = settings.TRAINING_COMPRESSION_VALIDATION_SIZE if settings.TRAINING_COMPRESS else 0.0
+    with profiler.stage("train"):
+        model, accuracy = train_model(
+            df_labeled,
+            test_size=settings.TRAINING_TEST_SIZE,
+            random_state=settings.TRAINING_RANDOM_STATE,
+            params=params,
+            profiler=profiler,
+            validation_size=validation_size
+        )
+    
+    # Step 5: Compress model
+    if settings.TRAINING_COMPRESS:
+        logger.info("\n[Step 5] Compressing model...")
+        with profiler.stage("compress"):
+            X_train, X_test, y_train, y_test = split_dataset(
+                df_labeled, settings.TRAINING_TEST_SIZE, settings.TRAINING_RANDOM_STATE
+            )
+            X_fit, X_val, y_fit, y_val = split_validation(
+                X_train, y_train, validation_size, settings.TRAINING_RANDOM_STATE
+            )
+            model, report = compress_forest(
+                model, X_fit.values, y_fit.values, X_val.values, y_val.values,
+                tolerance=settings.TRAINING_COMPRESSION_TOLERANCE,
+                random_state=settings.TRAINING_RANDOM_STATE
+            )
+            # The test split was not used to choose the model, so its accuracy is an unbiased estimate
+            accuracy = accuracy_score(y_test, model.predict(X_test.values))
+            logger.info(f"Compressed model test accuracy: {accuracy:.4f}")
+    
+    # Step 6: Save model
+    logger.info("\n[Step 6] Saving model...")
+    with profiler.stage("save"):
+        save_model(model, settings.MODEL_PATH)
+    
+    if profiler.enabled:
+        profiler.write(settings.TRAINING_PROFILE_REPORT, settings.TRAINING_PROFILE_CPROFILE)
+    
     logger.info("\n" + "=" * 60)
     logger.info("Training completed successfully!")
     logger.info("=" * 60)
 
 
+def update(samples_path: str = None) -> dict:
+    """
+    Incrementally update the saved model with newly scanned products.
+    
+    New trees are grown on the newest samples plus a replay sample of the
+    training data and added to the saved forest; the oldest trees beyond
+    INCREMENTAL_MAX_TREES are dropped. The API's model watcher picks up the
+    saved file.
+    
+    Args:
+        samples_path: JSONL file of scanned products (default: SCAN_SAMPLES_PATH)
+        
+    Returns:
+        Update report, or an empty dict if there was nothing to update
+    """
+    samples_path = samples_path or settings.SCAN_SAMPLES_PATH
+    if not samples_path or not os.path.exists(samples_path):
+        logger.warning(f"No scan samples at {samples_path}; nothing to update")
+        return {}
+    new_samples = load_training_data(samples_path)
+    if not len(new_samples):
+        logger.warning(f"No usable samples in {samples_path}; nothing to update")
+        return {}
+    
+    model = joblib.load(settings.MODEL_PATH)
+    df_labeled = load_labeled_dataset()
+    X_train, X_test, y_train, y_test = split_dataset(
+        df_labeled, settings.TRAINING_TEST_SIZE, settings.TRAINING_RANDOM_STATE
+    )
+    model, report = incremental_update(
+        model,
+        new_samples,
+        replay=X_train.assign(health_label=y_train),
+        holdout=X_test.assign(health_label=y_test),
+        n_new_trees=settings.INCREMENTAL_NEW_TREES,
+        max_trees=settings.INCREMENTAL_MAX_TREES,
+        window_size=settings.INCREMENTAL_WINDOW_SIZE,
+        replay_size=settings.INCREMENTAL_REPLAY_SIZE,
+        random_state=settings.TRAINING_RANDOM_STATE,
+        # New trees follow the configured forest, even if the saved model was distilled
+        tree_params={'bootstrap': True, 'max_features': 'sqrt', 'max_depth': settings.TRAINING_MAX_DEPTH}
+    )
+    save_model(model, settings.MODEL_PATH)
+    return report
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the ScanLabel AI health classifier")
+    parser.add_argument("--search", action="store_true", default=None,
+                        help="Search forest parameters before training (default: TRAINING_SEARCH)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the saved model with scanned products instead of retraining")
+    parser.add_argument("--samples", help="Scan samples file for --incremental (default: SCAN_SAMPLES_PATH)")
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="Write per-stage time and peak memory to TRAINING_PROFILE_REPORT (default: TRAINING_PROFILE)")
+    args = parser.parse_args()
+    if args.incremental:
+        update(args.samples)
+    else:
+        main(search=args.search, profile=args.profile)
 
@@ -0,0 +1,157 @@
+"""
+Admission control for ScanLabel AI.
+Bounds concurrent work per endpoint class and sheds load once the wait
+queue is full, instead of starting every upstream call immediately.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from config import settings, Settings
+from utils.exceptions import OverloadedError
+from utils.logger import logger
+
+
+class ConcurrencyLimiter:
+    """
+    Async limiter with a bounded FIFO wait queue.
+
+    Up to max_concurrent holders run at once. Up to max_queued more wait
+    (for at most queue_timeout seconds); anything beyond that is rejected
+    immediately with OverloadedError.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queued: int,
+        queue_timeout: float,
+        retry_after: int
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._active = 0
+        self._waiters = deque()
+
+        # Statistics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def active(self) -> int:
+        """Number of requests currently holding a slot."""
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    def _overloaded(self, reason: str) -> OverloadedError:
+        logger.warning(f"Admission [{self.name}] shedding request: {reason}")
+        return OverloadedError(f"Server is busy ({self.name}): {reason}", retry_after=self.retry_after)
+
+    async def acquire(self) -> None:
+        """
+        Take a slot, waiting in the queue if needed.
+
+        Raises:
+            OverloadedError: If the queue is full or the wait times out
+        """
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queued:
+            self.rejected += 1
+            raise self._overloaded("wait queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise self._overloaded(f"no slot within {self.queue_timeout}s")
+        except BaseException:
+            # Cancelled after release() already handed us the slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+        # release() handed the slot over without decrementing _active
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Release a slot, handing it to the oldest live waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        """Return current load and counters."""
+        return {
+            'active': self._active,
+            'queued': len(self._waiters),
+            'max_concurrent': self.max_concurrent,
+            'max_queued': self.max_queued,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out
+        }
+
+
+def build_limiters(config: Optional[Settings] = None) -> Dict[str, ConcurrencyLimiter]:
+    """
+    Build one limiter per endpoint class from settings.
+
+    Classes:
+    - 'scan': barcode lookups (Open Food Facts)
+    - 'image': food image recognition (Google Vision)
+    - 'ai': AI alternatives (OpenRouter LLM)
+    """
+    config = config or settings
+    classes = {
+        'scan': (config.ADMISSION_SCAN_CONCURRENCY, config.ADMISSION_SCAN_QUEUE),
+        'image': (config.ADMISSION_IMAGE_CONCURRENCY, config.ADMISSION_IMAGE_QUEUE),
+        'ai': (config.ADMISSION_AI_CONCURRENCY, config.ADMISSION_AI_QUEUE),
+    }
+    return {
+        name: ConcurrencyLimiter(
+            name,
+            max_concurrent=concurrency,
+            max_queued=queue,
+            queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+            retry_after=config.ADMISSION_RETRY_AFTER
+        )
+        for name, (concurrency, queue) in classes.items()
+    }
+
+
+# Default limiters built from the global settings
+limiters = build_limiters()
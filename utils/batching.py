@@ -0,0 +1,243 @@
+"""
+Micro-batching for model inference.
+
+Concurrent scans each need one prediction. Instead of calling the model once
+per row, callers hand their row to a MicroBatcher, which collects rows for a
+short window (or until a batch is full), runs one vectorized prediction and
+hands each caller its own label.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import settings, Settings
+from utils.exceptions import PredictionError
+from utils.logger import logger
+from utils.predict import features_to_matrix, predict_health_batch
+from utils.prediction_cache import PredictionCache, prediction_cache
+from utils.rule_fast_path import LABEL_SOURCE_MODEL, RuleFastPath, rule_fast_path
+
+
+class MicroBatcher:
+    """
+    Collects single-row predictions from many threads into batches.
+
+    A batch is flushed when max_batch_size rows are waiting or window
+    seconds have passed since its first row arrived. With window <= 0 or
+    max_batch_size <= 1, rows are predicted inline without batching.
+    Rows the threshold rules decide, or found in the prediction cache,
+    skip the model entirely.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        max_batch_size: int,
+        timeout: float = 5.0,
+        cache: Optional[PredictionCache] = None,
+        rules: Optional[RuleFastPath] = None
+    ):
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.cache = cache
+        self.rules = rules
+
+        self._queue: "queue.Queue[Tuple[np.ndarray, object, Future, float]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.requests = 0
+        self.batches = 0
+        self.failed = 0
+        self.max_batch_seen = 0
+        self._total_wait = 0.0
+        self._total_predict = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_batch_size > 1
+
+    def _ensure_worker(self) -> None:
+        # Started lazily, and again after fork, since threads do not survive fork
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="scanlabel-batcher", daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> List[Tuple[np.ndarray, object, Future, float]]:
+        """Block for the first row, then gather more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+
+            # Rows queued against different models (e.g. after a reload) are predicted separately
+            by_model: Dict[int, List[Tuple[np.ndarray, object, Future, float]]] = {}
+            for item in batch:
+                by_model.setdefault(id(item[1]), []).append(item)
+
+            for items in by_model.values():
+                model = items[0][1]
+                try:
+                    labels = predict_health_batch(np.vstack([item[0] for item in items]), model)
+                    for item, label in zip(items, labels):
+                        item[2].set_result(str(label))
+                except Exception as e:
+                    self.failed += len(items)
+                    for item in items:
+                        item[2].set_exception(e)
+
+            finished = time.monotonic()
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self._total_predict += finished - started
+            self._total_wait += sum(started - item[3] for item in batch)
+
+    def predict(self, nutrition_data: Dict, model) -> str:
+        """
+        Predict one product's health label as part of a batch.
+
+        Args:
+            nutrition_data: Dictionary with nutrition values
+            model: Trained classifier
+
+        Returns:
+            Predicted health label
+
+        Raises:
+            PredictionError: If prediction fails or times out
+        """
+        return self.predict_with_source(nutrition_data, model)[0]
+
+    def predict_with_source(self, nutrition_data: Dict, model) -> Tuple[str, str]:
+        """
+        Like predict, but also tell whether the rules or the model gave the label.
+
+        Args:
+            nutrition_data: Dictionary with nutrition values
+            model: Trained classifier
+
+        Returns:
+            (health label, LABEL_SOURCE_RULES or LABEL_SOURCE_MODEL)
+
+        Raises:
+            PredictionError: If prediction fails or times out
+        """
+        if model is None:
+            raise PredictionError("No model loaded")
+        row = features_to_matrix([nutrition_data])
+        if self.rules is not None:
+            return self.rules.predict_with_source(row, lambda: self._predict_cached(row, model))
+        return self._predict_cached(row, model), LABEL_SOURCE_MODEL
+
+    def _predict_cached(self, row: np.ndarray, model) -> str:
+        """Predict one row through the prediction cache."""
+        key = self.cache.key(row, model) if self.cache is not None else None
+        if key is not None:
+            label = self.cache.get(key)
+            if label is not None:
+                return label
+
+        label = self._predict_row(row, model)
+        if key is not None:
+            self.cache.set(key, label)
+        return label
+
+    def _predict_row(self, row: np.ndarray, model) -> str:
+        """Predict one row, inline or through the batching thread."""
+        with self._lock:
+            self.requests += 1
+            if not self.enabled:
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, 1)
+        if not self.enabled:
+            return str(predict_health_batch(row, model)[0])
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((row, model, future, time.monotonic()))
+        try:
+            return future.result(timeout=self.timeout)
+        except PredictionError:
+            raise
+        except Exception as e:
+            raise PredictionError(f"Batched prediction failed: {e}") from e
+
+    def predict_health(self, nutrition_data: Dict, model) -> Optional[str]:
+        """
+        Batched counterpart of utils.predict.predict_health.
+
+        Returns:
+            Predicted health label, or None if prediction fails
+        """
+        return self.predict_health_with_source(nutrition_data, model)[0]
+
+    def predict_health_with_source(self, nutrition_data: Dict, model) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Like predict_health, but also tell whether the rules or the model gave the label.
+
+        Returns:
+            (health label, label source), or (None, None) if prediction fails
+        """
+        if model is None:
+            return None, None
+        try:
+            return self.predict_with_source(nutrition_data, model)
+        except PredictionError as e:
+            logger.error(f"Error making prediction: {e}")
+            return None, None
+
+    def stats(self) -> Dict:
+        """Return batching configuration and counters."""
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "requests": self.requests,
+            "batches": self.batches,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+            "avg_wait_ms": round(self._total_wait / self.requests * 1000, 3) if self.requests else 0.0,
+            "avg_batch_predict_ms": round(self._total_predict / self.batches * 1000, 3) if self.batches else 0.0
+        }
+
+
+def build_micro_batcher(config: Optional[Settings] = None) -> MicroBatcher:
+    """Build a MicroBatcher from settings."""
+    config = config or settings
+    return MicroBatcher(
+        window=config.INFERENCE_BATCH_WINDOW_MS / 1000.0,
+        max_batch_size=config.INFERENCE_MAX_BATCH_SIZE,
+        cache=prediction_cache if config.PREDICTION_CACHE_SIZE > 0 else None,
+        rules=rule_fast_path if config.RULE_FAST_PATH_ENABLED else None
+    )
+
+
+# Default batcher built from the global settings
+batcher = build_micro_batcher()
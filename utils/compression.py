@@ -0,0 +1,185 @@
+"""
+Model compression for ScanLabel AI.
+
+After training, smaller candidate models are built from the full forest
+(fewer trees, shallower trees, or a single distilled tree) and measured for
+held-out accuracy, file size, load time and per-row latency. The smallest
+candidate whose accuracy stays within a tolerance of the full model wins.
+Candidates are compared on a validation set held out from the training
+data, so the test set still gives an unbiased accuracy for the winner.
+"""
+
+import copy
+import io
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from utils.fast_forest import compile_forest
+from utils.logger import logger
+
+
+def prune_trees(model: RandomForestClassifier, n_trees: int) -> RandomForestClassifier:
+    """
+    Keep only the first n_trees trees of a fitted forest (no retraining).
+
+    Args:
+        model: Fitted RandomForestClassifier
+        n_trees: Number of trees to keep
+
+    Returns:
+        New fitted RandomForestClassifier
+    """
+    pruned = copy.deepcopy(model)
+    pruned.estimators_ = pruned.estimators_[:n_trees]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+def retrain_smaller(
+    model: RandomForestClassifier,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    n_trees: int,
+    max_depth: int
+) -> RandomForestClassifier:
+    """Fit a forest with the same settings but fewer and shallower trees."""
+    params = model.get_params()
+    params.update(n_estimators=n_trees, max_depth=max_depth)
+    smaller = RandomForestClassifier(**params)
+    smaller.fit(X_train, y_train)
+    return smaller
+
+
+def distill_tree(
+    model: RandomForestClassifier,
+    X_train: np.ndarray,
+    max_depth: int,
+    random_state: int = 42
+) -> RandomForestClassifier:
+    """
+    Distill the forest into one tree trained on the forest's own predictions.
+
+    The tree is wrapped as a one-tree forest (no bootstrap, all features), so
+    it loads, compiles and serves exactly like the full model.
+    """
+    student = RandomForestClassifier(
+        n_estimators=1,
+        max_depth=max_depth,
+        bootstrap=False,
+        max_features=None,
+        random_state=random_state
+    )
+    student.fit(X_train, model.predict(X_train))
+    return student
+
+
+def measure_model(model, X_test: np.ndarray, y_test: np.ndarray, latency_rows: int = 200) -> Dict:
+    """
+    Measure accuracy, serialized size, load time and single-row latency.
+
+    Latency is measured on the compiled (flattened) form used for serving.
+
+    Returns:
+        Dictionary with 'accuracy', 'size_bytes', 'load_ms', 'latency_us',
+        'n_trees', 'max_depth' and 'n_nodes'
+    """
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    size = buffer.tell()
+
+    buffer.seek(0)
+    started = time.perf_counter()
+    joblib.load(buffer)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    served = compile_forest(model)
+    rows = X_test[:latency_rows]
+    served.predict(rows[:1])
+    started = time.perf_counter()
+    for i in range(len(rows)):
+        served.predict(rows[i:i + 1])
+    latency_us = (time.perf_counter() - started) / max(len(rows), 1) * 1e6
+
+    return {
+        "accuracy": float(accuracy_score(y_test, model.predict(X_test))),
+        "size_bytes": size,
+        "load_ms": round(load_ms, 2),
+        "latency_us": round(latency_us, 1),
+        "n_trees": len(model.estimators_),
+        "max_depth": max(tree.tree_.max_depth for tree in model.estimators_),
+        "n_nodes": sum(tree.tree_.node_count for tree in model.estimators_)
+    }
+
+
+def compress_forest(
+    model: RandomForestClassifier,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_val: np.ndarray,
+    y_val: np.ndarray,
+    tolerance: float = 0.005,
+    tree_counts: Sequence[int] = (50, 25, 10),
+    depths: Sequence[int] = (8, 6, 4),
+    random_state: int = 42
+) -> Tuple[RandomForestClassifier, List[Dict]]:
+    """
+    Build compressed candidates and keep the smallest accurate one.
+
+    Args:
+        model: Fitted full forest
+        X_train, y_train: Training data (used to retrain and distill)
+        X_val, y_val: Validation data for the accuracy gate and measurements;
+            neither the training nor the test data
+        tolerance: Maximum accuracy drop accepted versus the full model
+        tree_counts: Tree counts tried for pruning and retraining
+        depths: Depths tried for retraining and distillation
+        random_state: Random seed for retrained candidates
+
+    Returns:
+        (chosen model, report) where the report has one entry per candidate
+        with its name, measurements and whether it passed the gate
+    """
+    X_train = np.asarray(X_train, dtype=np.float64)
+    X_val = np.asarray(X_val, dtype=np.float64)
+    y_train = np.asarray(y_train)
+    y_val = np.asarray(y_val)
+
+    candidates = [("full", model)]
+    for n_trees in tree_counts:
+        if n_trees < len(model.estimators_):
+            candidates.append((f"prune_{n_trees}_trees", prune_trees(model, n_trees)))
+    for n_trees in tree_counts:
+        for depth in depths:
+            candidates.append((
+                f"retrain_{n_trees}_trees_depth_{depth}",
+                retrain_smaller(model, X_train, y_train, n_trees, depth)
+            ))
+    for depth in depths:
+        candidates.append((f"distill_tree_depth_{depth}", distill_tree(model, X_train, depth, random_state)))
+
+    report = []
+    baseline: Optional[float] = None
+    for name, candidate in candidates:
+        metrics = measure_model(candidate, X_val, y_val)
+        if baseline is None:
+            baseline = metrics["accuracy"]
+        metrics["name"] = name
+        metrics["accepted"] = metrics["accuracy"] >= baseline - tolerance
+        report.append(metrics)
+        logger.info(
+            f"{name:32s} acc={metrics['accuracy']:.4f} size={metrics['size_bytes'] / 1024:.0f}kB "
+            f"load={metrics['load_ms']:.1f}ms latency={metrics['latency_us']:.0f}us "
+            f"{'accepted' if metrics['accepted'] else 'rejected'}"
+        )
+
+    accepted = [(entry, candidate) for entry, (_, candidate) in zip(report, candidates) if entry["accepted"]]
+    best_entry, best = min(
+        accepted,
+        key=lambda item: (item[0]["size_bytes"], item[0]["n_nodes"], item[0]["latency_us"])
+    )
+    best_entry["chosen"] = True
+    logger.info(f"Chosen model: {best_entry['name']} (accuracy {best_entry['accuracy']:.4f}, full {baseline:.4f})")
+    return best, report
@@ -5,9 +5,27 @@ Data fetching utilities for Open Food Facts API integration.
 import requests
 from typing import Dict, Optional
 from config import settings
+from utils.cache import TTLCache
 from utils.logger import logger
 
 
+# Successful lookups keyed by the barcode as requested
+product_cache = TTLCache(maxsize=settings.OFF_CACHE_SIZE, ttl=settings.OFF_CACHE_TTL)
+
+
+def is_product_cached(barcode: str) -> bool:
+    """
+    Check whether a barcode lookup can be served from the product cache.
+    
+    Args:
+        barcode: Product barcode
+        
+    Returns:
+        True if a live cached product exists for the barcode
+    """
+    return product_cache.contains(barcode.strip())
+
+
 def fetch_product_by_barcode(barcode: str) -> Optional[Dict]:
     """
     Fetch product information from Open Food Facts API using barcode.
@@ -19,6 +37,11 @@ def fetch_product_by_barcode(barcode: str) -> Optional[Dict]:
     Returns:
         Dictionary containing product data, or None if not found
     """
+    cached = product_cache.get(barcode.strip())
+    if cached is not None:
+        logger.debug(f"Product cache hit for barcode: {barcode}")
+        return cached
+    
     # Try the barcode as-is first
     barcode_variants = [barcode.strip()]
     
@@ -43,6 +66,7 @@ def fetch_product_by_barcode(barcode: str) -> Optional[Dict]:
             # Check if product was found
             if data.get('status') == 1:
                 logger.debug(f"Product found for barcode: {barcode_to_try}")
+                product_cache.set(barcode.strip(), data)
                 return data
             else:
                 logger.debug(f"Product not found for barcode: {barcode_to_try}")
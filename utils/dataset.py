@@ -0,0 +1,341 @@
+"""
+Training data ingestion for ScanLabel AI.
+
+Reads Open Food Facts exports (the CSV export or the JSONL dump) in
+bounded-size chunks, keeping only the columns training needs with compact
+dtypes, and cleans and labels each chunk as it arrives so a multi-GB export
+never has to fit in memory.
+"""
+
+import csv
+import gzip
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Deque, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from config import Settings
+from utils.logger import logger
+from utils.sampling import StratifiedReservoirSampler
+from utils.preprocess import (
+    FEATURE_DTYPE,
+    BarcodeDeduplicator,
+    clean_dataset,
+    create_health_label,
+    preprocess_api_data
+)
+from utils.scoring import FEATURE_ORDER, HEALTH_LABELS
+
+# OFF export columns read besides the model features
+ENERGY_KCAL_COLUMN = 'energy-kcal_100g'
+BARCODE_COLUMN = 'code'
+
+# Conversion used by preprocess_api_data when only kJ are reported
+KJ_PER_KCAL = 4.184
+
+
+def detect_separator(path: str) -> str:
+    """
+    Guess the field separator from the header line.
+
+    The OFF "CSV" export is tab-separated; hand-made extracts are usually comma-separated.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        header = f.readline()
+    return '\t' if header.count('\t') > header.count(',') else ','
+
+
+def csv_dtypes() -> Dict[str, object]:
+    """Compact dtypes for every column the loader reads."""
+    dtypes: Dict[str, object] = {name: FEATURE_DTYPE for name in FEATURE_ORDER}
+    dtypes[ENERGY_KCAL_COLUMN] = FEATURE_DTYPE
+    dtypes[BARCODE_COLUMN] = str
+    return dtypes
+
+
+def read_csv_chunks(
+    path: str,
+    chunk_size: int = 100_000,
+    max_rows: Optional[int] = None,
+    sep: Optional[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream raw rows from an OFF CSV export, reading only the needed columns.
+
+    Args:
+        path: CSV or TSV file
+        chunk_size: Rows per chunk
+        max_rows: Stop after this many rows (None reads the whole file)
+        sep: Field separator (detected from the header when None)
+
+    Yields:
+        DataFrames with at most chunk_size rows
+    """
+    sep = sep or detect_separator(path)
+    dtypes = csv_dtypes()
+    reader = pd.read_csv(
+        path,
+        sep=sep,
+        usecols=lambda name: name in dtypes,
+        dtype=dtypes,
+        chunksize=chunk_size,
+        nrows=max_rows,
+        # Product names in the OFF export contain stray quotes; fields are never quoted
+        quoting=csv.QUOTE_NONE if sep == '\t' else csv.QUOTE_MINIMAL,
+        on_bad_lines='skip',
+        encoding='utf-8',
+        encoding_errors='replace'
+    )
+    with reader:
+        yield from reader
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring a raw chunk to the model's feature layout.
+
+    Energy is taken in kcal, converting from kJ when only kJ is reported
+    (as preprocess_api_data does for live products). Missing feature columns
+    are filled with NaN so clean_dataset drops those rows.
+
+    Returns:
+        DataFrame with the FEATURE_ORDER columns as float32, plus 'code' if present
+    """
+    columns = {}
+    if BARCODE_COLUMN in chunk.columns:
+        columns[BARCODE_COLUMN] = chunk[BARCODE_COLUMN]
+    for name in FEATURE_ORDER:
+        if name in chunk.columns:
+            columns[name] = chunk[name].astype(FEATURE_DTYPE, copy=False)
+        else:
+            columns[name] = pd.Series(np.nan, index=chunk.index, dtype=FEATURE_DTYPE)
+
+    if ENERGY_KCAL_COLUMN in chunk.columns:
+        kcal = chunk[ENERGY_KCAL_COLUMN].astype(FEATURE_DTYPE, copy=False)
+        from_kj = (columns['energy_100g'] / KJ_PER_KCAL).astype(FEATURE_DTYPE)
+        columns['energy_100g'] = kcal.where(kcal > 0, from_kj)
+    elif 'energy_100g' in chunk.columns:
+        columns['energy_100g'] = (columns['energy_100g'] / KJ_PER_KCAL).astype(FEATURE_DTYPE)
+
+    return pd.DataFrame(columns, index=chunk.index)
+
+
+def is_jsonl(path: str) -> bool:
+    """Whether a path is a JSONL dump (optionally gzip-compressed) rather than a CSV export."""
+    return path.endswith(('.jsonl', '.jsonl.gz', '.json.gz'))
+
+
+def _open_lines(path: str) -> IO[bytes]:
+    """Open a dump for line-by-line reading, decompressing .gz on the fly."""
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def iter_jsonl_products(path: str, max_rows: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Stream product records from an OFF JSONL dump, one line at a time.
+
+    Malformed lines are skipped.
+
+    Args:
+        path: .jsonl or .jsonl.gz file
+        max_rows: Stop after this many lines (None reads the whole file)
+
+    Yields:
+        Product dictionaries as found in the dump
+    """
+    with _open_lines(path) as f:
+        for i, line in enumerate(f):
+            if max_rows is not None and i >= max_rows:
+                break
+            try:
+                product = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(product, dict):
+                yield product
+
+
+def parse_product_lines(lines: List[bytes]) -> Dict[str, np.ndarray]:
+    """
+    Parse raw JSONL lines into columns of model features.
+
+    Features are extracted with preprocess_api_data as for live scans, but
+    unreported nutrients stay NaN (not 0) so clean_dataset drops those rows
+    as 'missing', like empty CSV cells; products without any nutrition data
+    are skipped. Module-level so it can run in a worker process.
+
+    Returns:
+        Columns: 'code' (object) and FEATURE_ORDER (float32)
+    """
+    codes = []
+    rows = []
+    for line in lines:
+        try:
+            product = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(product, dict):
+            continue
+        try:
+            nutrition = preprocess_api_data({'product': product}, missing=np.nan)
+        except (AttributeError, TypeError, ValueError):
+            # Malformed nutriments or non-numeric values
+            continue
+        if nutrition is None:
+            continue
+        codes.append(str(product.get('code') or product.get('_id') or ''))
+        rows.append([nutrition[name] for name in FEATURE_ORDER])
+
+    values = np.array(rows, dtype=FEATURE_DTYPE).reshape(len(rows), len(FEATURE_ORDER))
+    columns = {BARCODE_COLUMN: np.array(codes, dtype=object)}
+    for i, name in enumerate(FEATURE_ORDER):
+        columns[name] = values[:, i]
+    return columns
+
+
+def _line_batches(path: str, batch_size: int, max_rows: Optional[int]) -> Iterator[List[bytes]]:
+    batch: List[bytes] = []
+    with _open_lines(path) as f:
+        for i, line in enumerate(f):
+            if max_rows is not None and i >= max_rows:
+                break
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def read_jsonl_batches(
+    path: str,
+    batch_size: int = 100_000,
+    max_rows: Optional[int] = None,
+    workers: int = 0
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream an OFF JSONL dump as columnar batches of model features.
+
+    Args:
+        path: .jsonl or .jsonl.gz file
+        batch_size: Lines parsed per batch
+        max_rows: Stop after this many lines (None reads the whole file)
+        workers: Worker processes for JSON parsing (0 parses in this process).
+            At most two batches per worker are in flight, so memory stays bounded.
+
+    Yields:
+        DataFrames with 'code' and the FEATURE_ORDER columns (float32), in file order
+    """
+    batches = _line_batches(path, batch_size, max_rows)
+    if workers <= 0:
+        for lines in batches:
+            yield pd.DataFrame(parse_product_lines(lines))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Future] = deque()
+        for lines in batches:
+            pending.append(pool.submit(parse_product_lines, lines))
+            if len(pending) >= workers * 2:
+                yield pd.DataFrame(pending.popleft().result())
+        while pending:
+            yield pd.DataFrame(pending.popleft().result())
+
+
+def iter_feature_chunks(
+    path: str,
+    chunk_size: int = 100_000,
+    max_rows: Optional[int] = None,
+    workers: int = 0
+) -> Iterator[pd.DataFrame]:
+    """Stream unlabeled feature chunks from a CSV export or a JSONL dump."""
+    if is_jsonl(path):
+        return read_jsonl_batches(path, chunk_size, max_rows, workers)
+    return (normalize_chunk(chunk) for chunk in read_csv_chunks(path, chunk_size, max_rows))
+
+
+def iter_training_chunks(
+    path: str,
+    chunk_size: int = 100_000,
+    max_rows: Optional[int] = None,
+    config: Optional[Settings] = None,
+    workers: int = 0,
+    report: Optional[Dict[str, int]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream cleaned, labeled training rows from an OFF CSV export or JSONL dump.
+
+    Products are deduplicated by barcode across the whole file, keeping the
+    first occurrence.
+
+    Args:
+        path: CSV/TSV export, or .jsonl(.gz) dump
+        chunk_size: Rows read per chunk
+        max_rows: Stop after this many raw rows (None reads the whole file)
+        config: Settings with the labeling thresholds (default: global settings)
+        workers: Worker processes for JSONL parsing (0 parses in this process)
+        report: Cleaning rule -> removed rows, updated as chunks are cleaned
+
+    Yields:
+        DataFrames with the feature columns (float32), 'health_label' (categorical)
+        and 'code' if present
+    """
+    deduplicator = BarcodeDeduplicator()
+    for chunk in iter_feature_chunks(path, chunk_size, max_rows, workers):
+        chunk = clean_dataset(chunk, inplace=True, deduplicator=deduplicator, report=report)
+        labeled = create_health_label(chunk, config, chunk_size=None, inplace=True, categorical=True)
+        if len(labeled):
+            yield labeled
+
+
+def load_training_data(
+    path: str,
+    chunk_size: int = 100_000,
+    max_rows: Optional[int] = None,
+    config: Optional[Settings] = None,
+    workers: int = 0,
+    sample_size: Optional[int] = None,
+    random_state: int = 42
+) -> pd.DataFrame:
+    """
+    Load an OFF CSV export or JSONL dump as a compact, cleaned and labeled training table.
+
+    Only the labeled feature rows are kept, so memory grows with the number
+    of usable products, not with the export size. With sample_size, the
+    whole file is read once and only a class-balanced sample is kept, so
+    memory is bounded by the sample size.
+
+    Args:
+        sample_size: Keep a stratified reservoir sample of this many rows (None keeps all)
+        random_state: Seed for the sample
+        (others as for iter_training_chunks)
+
+    Returns:
+        DataFrame with the feature columns (float32), 'health_label' (categorical)
+        and 'code' if present
+    """
+    parts: List[pd.DataFrame] = []
+    sampler = StratifiedReservoirSampler(sample_size, random_state=random_state) if sample_size else None
+    rows = 0
+    removed: Dict[str, int] = {}
+    for labeled in iter_training_chunks(path, chunk_size, max_rows, config, workers, removed):
+        if sampler is not None:
+            sampler.add(labeled)
+        else:
+            parts.append(labeled)
+        rows += len(labeled)
+        logger.info(f"Loaded {rows} usable rows from {path}")
+    logger.info(f"Rows removed by cleaning rule: {removed}")
+    if sampler is not None and rows:
+        sample = sampler.sample()
+        logger.info(
+            f"Sampled {len(sample)} of {rows} usable rows; per class "
+            f"{sample['health_label'].value_counts(sort=False).to_dict()} of {sampler.stats()['class_counts']}"
+        )
+        return sample
+    if not parts:
+        empty = {name: pd.Series(dtype=FEATURE_DTYPE) for name in FEATURE_ORDER}
+        empty['health_label'] = pd.Series(pd.Categorical([], categories=HEALTH_LABELS))
+        return pd.DataFrame(empty)
+    return pd.concat(parts, ignore_index=True)
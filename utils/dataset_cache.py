@@ -0,0 +1,216 @@
+"""
+On-disk cache of the cleaned, labeled training table.
+
+The table is stored column by column as .npy arrays plus meta.json (the
+same layout as the .forest model artifact), so a later run memory-maps it
+in milliseconds instead of re-reading and re-labeling the source data. Each
+cache entry is keyed by a fingerprint of the source data, the labeling
+thresholds and the loading parameters; any change gives a new key and the
+table is rebuilt. Only the most recently used entries are kept.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config import settings, Settings
+from utils.logger import logger
+from utils.scoring import FEATURE_ORDER, HEALTH_LABELS
+
+DATASET_SUFFIX = ".dataset"
+DATASET_FORMAT = 2
+
+# Bump when the synthetic generator in train_model.py changes
+SYNTHETIC_DATASET_VERSION = 1
+
+# Bump when the rules of preprocess.clean_dataset change
+CLEANING_VERSION = 1
+
+_THRESHOLD_FIELDS = (
+    "SUGAR_HEALTHY_THRESHOLD", "SUGAR_UNHEALTHY_THRESHOLD",
+    "FAT_HEALTHY_THRESHOLD", "FAT_UNHEALTHY_THRESHOLD",
+    "SALT_HEALTHY_THRESHOLD", "SALT_UNHEALTHY_THRESHOLD"
+)
+
+
+def source_fingerprint(path: Optional[str]) -> Dict:
+    """
+    Identify the source data without reading it.
+
+    A file is identified by its absolute path, size and modification time;
+    no path means the built-in synthetic dataset.
+    """
+    if not path:
+        return {"synthetic": SYNTHETIC_DATASET_VERSION}
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def dataset_key(source: Dict, config: Optional[Settings] = None, **params) -> str:
+    """
+    Cache key for a training table.
+
+    Args:
+        source: Result of source_fingerprint
+        config: Settings with the labeling thresholds (default: global settings)
+        **params: Loading parameters that change the table (e.g. max_rows)
+
+    Returns:
+        Hex digest identifying the table
+    """
+    config = config or settings
+    payload = {
+        "format": DATASET_FORMAT,
+        "source": source,
+        "cleaning": CLEANING_VERSION,
+        "thresholds": {name: getattr(config, name) for name in _THRESHOLD_FIELDS},
+        "params": params
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def dataset_path_for(cache_dir: str, key: str) -> str:
+    """Directory of the cache entry for a key."""
+    return os.path.join(cache_dir, key[:16] + DATASET_SUFFIX)
+
+
+def save_dataset(df: pd.DataFrame, path: str, key: str) -> None:
+    """
+    Save a labeled training table as a directory of .npy columns and meta.json.
+
+    meta.json is written last, so a partially written entry is never loaded.
+
+    Args:
+        df: Table with the FEATURE_ORDER columns, 'health_label' and optionally 'code'
+        path: Entry directory (created if missing)
+        key: Cache key recorded in meta.json
+    """
+    os.makedirs(path, exist_ok=True)
+    for name in FEATURE_ORDER:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(df[name].to_numpy(dtype=np.float32)))
+
+    labels = pd.Categorical(df['health_label'], categories=HEALTH_LABELS)
+    if (labels.codes < 0).any():
+        raise ValueError("Training table has unknown health labels")
+    np.save(os.path.join(path, "health_label.npy"), labels.codes.astype(np.int8))
+
+    columns = list(FEATURE_ORDER) + ["health_label"]
+    if "code" in df.columns:
+        # Fixed-width unicode so barcodes can be memory-mapped too and load back as str
+        np.save(os.path.join(path, "code.npy"), df["code"].astype(str).to_numpy(dtype="U"))
+        columns.append("code")
+
+    meta = {"format": DATASET_FORMAT, "key": key, "rows": len(df), "columns": columns}
+    tmp_path = os.path.join(path, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+
+def load_dataset(path: str, key: Optional[str] = None, mmap: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Load a cached training table.
+
+    Args:
+        path: Entry directory written by save_dataset
+        key: Expected cache key (None accepts any)
+        mmap: Memory-map the columns instead of reading them
+
+    Returns:
+        The table (features as float32, labels as a categorical over
+        HEALTH_LABELS, barcodes as str), or None if the entry is missing,
+        incomplete or for another key
+    """
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    if meta.get("format") != DATASET_FORMAT or (key is not None and meta.get("key") != key):
+        return None
+
+    mode = "r" if mmap else None
+    columns = {}
+    for name in meta["columns"]:
+        array = np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode))
+        if len(array) != meta["rows"]:
+            raise ValueError(f"Dataset cache {path} is corrupt ({name} has {len(array)} rows)")
+        if name == "health_label":
+            columns[name] = pd.Categorical.from_codes(array, categories=HEALTH_LABELS)
+        else:
+            columns[name] = array
+    # copy=False keeps each column backed by its memory-mapped file
+    return pd.DataFrame(columns, copy=False)
+
+
+def prune_datasets(cache_dir: str, keep: int) -> List[str]:
+    """
+    Delete all but the keep most recently used cache entries.
+
+    An entry's last use is the modification time of its meta.json, which
+    cached_dataset refreshes on every hit; entries without meta.json are
+    unfinished and count as oldest.
+
+    Args:
+        cache_dir: Cache directory
+        keep: Entries to keep
+
+    Returns:
+        Paths of the deleted entries
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    def last_used(path: str) -> float:
+        meta_path = os.path.join(path, "meta.json")
+        return os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0.0
+
+    entries = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if name.endswith(DATASET_SUFFIX) and os.path.isdir(os.path.join(cache_dir, name))
+    ]
+    entries.sort(key=last_used, reverse=True)
+    removed = entries[max(keep, 0):]
+    for path in removed:
+        shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"Removed old training data cache {path}")
+    return removed
+
+
+def cached_dataset(
+    build: Callable[[], pd.DataFrame],
+    cache_dir: str,
+    key: str,
+    mmap: bool = True,
+    keep: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Load the table for key from the cache, building and saving it on a miss.
+
+    Args:
+        build: Produces the cleaned, labeled table
+        cache_dir: Cache directory
+        key: Cache key (see dataset_key)
+        mmap: Memory-map cached columns
+        keep: Entries to keep in cache_dir, this one included (None keeps all)
+
+    Returns:
+        The training table
+    """
+    path = dataset_path_for(cache_dir, key)
+    df = load_dataset(path, key, mmap=mmap)
+    if df is not None:
+        logger.info(f"Loaded cached training data from {path} ({len(df)} rows)")
+        # Mark the entry as recently used so pruning keeps it
+        os.utime(os.path.join(path, "meta.json"))
+    else:
+        df = build()
+        save_dataset(df, path, key)
+        logger.info(f"Cached training data to {path}")
+
+    if keep is not None:
+        prune_datasets(cache_dir, max(keep, 1))
+    return df
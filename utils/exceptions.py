@@ -38,6 +38,19 @@ class PredictionError(ScanLabelException):
     pass
 
 
+class DatasetLoadError(ScanLabelException):
+    """Raised when a training data file cannot be read."""
+    pass
+
+
+class OverloadedError(ScanLabelException):
+    """Raised when a request is shed because the server is at capacity."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 
 
 
@@ -0,0 +1,436 @@
+"""
+Array-based evaluator for fitted RandomForestClassifier models.
+
+The forest is flattened into a handful of numpy node arrays (feature,
+threshold, children, leaf probabilities) and evaluated with plain numpy,
+skipping scikit-learn's per-call input validation and joblib dispatch.
+Results match RandomForestClassifier.predict_proba / predict.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from typing import List, Optional
+from utils.logger import logger
+
+
+# Rows evaluated at once in batch mode (bounds the (rows, trees) work arrays)
+BATCH_CHUNK_SIZE = 4096
+
+# From this many rows, scikit-learn's multi-threaded predict_proba is faster
+ESTIMATOR_BATCH_THRESHOLD = 512
+
+# On-disk artifact: a directory of .npy node arrays plus meta.json
+ARTIFACT_SUFFIX = ".forest"
+# Format 2 records each array's shape and dtype; format 1 artifacts are refused (their pickle is loaded instead)
+ARTIFACT_FORMAT = 2
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class FlatForest:
+    """
+    Flattened random forest.
+
+    All trees share one set of node arrays; node ids are global. Leaves are
+    their own children, so walking every tree for max_depth steps always
+    ends on a leaf without per-step masking.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        estimator=None
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        # Original scikit-learn model, if built from one
+        self.estimator = estimator
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """
+        Flatten a fitted RandomForestClassifier (single output).
+
+        Args:
+            model: Fitted sklearn.ensemble.RandomForestClassifier
+
+        Returns:
+            Equivalent FlatForest
+        """
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for tree_model in model.estimators_:
+            tree = tree_model.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            local_ids = np.arange(n, dtype=np.int64)
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, local_ids, tree.children_left).astype(np.int64) + offset)
+            rights.append(np.where(is_leaf, local_ids, tree.children_right).astype(np.int64) + offset)
+
+            # Per-tree class probabilities, normalized exactly like DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.array(roots, dtype=np.int64),
+            classes=np.asarray(model.classes_),
+            max_depth=int(max_depth),
+            n_features=int(model.n_features_in_),
+            estimator=model
+        )
+
+    def split_thresholds(self) -> List[np.ndarray]:
+        """
+        Sorted unique split thresholds of each feature.
+
+        Rows whose features fall between the same pair of consecutive
+        thresholds take the same path through every tree.
+        """
+        is_split = self.left != np.arange(self.n_nodes)
+        return [
+            np.unique(self.threshold[is_split & (self.feature == f)])
+            for f in range(self.n_features_in_)
+        ]
+
+    def fingerprint(self) -> str:
+        """
+        Short content hash of the forest (structure, thresholds and leaf values).
+
+        Computed once; a loaded artifact takes it from meta.json so its
+        memory-mapped arrays are not read just to be hashed.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for array in (self.feature, self.threshold, self.left, self.right, self.value, self.roots):
+                digest.update(np.ascontiguousarray(array).tobytes())
+            digest.update(repr([str(c) for c in self.classes_]).encode())
+            self._fingerprint = digest.hexdigest()[:12]
+        return self._fingerprint
+
+    def _validate(self, X) -> np.ndarray:
+        # scikit-learn evaluates trees on float32 inputs
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected features of shape (n, {self.n_features_in_}), got {X.shape}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        return X
+
+    def _leaves_one(self, row: np.ndarray) -> np.ndarray:
+        """Leaf node id in every tree for a single row."""
+        node = self.roots
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        for _ in range(self.max_depth):
+            node = np.where(row[feature[node]] <= threshold[node], left[node], right[node])
+        return node
+
+    def _leaves_batch(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node ids of shape (rows, trees) for a batch of rows."""
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        feature, threshold, left, right = self.feature, self.threshold, self.left, self.right
+        for _ in range(self.max_depth):
+            x = np.take_along_axis(X, feature[node], axis=1)
+            node = np.where(x <= threshold[node], left[node], right[node])
+        return node
+
+    def flat_proba(self, X) -> np.ndarray:
+        """Class probabilities from the flattened arrays only (no estimator fallback)."""
+        X = self._validate(X)
+        n_trees = len(self.roots)
+
+        if X.shape[0] == 1:
+            return (self.value[self._leaves_one(X[0])].sum(axis=0) / n_trees)[np.newaxis, :]
+
+        proba = np.empty((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], BATCH_CHUNK_SIZE):
+            chunk = X[start:start + BATCH_CHUNK_SIZE]
+            leaves = self._leaves_batch(chunk)
+            proba[start:start + len(chunk)] = self.value[leaves].sum(axis=1) / n_trees
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Class probabilities, averaged over trees.
+
+        Large batches are handed to the original estimator when available.
+
+        Args:
+            X: Features of shape (n, n_features) or (n_features,)
+
+        Returns:
+            Array of shape (n, n_classes), columns in classes_ order
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.estimator is not None and X.ndim == 2 and len(X) >= ESTIMATOR_BATCH_THRESHOLD:
+            return self.estimator.predict_proba(X)
+        return self.flat_proba(X)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predicted class labels.
+
+        Args:
+            X: Features of shape (n, n_features) or (n_features,)
+
+        Returns:
+            Array of n labels from classes_
+        """
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def verification_corpus(forest: FlatForest, n_random: int = 2000, seed: int = 0) -> np.ndarray:
+    """
+    Build rows that exercise the forest's splits: random rows over the
+    threshold range of each feature, plus rows sitting exactly on, just
+    below and just above split thresholds.
+
+    Args:
+        forest: Flattened forest
+        n_random: Number of random rows
+        seed: Random seed
+
+    Returns:
+        Float64 array of shape (m, n_features)
+    """
+    rng = np.random.default_rng(seed)
+    is_split = forest.left != np.arange(forest.n_nodes)
+    columns = []
+    for f in range(forest.n_features_in_):
+        thresholds = forest.threshold[is_split & (forest.feature == f)]
+        if len(thresholds) == 0:
+            thresholds = np.array([0.0])
+        low, high = thresholds.min(), thresholds.max()
+        span = max(high - low, 1.0)
+        random_values = rng.uniform(max(0.0, low - 0.5 * span), high + 0.5 * span, n_random)
+        edges = rng.choice(thresholds, n_random)
+        edges = edges + rng.choice([-1e-6, 0.0, 1e-6], n_random)
+        columns.append(np.concatenate([random_values, edges]))
+    return np.column_stack(columns)
+
+
+def verify_against(forest: FlatForest, model, X: Optional[np.ndarray] = None) -> bool:
+    """
+    Check that the flattened forest reproduces the scikit-learn model.
+
+    Args:
+        forest: Flattened forest
+        model: Original fitted model
+        X: Rows to compare on (defaults to verification_corpus)
+
+    Returns:
+        True if labels are identical and probabilities match to 1e-9
+    """
+    if X is None:
+        X = verification_corpus(forest)
+    X = np.asarray(X, dtype=np.float64)
+
+    expected_proba = model.predict_proba(X)
+    proba = forest.flat_proba(X)
+    if not np.allclose(proba, expected_proba, rtol=0, atol=1e-9):
+        return False
+    if not np.array_equal(forest.classes_.take(np.argmax(proba, axis=1)), model.predict(X)):
+        return False
+    # The single-row path is separate; check it on a sample too
+    for row in X[:: max(1, len(X) // 50)]:
+        if not np.allclose(forest.flat_proba(row), model.predict_proba(row.reshape(1, -1)), rtol=0, atol=1e-9):
+            return False
+    return True
+
+
+def compile_forest(model):
+    """
+    Replace a fitted RandomForestClassifier with a verified FlatForest.
+
+    Models that are not random forests, or whose flattened form does not
+    reproduce scikit-learn's output, are returned unchanged.
+
+    Args:
+        model: Fitted model
+
+    Returns:
+        FlatForest, or the original model
+    """
+    if model is None or type(model).__name__ != "RandomForestClassifier":
+        return model
+    try:
+        forest = FlatForest.from_sklearn(model)
+        if not verify_against(forest, model):
+            logger.warning("Flattened forest does not match scikit-learn output; using scikit-learn model")
+            return model
+        logger.info(
+            f"Compiled forest: {forest.n_estimators} trees, {forest.n_nodes} nodes, max depth {forest.max_depth}"
+        )
+        return forest
+    except Exception as e:
+        logger.warning(f"Could not compile forest, using scikit-learn model: {e}")
+        return model
+
+
+def artifact_path_for(model_path: str) -> str:
+    """Path of the flattened artifact that accompanies a pickled model."""
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def is_forest_artifact(path: str) -> bool:
+    """Check whether path is a saved FlatForest artifact."""
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def artifact_mtime(path: str) -> float:
+    """Modification time of a model file or artifact (meta.json is written last)."""
+    if is_forest_artifact(path):
+        return os.path.getmtime(os.path.join(path, "meta.json"))
+    return os.path.getmtime(path)
+
+
+def file_sha1(path: str) -> str:
+    """SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_artifact_meta(path: str) -> dict:
+    """Read a forest artifact's meta.json."""
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        return json.load(f)
+
+
+def save_forest(forest: FlatForest, path: str, source_path: Optional[str] = None) -> None:
+    """
+    Save a flattened forest as a directory of .npy arrays and meta.json.
+
+    The arrays can be memory-mapped by load_forest. The artifact is written
+    to a sibling directory and renamed into place, so a partially written
+    artifact is never picked up and processes that mapped the previous
+    arrays keep reading them unchanged.
+
+    Args:
+        forest: Flattened forest
+        path: Artifact directory (replaced if it exists)
+        source_path: Pickled model the forest was built from; its hash is
+            recorded so the artifact is only used while the pickle is unchanged
+    """
+    tmp_dir = f"{path}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in ARRAY_FIELDS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(getattr(forest, name)))
+
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "classes": [str(c) for c in forest.classes_],
+        "max_depth": forest.max_depth,
+        "n_features": forest.n_features_in_,
+        "fingerprint": forest.fingerprint(),
+        "source_sha1": file_sha1(source_path) if source_path else None,
+        # Checked against the .npy headers on load, without touching the data pages
+        "arrays": {
+            name: {"shape": list(getattr(forest, name).shape), "dtype": np.asarray(getattr(forest, name)).dtype.str}
+            for name in ARRAY_FIELDS
+        }
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # A directory cannot be renamed over a non-empty one; move the old artifact aside first
+    if os.path.isdir(path):
+        old_dir = f"{path}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(path, old_dir)
+        os.rename(tmp_dir, path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.rename(tmp_dir, path)
+
+
+def load_forest(path: str, mmap: bool = True) -> FlatForest:
+    """
+    Load a flattened forest artifact.
+
+    Only the .npy headers are checked against meta.json; the data pages are
+    not read until predictions need them. Whether the artifact still matches
+    its pickle is checked separately, through the source_sha1 in meta.json
+    (see utils.predict.load_model).
+
+    Args:
+        path: Artifact directory written by save_forest
+        mmap: Memory-map the arrays (pages are loaded on first use and
+            shared between processes through the page cache)
+
+    Returns:
+        FlatForest without a wrapped scikit-learn estimator
+
+    Raises:
+        ValueError: If the artifact format is unknown or its array shapes or dtypes do not match meta.json
+    """
+    meta = read_artifact_meta(path)
+    if meta.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported forest artifact format: {meta.get('format')}")
+
+    # np.asarray drops the memmap subclass (and its per-operation overhead) but keeps the mapping
+    arrays = {
+        name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        for name in ARRAY_FIELDS
+    }
+    forest = FlatForest(
+        classes=np.array(meta["classes"], dtype=object),
+        max_depth=int(meta["max_depth"]),
+        n_features=int(meta["n_features"]),
+        **arrays
+    )
+    for name in ARRAY_FIELDS:
+        array, expected = arrays[name], meta["arrays"][name]
+        if list(array.shape) != expected["shape"] or array.dtype.str != expected["dtype"]:
+            raise ValueError(f"Forest artifact {path} is corrupt ({name} does not match meta.json)")
+    forest._fingerprint = meta["fingerprint"]
+    return forest
@@ -0,0 +1,169 @@
+"""
+Hyperparameter search for the health classifier.
+
+Candidate forest configurations are evaluated in parallel worker processes
+with successive halving: every candidate is first trained on a small slice
+of the training data, and only the best 1/factor move on to the next round
+with factor times more data. Candidates are ranked on validation accuracy
+minus a penalty for measured per-row inference latency, so a slightly more
+accurate but much slower forest does not win.
+"""
+
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from utils.compression import measure_model
+from utils.logger import logger
+
+# Default search space
+DEFAULT_GRID = {
+    "n_estimators": [10, 25, 50, 100],
+    "max_depth": [4, 6, 8, 10, 14],
+    "min_samples_leaf": [1, 2, 5],
+    "max_features": ["sqrt", None]
+}
+
+
+def sample_configurations(
+    grid: Dict[str, Sequence],
+    n_candidates: Optional[int] = None,
+    random_state: int = 42
+) -> List[Dict]:
+    """
+    Candidate configurations from a parameter grid.
+
+    Args:
+        grid: Parameter name -> values to try
+        n_candidates: Random sample size (None or >= grid size: the full grid)
+        random_state: Seed for the sample
+
+    Returns:
+        List of parameter dictionaries
+    """
+    names = sorted(grid)
+    configurations = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    if n_candidates is not None and n_candidates < len(configurations):
+        configurations = random.Random(random_state).sample(configurations, n_candidates)
+    return configurations
+
+
+def candidate_score(metrics: Dict, latency_weight: float) -> float:
+    """Validation accuracy minus latency_weight per millisecond of single-row latency."""
+    return metrics["accuracy"] - latency_weight * metrics["latency_us"] / 1000.0
+
+
+def evaluate_candidate(
+    params: Dict,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_val: np.ndarray,
+    y_val: np.ndarray,
+    random_state: int = 42
+) -> Dict:
+    """
+    Fit one configuration and measure it (runs in a worker process).
+
+    Returns:
+        measure_model metrics plus 'params', 'train_rows' and 'fit_s'
+    """
+    model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - started
+
+    metrics = measure_model(model, X_val, y_val)
+    metrics.update(params=params, train_rows=len(X_train), fit_s=round(fit_s, 3))
+    return metrics
+
+
+def search_hyperparameters(
+    X: np.ndarray,
+    y: np.ndarray,
+    grid: Optional[Dict[str, Sequence]] = None,
+    n_candidates: Optional[int] = 24,
+    factor: int = 3,
+    min_rows: int = 1000,
+    validation_size: float = 0.25,
+    latency_weight: float = 0.01,
+    workers: int = 0,
+    random_state: int = 42
+) -> Tuple[Dict, List[Dict]]:
+    """
+    Find a good forest configuration with parallel successive halving.
+
+    Args:
+        X, y: Training data (a validation split is held out from it)
+        grid: Parameter grid (default: DEFAULT_GRID)
+        n_candidates: Configurations sampled from the grid (None: all)
+        factor: Candidates kept per round is 1/factor; rows grow by factor
+        min_rows: Training rows in the first round (at least)
+        validation_size: Share of X held out for scoring
+        latency_weight: Accuracy given up per millisecond of single-row latency
+        workers: Worker processes (0: one per CPU)
+        random_state: Seed for sampling, splitting and fitting
+
+    Returns:
+        (best parameters, report) where the report has one entry per
+        evaluation with its round, metrics and score
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    try:
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=validation_size, random_state=random_state, stratify=y
+        )
+    except ValueError:
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=validation_size, random_state=random_state
+        )
+
+    # Shuffle once so every round's slice is a random subsample and larger slices contain smaller ones
+    order = np.random.default_rng(random_state).permutation(len(X_train))
+    X_train, y_train = X_train[order], y_train[order]
+
+    candidates = sample_configurations(grid or DEFAULT_GRID, n_candidates, random_state)
+    n_rounds = 1
+    while factor ** n_rounds < len(candidates):
+        n_rounds += 1
+    rows = max(min(min_rows, len(X_train)), len(X_train) // factor ** (n_rounds - 1))
+
+    workers = workers or os.cpu_count() or 1
+    report: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for round_index in range(n_rounds):
+            rows = min(rows, len(X_train))
+            futures = [
+                pool.submit(evaluate_candidate, params, X_train[:rows], y_train[:rows], X_val, y_val, random_state)
+                for params in candidates
+            ]
+            results = [future.result() for future in futures]
+            for metrics in results:
+                metrics["round"] = round_index
+                metrics["score"] = round(candidate_score(metrics, latency_weight), 6)
+                report.append(metrics)
+                logger.info(
+                    f"round {round_index} rows={rows:<8d} {json.dumps(metrics['params'], sort_keys=True):70s} "
+                    f"acc={metrics['accuracy']:.4f} latency={metrics['latency_us']:.0f}us score={metrics['score']:.4f}"
+                )
+
+            ranked = sorted(results, key=lambda m: (-m["score"], m["latency_us"]))
+            keep = max(1, len(candidates) // factor)
+            candidates = [m["params"] for m in ranked[:keep]]
+            rows *= factor
+
+    best = candidates[0]
+    logger.info(f"Best configuration: {best}")
+    return best, report
+
+
+def write_search_report(path: str, best: Dict, report: List[Dict]) -> None:
+    """Write the search results as JSON."""
+    with open(path, "w") as f:
+        json.dump({"best_params": best, "evaluations": report}, f, indent=2, default=str)
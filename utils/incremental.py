@@ -0,0 +1,144 @@
+"""
+Incremental model updates for ScanLabel AI.
+
+Instead of retraining from scratch, new trees are grown on a bounded
+window of recent samples (e.g. products scanned through the API) mixed
+with a replay sample of the original training data. They are added to the
+existing forest with warm_start. When the forest grows past a cap, the
+oldest trees are dropped, so the model tracks a rolling window of data.
+"""
+
+import copy
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from utils.logger import logger
+from utils.preprocess import extract_features
+
+
+def build_update_window(
+    new_samples: pd.DataFrame,
+    replay: Optional[pd.DataFrame] = None,
+    window_size: int = 50_000,
+    replay_size: int = 20_000,
+    random_state: int = 42
+) -> pd.DataFrame:
+    """
+    Training window for an update: the newest samples plus a stratified replay sample.
+
+    The replay sample keeps every class present and anchors the new trees to
+    the original distribution.
+
+    Args:
+        new_samples: Labeled new samples, oldest first
+        replay: Labeled original training data
+        window_size: Newest samples kept
+        replay_size: Rows drawn from the replay data
+        random_state: Seed for the replay sample
+
+    Returns:
+        Labeled DataFrame with the feature columns and health_label
+    """
+    parts = [new_samples.tail(window_size)]
+    if replay is not None and len(replay) and replay_size > 0:
+        fraction = min(1.0, replay_size / len(replay))
+        parts.append(
+            replay.groupby('health_label', group_keys=False, observed=True)
+            .sample(frac=fraction, random_state=random_state)
+        )
+    columns = list(extract_features(parts[0].head(0)).columns) + ['health_label']
+    window = pd.concat([part[columns] for part in parts], ignore_index=True)
+    window['health_label'] = window['health_label'].astype(str)
+    return window
+
+
+def add_trees(
+    model: RandomForestClassifier,
+    X,
+    y: np.ndarray,
+    n_new_trees: int = 10,
+    max_trees: Optional[int] = 100,
+    tree_params: Optional[Dict] = None
+) -> RandomForestClassifier:
+    """
+    Grow n_new_trees on (X, y) and add them to a copy of the forest.
+
+    Args:
+        model: Fitted forest (left unchanged)
+        X, y: Update window; must contain every class of the model
+        n_new_trees: Trees to add
+        max_trees: Keep at most this many trees, dropping the oldest
+        tree_params: Forest parameters for the new trees (e.g. bootstrap,
+            max_features, max_depth). Needed when the model is a distilled
+            one-tree forest: without bootstrap or feature sampling, every
+            new tree would be the same tree.
+
+    Returns:
+        Updated forest
+
+    Raises:
+        ValueError: If the window's classes differ from the model's
+    """
+    if set(np.unique(y)) != set(model.classes_):
+        raise ValueError(f"Update window classes {sorted(set(np.unique(y)))} differ from model classes {list(model.classes_)}")
+
+    updated = copy.deepcopy(model)
+    updated.set_params(**(tree_params or {}))
+    updated.set_params(warm_start=True, n_estimators=len(updated.estimators_) + n_new_trees)
+    updated.fit(X, y)
+    updated.set_params(warm_start=False)
+
+    if max_trees is not None and len(updated.estimators_) > max_trees:
+        updated.estimators_ = updated.estimators_[-max_trees:]
+        updated.n_estimators = len(updated.estimators_)
+    return updated
+
+
+def incremental_update(
+    model: RandomForestClassifier,
+    new_samples: pd.DataFrame,
+    replay: Optional[pd.DataFrame] = None,
+    holdout: Optional[pd.DataFrame] = None,
+    n_new_trees: int = 10,
+    max_trees: Optional[int] = 100,
+    window_size: int = 50_000,
+    replay_size: int = 20_000,
+    random_state: int = 42,
+    tree_params: Optional[Dict] = None
+) -> Tuple[RandomForestClassifier, Dict]:
+    """
+    Update a forest with new samples.
+
+    Args:
+        model: Fitted forest
+        new_samples: Labeled new samples, oldest first
+        replay: Labeled original training data
+        holdout: Labeled data for before/after accuracy (default: the update window)
+        n_new_trees, max_trees, tree_params: See add_trees
+        window_size, replay_size: See build_update_window
+        random_state: Seed for the replay sample
+
+    Returns:
+        (updated forest, report with window size, tree counts and accuracies)
+    """
+    window = build_update_window(new_samples, replay, window_size, replay_size, random_state)
+    # DataFrames keep the feature names the forest was fitted with
+    X = extract_features(window)
+    y = window['health_label'].values
+    updated = add_trees(model, X, y, n_new_trees, max_trees, tree_params)
+
+    evaluation = window if holdout is None else holdout
+    X_eval = extract_features(evaluation)
+    y_eval = np.asarray(evaluation['health_label']).astype(str)
+    report = {
+        "new_samples": int(min(len(new_samples), window_size)),
+        "window_rows": len(window),
+        "trees_before": len(model.estimators_),
+        "trees_after": len(updated.estimators_),
+        "accuracy_before": float(accuracy_score(y_eval, model.predict(X_eval))),
+        "accuracy_after": float(accuracy_score(y_eval, updated.predict(X_eval)))
+    }
+    logger.info(f"Incremental update: {report}")
+    return updated, report
@@ -0,0 +1,255 @@
+"""
+Background job execution for slow requests (e.g. AI alternatives).
+Jobs run on a bounded worker pool in the process that accepted them; their
+records are kept in a store every worker process can read (a SQLite file),
+so a poll answered by another worker still finds the job.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from fastapi import HTTPException
+from config import settings, Settings
+from utils.cache import TTLCache
+from utils.exceptions import OverloadedError
+from utils.logger import logger
+
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# How often a worker that does not own a job re-reads its record while long-polling
+_POLL_INTERVAL = 0.2
+
+
+class SqliteJobStore:
+    """
+    Job records shared between worker processes through a SQLite file.
+
+    Records are stored as JSON with an expiry time. A connection is opened
+    per operation, so the store is safe to use across threads and forks.
+    The file is only created on first use, so importing the app writes nothing.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with sqlite3.connect(self.path, timeout=5.0) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, record TEXT NOT NULL, expires_at REAL NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+            self._ready = True
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def set(self, job_id: str, record: Dict) -> None:
+        """Store a record, restarting its TTL, and drop expired ones."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, record, expires_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(record, default=str), now + self.ttl)
+            )
+            conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the record, or None if unknown or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+
+class JobManager:
+    """
+    Runs callables on a worker pool and stores their results with a TTL.
+
+    At most max_pending jobs may be queued or running at once; further
+    submissions are rejected with OverloadedError.
+
+    Without store_path, records live in this process only, which is enough
+    for a single worker process.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_pending: int,
+        result_ttl: float,
+        max_jobs: int = 10000,
+        store_path: Optional[str] = None
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+
+        self._executor = None
+        self._jobs = SqliteJobStore(store_path, result_ttl) if store_path else TTLCache(maxsize=max_jobs, ttl=result_ttl)
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so forked worker processes start their own threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scanlabel-job")
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        return len(self._futures)
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> Dict:
+        """
+        Submit a job to the worker pool.
+
+        Args:
+            kind: Job type, stored on the record (e.g. 'alternatives')
+            fn: Callable returning a JSON-serializable result
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            The new job record
+
+        Raises:
+            OverloadedError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                self.rejected += 1
+                raise OverloadedError(
+                    f"Too many pending jobs ({len(self._futures)})",
+                    retry_after=settings.ADMISSION_RETRY_AFTER
+                )
+
+            job_id = uuid.uuid4().hex
+            record = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": QUEUED,
+                "created_at": time.time(),
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._jobs.set(job_id, dict(record))
+            self.submitted += 1
+            self._futures[job_id] = self._get_executor().submit(self._run, record, fn, args, kwargs)
+
+        logger.info(f"Job {job_id} ({kind}) submitted")
+        return dict(record)
+
+    def _run(self, record: Dict, fn: Callable, args, kwargs) -> None:
+        job_id = record["job_id"]
+        record["status"] = RUNNING
+        self._jobs.set(job_id, dict(record))
+        try:
+            record["result"] = fn(*args, **kwargs)
+            record["status"] = SUCCEEDED
+            self.succeeded += 1
+        except HTTPException as e:
+            record["error"] = {"status_code": e.status_code, "detail": e.detail}
+            record["status"] = FAILED
+            self.failed += 1
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            record["error"] = {"status_code": 500, "detail": str(e)}
+            record["status"] = FAILED
+            self.failed += 1
+        finally:
+            record["finished_at"] = time.time()
+            # Restart the TTL from completion so results stay pollable for result_ttl
+            self._jobs.set(job_id, dict(record))
+            with self._lock:
+                self._futures.pop(job_id, None)
+            logger.info(f"Job {job_id} {record['status']}")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a snapshot of the job record, or None if unknown or expired."""
+        record = self._jobs.get(job_id)
+        return dict(record) if record is not None else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """
+        Wait up to timeout seconds for a job to finish, without blocking the event loop.
+
+        Jobs run by this process are awaited directly; jobs owned by another
+        worker process are re-read from the shared store until they finish.
+
+        Returns:
+            The job record (finished or not), or None if unknown or expired
+        """
+        future = self._futures.get(job_id)
+        if future is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.get(job_id)
+
+        deadline = time.monotonic() + timeout
+        record = self.get(job_id)
+        while record is not None and record["status"] in (QUEUED, RUNNING) and time.monotonic() < deadline:
+            await asyncio.sleep(min(_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            record = self.get(job_id)
+        return record
+
+    def shutdown(self) -> None:
+        """Stop the worker pool without waiting for running jobs."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        """Return pool load and job counters."""
+        return {
+            "pending": len(self._futures),
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "stored": len(self._jobs),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+
+def build_job_manager(config: Optional[Settings] = None) -> JobManager:
+    """Build a JobManager from settings."""
+    config = config or settings
+    return JobManager(
+        max_workers=config.JOBS_MAX_WORKERS,
+        max_pending=config.JOBS_MAX_PENDING,
+        result_ttl=config.JOBS_RESULT_TTL,
+        store_path=os.path.join(config.DATA_DIR, config.JOBS_STORE_PATH) if config.JOBS_STORE_PATH else None
+    )
+
+
+# Default job manager built from the global settings
+jobs = build_job_manager()
@@ -0,0 +1,422 @@
+"""
+Versioned model registry with hot reload and rollback.
+
+The registry owns the serving model. New models are loaded and validated
+off the request path, then swapped in with a single reference assignment,
+so in-flight requests finish on the version they started with. Recently
+active versions stay in memory for instant rollback.
+
+Each forked worker has its own registry. Admin actions (reload, rollback,
+promote) are written to a pin file that every worker's watcher applies, so
+they reach the whole fleet; a model file newer than the pin supersedes it.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import settings, Settings
+from utils.exceptions import ModelLoadError
+from utils.fast_forest import ARTIFACT_SUFFIX, FlatForest, artifact_mtime, artifact_path_for, file_sha1, is_forest_artifact
+from utils.logger import logger
+from utils.predict import load_model, predict_health_batch
+from utils.scoring import FEATURE_ORDER, HEALTH_LABELS
+
+
+# File in MODEL_DIR holding the version admin actions pinned for all workers
+MODEL_PIN_FILE = "active_model.json"
+
+# Rows every candidate model must be able to classify (healthy, moderate, unhealthy)
+VALIDATION_ROWS = np.array([
+    [50.0, 0.5, 1.0, 0.05, 2.0, 1.0],
+    [200.0, 5.0, 7.0, 0.5, 1.0, 5.0],
+    [550.0, 30.0, 50.0, 0.2, 3.0, 6.0],
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+])
+
+
+class ModelVersion:
+    """A loaded, validated model and where it came from."""
+
+    def __init__(self, version: str, model, path: str, mtime: float, load_ms: float = 0.0):
+        self.version = version
+        self.model = model
+        self.path = path
+        self.mtime = mtime
+        self.load_ms = load_ms
+        self.loaded_at = time.time()
+
+    def describe(self) -> Dict:
+        """JSON-friendly summary of this version."""
+        return {
+            "version": self.version,
+            "path": self.path,
+            "type": type(self.model).__name__,
+            "file_mtime": self.mtime,
+            "load_ms": round(self.load_ms, 2),
+            "loaded_at": self.loaded_at
+        }
+
+
+def model_version_id(model, path: str) -> str:
+    """
+    Version identifier for a model: the forest fingerprint for random
+    forests (the same id keys the prediction cache), otherwise a hash of
+    the model file.
+    """
+    try:
+        forest = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+        return forest.fingerprint()
+    except Exception:
+        return file_sha1(path)[:12]
+
+
+def source_mtime(path: str) -> float:
+    """Modification time of a model source, including a pickle's sibling forest artifact."""
+    mtime = artifact_mtime(path)
+    artifact = artifact_path_for(path)
+    if artifact != path and is_forest_artifact(artifact):
+        mtime = max(mtime, artifact_mtime(artifact))
+    return mtime
+
+
+def validate_model(model) -> None:
+    """
+    Check that a model can serve health predictions.
+
+    Raises:
+        ValueError: If the model has the wrong features, unknown labels or fails to predict
+    """
+    n_features = getattr(model, "n_features_in_", len(FEATURE_ORDER))
+    if n_features != len(FEATURE_ORDER):
+        raise ValueError(f"Model expects {n_features} features, need {len(FEATURE_ORDER)}")
+
+    classes = getattr(model, "classes_", None)
+    if classes is None or not set(map(str, classes)) <= set(HEALTH_LABELS):
+        raise ValueError(f"Model classes {classes} are not health labels")
+
+    labels = predict_health_batch(VALIDATION_ROWS, model)
+    if len(labels) != len(VALIDATION_ROWS) or not set(map(str, labels)) <= set(HEALTH_LABELS):
+        raise ValueError(f"Model produced invalid labels {list(labels)}")
+
+
+class ModelRegistry:
+    """
+    Holds the active model version, loads new ones and rolls back.
+
+    Sources are MODEL_PATH and any *.pkl or *.forest in the models
+    directory; the most recently modified one is the candidate. A watcher
+    thread (per process) polls the sources and loads a candidate when it
+    changes. With lazy=True nothing is loaded until get() is first called.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        models_dir: Optional[str] = None,
+        fast: bool = True,
+        watch_interval: float = 0.0,
+        keep: int = 3,
+        lazy: bool = False,
+        pin_path: Optional[str] = None
+    ):
+        self.model_path = model_path
+        self.models_dir = models_dir
+        self.fast = fast
+        self.watch_interval = watch_interval
+        self.keep = keep
+        self.lazy = lazy
+        self.pin_path = pin_path
+
+        self._current: Optional[ModelVersion] = None
+        self._history: List[ModelVersion] = []
+        # Reentrant: reload and rollback activate while holding it
+        self._load_lock = threading.RLock()
+        self._lazy_lock = threading.Lock()
+        self._seen: Optional[Tuple[str, float]] = None
+        # Pin that failed to load, so it is not retried on every check
+        self._failed_pin: Optional[Tuple[str, float]] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._watcher_pid: Optional[int] = None
+        self._stop = threading.Event()
+
+        # Statistics
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.rollbacks = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> Optional[ModelVersion]:
+        """Active version. Read it once per request and use that snapshot throughout."""
+        return self._current
+
+    def get(self) -> Optional[ModelVersion]:
+        """
+        Active version, loading it first if the registry is lazy and nothing
+        is loaded yet. May block on disk I/O; call it from a worker thread.
+        """
+        current = self._current
+        if current is not None or not self.lazy:
+            return current
+        with self._lazy_lock:
+            if self._current is None:
+                self.check_for_update()
+        return self._current
+
+    @property
+    def model(self):
+        current = self._current
+        return current.model if current is not None else None
+
+    @property
+    def version(self) -> Optional[str]:
+        current = self._current
+        return current.version if current is not None else None
+
+    def sources(self) -> List[str]:
+        """Model files the registry may load, newest first."""
+        paths = [self.model_path] if os.path.exists(self.model_path) else []
+        if self.models_dir and os.path.isdir(self.models_dir):
+            paths += glob.glob(os.path.join(self.models_dir, "*.pkl"))
+            paths += [p for p in glob.glob(os.path.join(self.models_dir, f"*{ARTIFACT_SUFFIX}")) if is_forest_artifact(p)]
+        return sorted(set(paths), key=source_mtime, reverse=True)
+
+    def load(self, path: str) -> ModelVersion:
+        """
+        Load and validate a model file without activating it.
+
+        Args:
+            path: Model file
+
+        Returns:
+            The loaded ModelVersion
+
+        Raises:
+            ModelLoadError: If the file cannot be loaded or fails validation
+        """
+        mtime = source_mtime(path) if os.path.exists(path) else 0.0
+        started = time.perf_counter()
+        model = load_model(path, fast=self.fast)
+        load_ms = (time.perf_counter() - started) * 1000
+        if model is None:
+            raise ModelLoadError(f"Could not load model from {path}")
+        try:
+            validate_model(model)
+        except Exception as e:
+            raise ModelLoadError(f"Model {path} failed validation: {e}") from e
+        return ModelVersion(model_version_id(model, path), model, path, mtime, load_ms)
+
+    def read_pin(self) -> Optional[Dict]:
+        """The pinned version ({'version', 'path', 'pinned_at'}), or None if nothing is pinned."""
+        if not self.pin_path or not os.path.exists(self.pin_path):
+            return None
+        try:
+            with open(self.pin_path, "r") as f:
+                pin = json.load(f)
+            return pin if {"version", "path", "pinned_at"} <= set(pin) else None
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read model pin {self.pin_path}: {e}")
+            return None
+
+    def _write_pin(self, version: ModelVersion) -> None:
+        if not self.pin_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.pin_path)), exist_ok=True)
+        pin = {"version": version.version, "path": version.path, "pinned_at": time.time()}
+        tmp_path = f"{self.pin_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(pin, f, indent=2)
+        os.replace(tmp_path, self.pin_path)
+
+    def _effective_pin(self, sources: List[str]) -> Optional[Dict]:
+        """The pin, unless a model file was written after it."""
+        pin = self.read_pin()
+        if pin is None or (sources and source_mtime(sources[0]) > pin["pinned_at"]):
+            return None
+        return pin
+
+    def _apply_pin(self, pin: Dict) -> Optional[ModelVersion]:
+        """Activate the pinned version, from history or from its file; None if already active or it fails."""
+        current = self._current
+        if current is not None and current.version == pin["version"]:
+            return None
+        key = (pin["version"], pin["pinned_at"])
+        if key == self._failed_pin:
+            return None
+        with self._load_lock:
+            kept = [v for v in self._history if v.version == pin["version"]]
+            if kept:
+                return self.activate(kept[-1])
+            try:
+                candidate = self.load(pin["path"])
+                if candidate.version != pin["version"]:
+                    raise ModelLoadError(
+                        f"Pinned model {pin['path']} is version {candidate.version}, not {pin['version']}"
+                    )
+            except ModelLoadError as e:
+                self._failed_pin = key
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                logger.error(str(e))
+                return None
+            self._seen = (pin["path"], candidate.mtime)
+            self.reloads += 1
+            self.last_error = None
+            return self.activate(candidate)
+
+    def activate(self, candidate: ModelVersion, pin: bool = False) -> ModelVersion:
+        """
+        Swap a loaded version in; the previous one is kept for rollback.
+
+        Args:
+            candidate: Loaded version
+            pin: Also pin it, so every worker's watcher switches to it
+        """
+        with self._load_lock:
+            if pin:
+                self._write_pin(candidate)
+            previous = self._current
+            if previous is not None and previous.version == candidate.version:
+                return previous
+            self._history = [v for v in self._history if v.version != candidate.version]
+            if previous is not None:
+                self._history.append(previous)
+                self._history = self._history[-self.keep:]
+            # Single reference assignment: requests see either the old or the new version
+            self._current = candidate
+            logger.info(f"Activated model {candidate.version} from {candidate.path}")
+            return candidate
+
+    def reload(self, path: Optional[str] = None, pin: bool = False) -> ModelVersion:
+        """
+        Load a model (by default the pinned version, else the newest source) and activate it.
+
+        Args:
+            path: Model file or artifact
+            pin: Also pin it, so every worker's watcher switches to it
+
+        Raises:
+            ModelLoadError: If there is nothing to load or validation fails;
+                the active version is left unchanged
+        """
+        with self._load_lock:
+            if path is None:
+                sources = self.sources()
+                pinned = self._effective_pin(sources)
+                if pinned is not None:
+                    path = pinned["path"]
+                elif sources:
+                    path = sources[0]
+                else:
+                    raise ModelLoadError(f"No model file found at {self.model_path}")
+            try:
+                candidate = self.load(path)
+            except ModelLoadError as e:
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                logger.error(str(e))
+                raise
+            self._seen = (path, candidate.mtime)
+            self.reloads += 1
+            self.last_error = None
+            return self.activate(candidate, pin=pin)
+
+    def rollback(self, version: Optional[str] = None, pin: bool = False) -> ModelVersion:
+        """
+        Reactivate a previously active version (by default the last one).
+
+        Args:
+            version: Version to restore
+            pin: Also pin it, so every worker's watcher switches to it
+
+        Raises:
+            ModelLoadError: If no such version is kept
+        """
+        with self._load_lock:
+            candidates = [v for v in self._history if version is None or v.version == version]
+            if not candidates:
+                wanted = f"version {version}" if version else "model version"
+                raise ModelLoadError(f"No previous {wanted} to roll back to")
+            target = candidates[-1]
+            self.rollbacks += 1
+            return self.activate(target, pin=pin)
+
+    def check_for_update(self) -> Optional[ModelVersion]:
+        """Apply the pin, or else load the newest source if it changed since it was last seen."""
+        sources = self.sources()
+        pinned = self._effective_pin(sources)
+        if pinned is not None:
+            return self._apply_pin(pinned)
+        if not sources:
+            return None
+        newest = (sources[0], source_mtime(sources[0]))
+        if newest == self._seen:
+            return None
+        try:
+            return self.reload(newest[0])
+        except ModelLoadError:
+            # Don't retry a bad file until it changes again
+            self._seen = newest
+            return None
+
+    def start_watching(self) -> None:
+        """Start the watcher thread in this process (no-op if disabled or running)."""
+        if self.watch_interval <= 0:
+            return
+        if self._watcher is not None and self._watcher_pid == os.getpid():
+            return
+        # Threads do not survive fork; each worker starts its own watcher
+        self._stop = threading.Event()
+        self._watcher_pid = os.getpid()
+        self._watcher = threading.Thread(target=self._watch, name="scanlabel-model-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        """Stop the watcher thread."""
+        self._stop.set()
+        self._watcher = None
+
+    def _watch(self) -> None:
+        stop = self._stop
+        while not stop.wait(self.watch_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+    def stats(self) -> Dict:
+        """Active version, kept versions and reload counters."""
+        current = self._current
+        return {
+            "current": current.describe() if current is not None else None,
+            "history": [v.describe() for v in reversed(self._history)],
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "rollbacks": self.rollbacks,
+            "last_error": self.last_error,
+            "pin": self.read_pin(),
+            "lazy": self.lazy,
+            "watching": self._watcher is not None and self._watcher_pid == os.getpid()
+        }
+
+
+def build_model_registry(config: Optional[Settings] = None) -> ModelRegistry:
+    """Build a ModelRegistry from settings."""
+    config = config or settings
+    return ModelRegistry(
+        model_path=config.MODEL_PATH,
+        models_dir=config.MODEL_DIR,
+        fast=config.MODEL_FAST_INFERENCE,
+        watch_interval=config.MODEL_WATCH_INTERVAL,
+        keep=config.MODEL_HISTORY_SIZE,
+        lazy=config.MODEL_LAZY_LOAD,
+        pin_path=os.path.join(config.MODEL_DIR, MODEL_PIN_FILE)
+    )
+
+
+# Default registry built from the global settings
+registry = build_model_registry()
@@ -2,20 +2,30 @@
 Model prediction utilities for health classification.
 """
 
-import joblib
 import numpy as np
-import pandas as pd
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence, Tuple, Union
 import os
+from utils.exceptions import PredictionError
+from utils.fast_forest import (
+    artifact_path_for, compile_forest, file_sha1, is_forest_artifact, load_forest, read_artifact_meta
+)
 from utils.logger import logger
+from utils.scoring import FEATURE_ORDER
 
 
-def load_model(model_path: str = 'model.pkl') -> Optional[object]:
+def load_model(model_path: str = 'model.pkl', fast: bool = False) -> Optional[object]:
     """
     Load the trained machine learning model from disk.
     
+    model_path may be a pickled model or a flattened forest artifact
+    (a '.forest' directory), which is memory-mapped. With fast=True, a
+    pickle's sibling artifact is used instead if it was exported from
+    that exact pickle.
+    
     Args:
-        model_path: Path to the saved model file
+        model_path: Path to the saved model file or forest artifact
+        fast: Serve a flattened forest (from the artifact, or compiled and
+            verified from the pickled RandomForestClassifier)
         
     Returns:
         Loaded model object, or None if loading fails
@@ -25,15 +35,104 @@ def load_model(model_path: str = 'model.pkl') -> Optional[object]:
             logger.error(f"Model file not found at {model_path}")
             return None
         
+        artifact = model_path if is_forest_artifact(model_path) else artifact_path_for(model_path)
+        if is_forest_artifact(artifact) and (artifact == model_path or (fast and _exported_from(artifact, model_path))):
+            logger.info(f"Loading forest artifact from {artifact}")
+            try:
+                return load_forest(artifact)
+            except Exception as e:
+                if artifact == model_path:
+                    raise
+                logger.warning(f"Could not load forest artifact {artifact}, falling back to {model_path}: {e}")
+        
+        # joblib (and scikit-learn, when unpickling) are only imported for pickled models
+        import joblib
+        
         logger.info(f"Loading model from {model_path}")
         model = joblib.load(model_path)
         logger.info("Model loaded successfully")
+        if fast:
+            model = compile_forest(model)
         return model
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         return None
 
 
+def _exported_from(artifact: str, model_path: str) -> bool:
+    """Check that a forest artifact was exported from this exact pickle."""
+    try:
+        return read_artifact_meta(artifact).get("source_sha1") == file_sha1(model_path)
+    except (OSError, ValueError):
+        return False
+
+
+def features_to_matrix(data: Union[np.ndarray, Sequence[Dict]]) -> np.ndarray:
+    """
+    Build a 2-D float feature matrix in FEATURE_ORDER.
+    
+    Args:
+        data: Array of shape (n, 6) or (6,), or a sequence of nutrition dictionaries
+        
+    Returns:
+        Float64 array of shape (n, 6)
+    """
+    if isinstance(data, np.ndarray):
+        X = np.asarray(data, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+    else:
+        X = np.array(
+            [[row.get(col, 0) or 0 for col in FEATURE_ORDER] for row in data],
+            dtype=np.float64
+        ).reshape(-1, len(FEATURE_ORDER))
+    
+    if X.ndim != 2 or X.shape[1] != len(FEATURE_ORDER):
+        raise ValueError(f"Expected features of shape (n, {len(FEATURE_ORDER)}), got {X.shape}")
+    return X
+
+
+def predict_health_batch(
+    data: Union[np.ndarray, Sequence[Dict]],
+    model,
+    return_proba: bool = False
+) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Predict health labels for many products in one model call.
+    
+    Args:
+        data: Feature array of shape (n, 6) in FEATURE_ORDER, or a sequence of nutrition dictionaries
+        model: Trained scikit-learn classifier
+        return_proba: Also return class probabilities
+        
+    Returns:
+        Array of n labels, or (labels, probabilities) where probabilities has
+        shape (n, n_classes) with columns in model.classes_ order
+        
+    Raises:
+        PredictionError: If the model is missing or prediction fails
+    """
+    if model is None:
+        raise PredictionError("No model loaded")
+    
+    try:
+        X = features_to_matrix(data)
+        if len(X) == 0:
+            labels = np.empty(0, dtype=object)
+            if return_proba:
+                return labels, np.empty((0, len(model.classes_)))
+            return labels
+        
+        if return_proba:
+            proba = model.predict_proba(X)
+            labels = model.classes_.take(np.argmax(proba, axis=1))
+            return labels, proba
+        
+        return model.predict(X)
+    except Exception as e:
+        raise PredictionError(f"Error making batch prediction: {e}") from e
+
+
 def predict_health(nutrition_data: Dict, model) -> Optional[str]:
     """
     Predict health label for a product based on nutrition data.
@@ -49,26 +148,10 @@ def predict_health(nutrition_data: Dict, model) -> Optional[str]:
         return None
     
     try:
-        # Extract features in the correct order
-        feature_order = [
-            'energy_100g',
-            'fat_100g',
-            'sugars_100g',
-            'salt_100g',
-            'fiber_100g',
-            'proteins_100g'
-        ]
-        
-        # Create feature array
-        features = np.array([[nutrition_data.get(col, 0) for col in feature_order]])
-        
-        # Make prediction
-        prediction = model.predict(features)[0]
-        
+        prediction = str(predict_health_batch([nutrition_data], model)[0])
         logger.debug(f"Prediction made: {prediction}")
         return prediction
         
-    except Exception as e:
+    except PredictionError as e:
         logger.error(f"Error making prediction: {e}")
         return None
-
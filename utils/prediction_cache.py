@@ -0,0 +1,110 @@
+"""
+Memoization of model predictions.
+
+A tree ensemble only compares each feature against its split thresholds, so
+every row falling between the same consecutive thresholds gets the same
+prediction. Rows are keyed by those threshold intervals, which makes the
+cache exact while still merging near-identical nutrition profiles.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import settings, Settings
+from utils.cache import TTLCache
+from utils.fast_forest import FlatForest
+from utils.logger import logger
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predicted labels, keyed by quantized feature rows.
+
+    The cache is bound to one model at a time and cleared when a model with
+    a different version is seen. Models that are not tree forests are not
+    cached.
+    """
+
+    def __init__(self, maxsize: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=None)
+        self._lock = threading.Lock()
+        self._model = None
+        self._version: Optional[str] = None
+        self._edges: Optional[List[np.ndarray]] = None
+        self.invalidations = 0
+
+    def _bind(self, model) -> Tuple[Optional[str], Optional[List[np.ndarray]]]:
+        """Return (version, split thresholds) for model, rebinding (and clearing) on a model change."""
+        with self._lock:
+            if model is self._model:
+                return self._version, self._edges
+            version, edges = None, None
+            try:
+                forest = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+                version, edges = forest.fingerprint(), forest.split_thresholds()
+            except Exception:
+                # Not a random forest: predictions are not memoized
+                pass
+
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                    logger.info(f"Model changed ({self._version} -> {version}), clearing prediction cache")
+                self._cache.clear()
+            self._model, self._version, self._edges = model, version, edges
+            return version, edges
+
+    def key(self, row: np.ndarray, model) -> Optional[Tuple[str, bytes]]:
+        """
+        Quantize one feature row to its threshold intervals.
+
+        Args:
+            row: Features in FEATURE_ORDER, shape (n_features,) or (1, n_features)
+            model: Model the prediction is for
+
+        Returns:
+            Cache key, or None if the model cannot be memoized
+        """
+        version, edges = self._bind(model)
+        if edges is None:
+            return None
+        # Trees compare float32 inputs against the thresholds
+        values = np.asarray(row, dtype=np.float32).reshape(-1)
+        if len(values) != len(edges) or not np.isfinite(values).all():
+            return None
+        bins = [np.searchsorted(edges[f], values[f], side='left') for f in range(len(edges))]
+        # The version keeps labels from a replaced model from ever being served
+        return version, np.array(bins, dtype=np.int32).tobytes()
+
+    def get(self, key: Optional[Tuple[str, bytes]]) -> Optional[str]:
+        """Return the cached label for key, if any."""
+        if key is None:
+            return None
+        return self._cache.get(key)
+
+    def set(self, key: Optional[Tuple[str, bytes]], label: str) -> None:
+        """Store a predicted label."""
+        if key is not None:
+            self._cache.set(key, label)
+
+    def clear(self) -> None:
+        """Drop all cached predictions."""
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        """Return size, hit rate and the model version the cache is bound to."""
+        return {
+            **self._cache.stats(),
+            "model_version": self._version,
+            "invalidations": self.invalidations
+        }
+
+
+def build_prediction_cache(config: Optional[Settings] = None) -> PredictionCache:
+    """Build a PredictionCache from settings."""
+    config = config or settings
+    return PredictionCache(maxsize=config.PREDICTION_CACHE_SIZE)
+
+
+# Default prediction cache built from the global settings
+prediction_cache = build_prediction_cache()
@@ -3,128 +3,347 @@ Data preprocessing utilities for ScanLabel AI.
 Handles data cleaning and feature extraction.
 """
 
-import pandas as pd
+from itertools import compress
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, Set
 import numpy as np
-from typing import Dict, Optional
+from config import settings, Settings
+from utils.scoring import FEATURE_ORDER, HEALTH_LABELS, NutritionScorer, scorer
 
+if TYPE_CHECKING:
+    # pandas is only needed by the training helpers; keep it off the API's import path
+    import pandas as pd
 
-def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
+# Rows labeled per vectorized pass; bounds the temporary boolean masks on huge dumps
+DEFAULT_LABEL_CHUNK_SIZE = 1_000_000
+
+# Nutrition values are stored as float32; ample precision for grams per 100g, and
+# the forest casts its input to float32 anyway, so training results do not change
+FEATURE_DTYPE = np.float32
+
+# Physical bounds per 100 g: no nutrient weighs more than the 100 g it is part of,
+# and nothing is more energy-dense than pure fat (9 kcal/g). The tolerance absorbs
+# rounding and kJ -> kcal conversion (e.g. oils listed as 3766 kJ = 900.1 kcal).
+MAX_GRAMS_PER_100G = 100.0
+MAX_ENERGY_KCAL_100G = 900.0
+BOUND_TOLERANCE = 0.01
+
+# Cleaning rules in the order they are applied; a row is counted under the first it fails
+CLEANING_RULES = ('missing', 'negative', 'over_100g', 'energy_over_900kcal', 'duplicate_barcode')
+
+BARCODE_COLUMN = 'code'
+
+# Open Food Facts nutriment keys that may carry a product's energy
+ENERGY_KEYS = ('energy-kcal_100g', 'energy-kj_100g', 'energy_100g')
+# Nutriment keys copied as they are (energy is converted separately)
+NUTRIENT_KEYS = tuple(name for name in FEATURE_ORDER if name != 'energy_100g')
+
+# Label strings as Python objects, so indexing by code yields an object column like before
+_LABEL_OBJECTS = HEALTH_LABELS.astype(object)
+
+
+def _frame(columns: Dict, index) -> "pd.DataFrame":
+    """DataFrame over existing column arrays; copy=False keeps them unconsolidated and uncopied."""
+    import pandas as pd
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def compact_nutrition(df: "pd.DataFrame", dtype=FEATURE_DTYPE) -> "pd.DataFrame":
     """
-    Clean the Open Food Facts dataset by removing rows with missing nutrition data.
+    Convert the nutrition columns of df to dtype in place, one column at a time.
     
     Args:
-        df: Raw DataFrame from Open Food Facts CSV
+        df: DataFrame with nutrition columns (others are left alone)
+        dtype: Target dtype
+        
+    Returns:
+        df itself
+    """
+    for name in FEATURE_ORDER:
+        if name in df.columns and df[name].dtype != dtype:
+            df[name] = df[name].astype(dtype)
+    return df
+
+
+def normalize_barcodes(codes) -> np.ndarray:
+    """
+    Normalize barcodes so the same product compares equal.
+    
+    Whitespace and leading zeros are dropped, so an EAN-13 matches the UPC-A
+    or zero-padded form of the same code.
+    
+    Args:
+        codes: Barcodes as strings, bytes or numbers; missing values allowed
         
     Returns:
-        Cleaned DataFrame with only rows containing complete nutrition information
-    """
-    # Required nutrition columns
-    required_cols = [
-        'energy_100g',
-        'fat_100g',
-        'sugars_100g',
-        'salt_100g',
-        'fiber_100g',
-        'proteins_100g'
+        Object array of normalized strings ('' for missing barcodes)
+    """
+    codes = np.asarray(codes)
+    if codes.dtype.kind == 'S':
+        codes = np.char.decode(codes, 'utf-8')
+    # One Python-level pass; the pandas .str methods would take one pass per method
+    normalized = np.empty(len(codes), dtype=object)
+    normalized[:] = [
+        (code if isinstance(code, str) else '' if _is_missing(code) else str(code)).strip().lstrip('0')
+        for code in codes.tolist()
     ]
+    return normalized
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class BarcodeDeduplicator:
+    """
+    Remembers 64-bit hashes of normalized barcodes to find repeats across chunks.
+    
+    Memory grows with the number of distinct barcodes (about 70 bytes each);
+    time is linear in the rows checked.
+    """
+    
+    def __init__(self):
+        self._seen: Set[int] = set()
+    
+    def __len__(self) -> int:
+        return len(self._seen)
+    
+    def first_seen(self, codes) -> np.ndarray:
+        """
+        Mark rows whose barcode was not seen before, in this batch or earlier ones.
+        
+        Rows without a barcode are always kept.
+        
+        Args:
+            codes: Barcodes of the rows
+            
+        Returns:
+            Boolean array, True for the first occurrence of each barcode
+        """
+        import pandas as pd
+        
+        normalized = normalize_barcodes(codes)
+        keep = normalized == ''
+        has_code = ~keep
+        hashes = pd.util.hash_array(normalized[has_code], categorize=False)
+        # Repeats within the batch in one hashed pass, then the survivors against earlier batches
+        unique = ~pd.Series(hashes, copy=False).duplicated().to_numpy()
+        candidates = hashes[unique].tolist()
+        new = np.fromiter(map(self._seen.__contains__, candidates), dtype=bool, count=len(candidates))
+        np.logical_not(new, out=new)
+        self._seen.update(compress(candidates, new))
+        unique[unique] = new
+        keep[has_code] = unique
+        return keep
+
+
+def clean_dataset(
+    df: "pd.DataFrame",
+    inplace: bool = False,
+    dtype=FEATURE_DTYPE,
+    deduplicate: bool = True,
+    deduplicator: Optional[BarcodeDeduplicator] = None,
+    report: Optional[Dict[str, int]] = None
+) -> "pd.DataFrame":
+    """
+    Clean the Open Food Facts dataset.
+    
+    Rows are removed when a nutrition value is missing, negative, above
+    100 g per 100 g, or the energy is above 900 kcal (see CLEANING_RULES), and
+    when their normalized barcode was already seen. Every rule is one
+    vectorized pass, so the cost is linear in the rows.
+    
+    The validity mask is built column by column and only the kept rows are
+    copied, each column straight into dtype, so the peak is the input plus the
+    compact result.
+    
+    Args:
+        df: Raw DataFrame from Open Food Facts CSV
+        inplace: Reuse df when no row is dropped, converting its nutrition
+            columns in place (rows can only be dropped into a new frame)
+        dtype: dtype of the nutrition columns in the result (None keeps them)
+        deduplicate: Drop repeated barcodes (needs a 'code' column), keeping the first
+        deduplicator: Barcodes seen in earlier chunks (default: only this frame)
+        report: Rule -> removed rows; this call's counts are added to it
+        
+    Returns:
+        Cleaned DataFrame with only rows containing complete, plausible nutrition information
+    """
+    import pandas as pd
+    
+    valid = np.ones(len(df), dtype=bool)
+    removed = {}
+    
+    def apply_rule(rule: str, ok: np.ndarray) -> None:
+        removed[rule] = int(np.count_nonzero(valid & ~ok))
+        np.logical_and(valid, ok, out=valid)
     
     # Remove rows where any required nutrition column is missing or NaN
-    df_clean = df[required_cols].dropna()
+    ok = np.ones(len(df), dtype=bool)
+    for name in FEATURE_ORDER:
+        ok &= pd.notna(df[name].to_numpy())
+    apply_rule('missing', ok)
     
-    # Get indices of valid rows
-    valid_indices = df_clean.index
+    values = {name: _float_values(df[name]) for name in FEATURE_ORDER}
+    with np.errstate(invalid='ignore'):
+        ok = np.ones(len(df), dtype=bool)
+        for name in FEATURE_ORDER:
+            ok &= values[name] >= 0
+        apply_rule('negative', ok)
+        
+        ok = np.ones(len(df), dtype=bool)
+        for name in FEATURE_ORDER:
+            if name != 'energy_100g':
+                ok &= values[name] <= MAX_GRAMS_PER_100G * (1 + BOUND_TOLERANCE)
+        apply_rule('over_100g', ok)
+        apply_rule('energy_over_900kcal', values['energy_100g'] <= MAX_ENERGY_KCAL_100G * (1 + BOUND_TOLERANCE))
+    del values
+    
+    # Deduplicate last, so an invalid row never hides a valid copy of the product
+    ok = np.ones(len(df), dtype=bool)
+    if deduplicate and BARCODE_COLUMN in df.columns:
+        deduplicator = deduplicator if deduplicator is not None else BarcodeDeduplicator()
+        rows = np.flatnonzero(valid)
+        ok[rows] = deduplicator.first_seen(df[BARCODE_COLUMN].to_numpy()[rows])
+    apply_rule('duplicate_barcode', ok)
+    
+    if report is not None:
+        for rule, count in removed.items():
+            report[rule] = report.get(rule, 0) + count
     
-    # Return full dataframe with only valid rows
-    return df.loc[valid_indices].copy()
+    if inplace and valid.all():
+        return df if dtype is None else compact_nutrition(df, dtype)
+    
+    rows = np.flatnonzero(valid)
+    columns = {}
+    for name in df.columns:
+        column = df[name].iloc[rows]
+        if dtype is not None and name in FEATURE_ORDER:
+            column = column.astype(dtype)
+        columns[name] = column.array
+    return _frame(columns, df.index[rows])
 
 
-def create_health_label(df: pd.DataFrame) -> pd.DataFrame:
+def create_health_label(
+    df: "pd.DataFrame",
+    config: Optional[Settings] = None,
+    chunk_size: Optional[int] = DEFAULT_LABEL_CHUNK_SIZE,
+    inplace: bool = False,
+    categorical: bool = False
+) -> "pd.DataFrame":
     """
     Create health_label column based on nutrition thresholds.
     
-    Health classification:
+    Health classification (thresholds from config.Settings):
     - Healthy: low sugar (<5g), low fat (<3g), low salt (<0.3g)
     - Moderate: medium values
     - Unhealthy: high sugar (>=10g) OR high fat (>=10g) OR high salt (>=1g)
     
+    Missing sugar, fat or salt columns count as 0; NaN values count as Moderate.
+    
     Args:
         df: DataFrame with nutrition columns
+        config: Settings with the thresholds (default: global settings)
+        chunk_size: Rows classified per pass, bounding temporary memory (None for one pass)
+        inplace: Add the column to df itself
+        categorical: Store labels as a categorical over HEALTH_LABELS (one byte
+            per row) instead of strings
         
     Returns:
-        DataFrame with added 'health_label' column
+        DataFrame with added 'health_label' column; without inplace, a new
+        frame sharing the other columns' data with df
     """
-    df = df.copy()
+    import pandas as pd
     
-    # Define thresholds
-    SUGAR_HEALTHY = 5.0  # grams per 100g
-    SUGAR_UNHEALTHY = 10.0
-    FAT_HEALTHY = 3.0
-    FAT_UNHEALTHY = 10.0
-    SALT_HEALTHY = 0.3  # grams per 100g
-    SALT_UNHEALTHY = 1.0
-    
-    # Initialize health labels
-    health_labels = []
+    codes = health_label_codes(df, config, chunk_size)
+    labels = pd.Categorical.from_codes(codes, categories=HEALTH_LABELS) if categorical else _LABEL_OBJECTS[codes]
+    if not inplace:
+        # Shallow copy: adding a column to it leaves df unchanged
+        df = df.copy(deep=False)
+    df['health_label'] = labels
+    return df
+
+
+def health_label_codes(
+    df: "pd.DataFrame",
+    config: Optional[Settings] = None,
+    chunk_size: Optional[int] = DEFAULT_LABEL_CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Classify every row with the threshold rules, vectorized over numpy columns.
     
-    for idx, row in df.iterrows():
-        sugar = row.get('sugars_100g', 0)
-        fat = row.get('fat_100g', 0)
-        salt = row.get('salt_100g', 0)
-        
-        # Check for unhealthy conditions (high values)
-        is_unhealthy = (
-            sugar >= SUGAR_UNHEALTHY or
-            fat >= FAT_UNHEALTHY or
-            salt >= SALT_UNHEALTHY
-        )
+    Args:
+        df: DataFrame with nutrition columns
+        config: Settings with the thresholds (default: global settings)
+        chunk_size: Rows classified per pass (None for one pass)
         
-        # Check for healthy conditions (low values)
-        is_healthy = (
-            sugar < SUGAR_HEALTHY and
-            fat < FAT_HEALTHY and
-            salt < SALT_HEALTHY
-        )
+    Returns:
+        int8 array of label codes indexing utils.scoring.HEALTH_LABELS
+    """
+    rules = scorer if config is None or config is settings else NutritionScorer(config)
+    n_rows = len(df)
+    columns = [_float_values(df[name]) if name in df.columns else None for name in ('sugars_100g', 'fat_100g', 'salt_100g')]
+    
+    step = chunk_size if chunk_size and chunk_size > 0 else max(n_rows, 1)
+    codes = np.empty(n_rows, dtype=np.int8)
+    for start in range(0, n_rows, step):
+        stop = min(start + step, n_rows)
+        # Compared in float64 per chunk, so float32 columns label exactly like float64 ones
+        codes[start:stop] = rules.classify(*(
+            np.zeros(stop - start) if column is None else column[start:stop].astype(np.float64)
+            for column in columns
+        ))
+    return codes
+
+
+def _float_values(series: "pd.Series") -> np.ndarray:
+    """Column values as a float numpy array (no copy for float columns), missing values as NaN."""
+    if series.dtype.kind == 'f':
+        return series.to_numpy()
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def label_chunks(
+    chunks: Iterable["pd.DataFrame"],
+    config: Optional[Settings] = None
+) -> Iterator["pd.DataFrame"]:
+    """
+    Label a dataset that arrives in chunks (e.g. pd.read_csv(..., chunksize=N)).
+    
+    Args:
+        chunks: DataFrames with nutrition columns
+        config: Settings with the thresholds (default: global settings)
         
-        # Assign label
-        if is_unhealthy:
-            health_labels.append('Unhealthy')
-        elif is_healthy:
-            health_labels.append('Healthy')
-        else:
-            health_labels.append('Moderate')
-    
-    df['health_label'] = health_labels
-    return df
+    Yields:
+        Each chunk with an added 'health_label' column
+    """
+    for chunk in chunks:
+        yield create_health_label(chunk, config, chunk_size=None)
 
 
-def extract_features(df: pd.DataFrame) -> pd.DataFrame:
+def extract_features(df: "pd.DataFrame", copy: bool = True) -> "pd.DataFrame":
     """
     Extract feature columns for model training.
     
     Args:
         df: DataFrame with nutrition columns
+        copy: Copy the columns; False returns a frame sharing df's column
+            data, for read-only use such as splitting or fitting
         
     Returns:
         DataFrame with only feature columns
     """
-    feature_cols = [
-        'energy_100g',
-        'fat_100g',
-        'sugars_100g',
-        'salt_100g',
-        'fiber_100g',
-        'proteins_100g'
-    ]
-    
-    return df[feature_cols].copy()
+    columns = {name: df[name].to_numpy(copy=True) if copy else df[name].array for name in FEATURE_ORDER}
+    return _frame(columns, df.index)
 
 
-def preprocess_api_data(product_data: Dict) -> Optional[Dict]:
+def preprocess_api_data(product_data: Dict, missing: float = 0) -> Optional[Dict]:
     """
     Preprocess product data from Open Food Facts API to match model input format.
     
     Args:
         product_data: Raw product data from API response
+        missing: Value for nutrients the product does not report; live scans
+            use 0, training uses NaN so clean_dataset drops the row as 'missing'
         
     Returns:
         Dictionary with preprocessed nutrition data, or None if data is incomplete
@@ -142,16 +361,14 @@ def preprocess_api_data(product_data: Dict) -> Optional[Dict]:
     # Convert kJ to kcal if we only have kJ (1 kcal = 4.184 kJ)
     if energy_kcal == 0 and energy_kj > 0:
         energy_kcal = energy_kj / 4.184
+    elif energy_kcal == 0 and all(nutriments.get(key) in (None, '') for key in ENERGY_KEYS):
+        energy_kcal = missing
     
-    # Extract nutrition values (handle missing values, use 0 as default)
-    nutrition = {
-        'energy_100g': energy_kcal,
-        'fat_100g': nutriments.get('fat_100g') or 0,
-        'sugars_100g': nutriments.get('sugars_100g') or 0,
-        'salt_100g': nutriments.get('salt_100g') or 0,
-        'fiber_100g': nutriments.get('fiber_100g') or 0,
-        'proteins_100g': nutriments.get('proteins_100g') or 0
-    }
+    # Extract nutrition values; absent ones become `missing`
+    nutrition = {'energy_100g': energy_kcal}
+    for name in NUTRIENT_KEYS:
+        value = nutriments.get(name)
+        nutrition[name] = missing if value is None or value == '' else value
     
     # More lenient check: accept if we have at least ONE meaningful nutrition value
     # (not all zeros, and at least one value > 0)
@@ -0,0 +1,96 @@
+"""
+Process memory statistics for ScanLabel AI.
+Reads /proc on Linux; returns empty results elsewhere.
+"""
+
+import os
+from typing import Dict, Optional, Union
+
+
+def read_memory(pid: Union[int, str] = "self") -> Dict[str, int]:
+    """
+    Read memory usage of a process in kB.
+
+    Args:
+        pid: Process id, or "self" for the current process
+
+    Returns:
+        Dictionary with:
+        - 'rss_kb': resident set size
+        - 'pss_kb': proportional set size (shared pages split between sharers)
+        - 'uss_kb': unique set size (private pages only; what the process really adds)
+        - 'shared_kb': resident pages shared with other processes
+        Empty if /proc is not available.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "uss_kb": private,
+        "shared_kb": shared
+    }
+
+
+def process_age(pid: Union[int, str] = "self") -> Optional[float]:
+    """
+    Seconds since a process was started.
+
+    Args:
+        pid: Process id, or "self" for the current process
+
+    Returns:
+        Age in seconds, or None if /proc is not available
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # Fields after the command name (which may contain spaces); starttime is field 22
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+
+
+def read_peak_rss() -> Optional[int]:
+    """
+    Peak resident set size of this process in kB (VmHWM), since start or
+    the last reset_peak_rss().
+
+    Returns:
+        Peak RSS in kB, or None if /proc is not available
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset this process's peak RSS to its current RSS (Linux 4.0+).
+
+    Returns:
+        True if the peak was reset
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,131 @@
+"""
+Per-stage profiling of the training pipeline.
+
+Each stage records wall time, CPU time and peak memory: the process's peak
+RSS (reset at the start of every stage on Linux) and, optionally, the
+tracemalloc peak of Python-level allocations. Stages may be nested; an
+outer stage's peak includes its children. The whole run can also be
+captured with cProfile.
+"""
+
+import cProfile
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from utils.logger import logger
+from utils.process_memory import read_peak_rss, reset_peak_rss
+
+
+class PipelineProfiler:
+    """
+    Records stage timings and peak memory.
+
+    With enabled=False, stage() does nothing, so pipeline code can use a
+    profiler unconditionally.
+    """
+
+    def __init__(self, enabled: bool = True, trace_python_memory: bool = False, cprofile: bool = False):
+        self.enabled = enabled
+        self.trace_python_memory = trace_python_memory and enabled
+        self.stages: List[Dict] = []
+        self._stack: List[Dict] = []
+        self._profile = cProfile.Profile() if cprofile and enabled else None
+        self._started = time.perf_counter()
+        self._owns_tracemalloc = self.trace_python_memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        if self._profile is not None:
+            self._profile.enable()
+
+    def _fold_peaks_into_parent(self) -> None:
+        # A child resets the peaks, so the parent keeps what it had seen so far
+        if not self._stack:
+            return
+        parent = self._stack[-1]
+        rss = read_peak_rss()
+        if rss is not None:
+            parent["peak_rss_kb"] = max(parent["peak_rss_kb"] or 0, rss)
+        if self.trace_python_memory:
+            parent["peak_traced_kb"] = max(parent["peak_traced_kb"] or 0, tracemalloc.get_traced_memory()[1] // 1024)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile a pipeline stage.
+
+        Args:
+            name: Stage name; nested stages are reported as "outer/inner"
+        """
+        if not self.enabled:
+            yield
+            return
+
+        self._fold_peaks_into_parent()
+        path = "/".join([entry["stage"] for entry in self._stack] + [name])
+        entry = {"stage": name, "path": path, "peak_rss_kb": None, "peak_traced_kb": None}
+        self._stack.append(entry)
+        entry["peak_rss_reset"] = reset_peak_rss()
+        if self.trace_python_memory:
+            tracemalloc.reset_peak()
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_started
+            cpu = time.process_time() - cpu_started
+            rss = read_peak_rss()
+            if rss is not None:
+                entry["peak_rss_kb"] = max(entry["peak_rss_kb"] or 0, rss)
+            if self.trace_python_memory:
+                entry["peak_traced_kb"] = max(entry["peak_traced_kb"] or 0, tracemalloc.get_traced_memory()[1] // 1024)
+            self._stack.pop()
+            if self._stack:
+                parent = self._stack[-1]
+                for key in ("peak_rss_kb", "peak_traced_kb"):
+                    if entry[key] is not None:
+                        parent[key] = max(parent[key] or 0, entry[key])
+
+            entry.update(wall_s=round(wall, 4), cpu_s=round(cpu, 4))
+            self.stages.append(entry)
+            logger.info(
+                f"[profile] {path}: wall {wall:.2f}s, cpu {cpu:.2f}s, "
+                f"peak RSS {(entry['peak_rss_kb'] or 0) / 1024:.0f} MB"
+            )
+
+    def report(self) -> Dict:
+        """Stage measurements (in completion order) and run totals."""
+        return {
+            "total_wall_s": round(time.perf_counter() - self._started, 4),
+            "environment": {
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "system": platform.system()
+            },
+            "peak_rss_scope": "stage" if any(s.get("peak_rss_reset") for s in self.stages) else "process",
+            "stages": self.stages
+        }
+
+    def write(self, report_path: str, profile_path: Optional[str] = None) -> None:
+        """
+        Write the JSON report and, if cProfile was enabled, the profile dump.
+
+        Args:
+            report_path: JSON report file
+            profile_path: cProfile output file (readable with pstats or snakeviz)
+        """
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info(f"Profile report saved to {report_path}")
+        if self._profile is not None and profile_path:
+            self._profile.disable()
+            self._profile.dump_stats(profile_path)
+            logger.info(f"cProfile stats saved to {profile_path}")
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+            self.trace_python_memory = False
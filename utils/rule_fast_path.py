@@ -0,0 +1,133 @@
+"""
+Rule-first prediction for ScanLabel AI.
+
+The model was trained on labels produced by the threshold rules, so for
+products clearly under every healthy threshold or clearly over an unhealthy
+one the rules already give the answer. Those are resolved without the model;
+only the ambiguous band near the thresholds is sent to it. Agreement between
+rules and model is tracked on the ambiguous rows and on a sample of the
+decisive ones.
+"""
+
+import random
+import threading
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+from config import settings, Settings
+from utils.scoring import FEATURE_ORDER, HEALTH_LABELS, UNDECIDED, NutritionScorer, scorer
+
+_SUGAR = FEATURE_ORDER.index('sugars_100g')
+_FAT = FEATURE_ORDER.index('fat_100g')
+_SALT = FEATURE_ORDER.index('salt_100g')
+
+# Which step produced a label: the threshold rules or the model
+LABEL_SOURCE_RULES = 'rules'
+LABEL_SOURCE_MODEL = 'model'
+
+
+class RuleFastPath:
+    """
+    Resolves decisive products with the threshold rules.
+
+    A fraction (sample_rate) of decisive products is also run through the
+    model to measure how often the two agree.
+    """
+
+    def __init__(self, scorer: NutritionScorer, margin: float, sample_rate: float = 0.01):
+        self.scorer = scorer
+        self.margin = margin
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.decided = 0
+        self.ambiguous = 0
+        self.decisive_checked = 0
+        self.decisive_agreed = 0
+        self.ambiguous_agreed = 0
+
+    def decide(self, row: np.ndarray) -> Optional[str]:
+        """
+        Rule label for a feature row, or None if the row is in the ambiguous band.
+
+        Args:
+            row: Features in FEATURE_ORDER, shape (n_features,) or (1, n_features)
+        """
+        row = np.asarray(row).reshape(-1)
+        code = int(self.scorer.decisive(row[_SUGAR], row[_FAT], row[_SALT], self.margin))
+        return None if code == UNDECIDED else str(HEALTH_LABELS[code])
+
+    def predict(self, row: np.ndarray, model_predict: Callable[[], str]) -> str:
+        """
+        Predict one row, calling the model only when the rules are not decisive.
+
+        Args:
+            row: Features in FEATURE_ORDER
+            model_predict: Zero-argument callable returning the model's label
+
+        Returns:
+            Health label
+        """
+        return self.predict_with_source(row, model_predict)[0]
+
+    def predict_with_source(self, row: np.ndarray, model_predict: Callable[[], str]) -> Tuple[str, str]:
+        """
+        Like predict, but also tell whether the rules or the model gave the label.
+
+        Args:
+            row: Features in FEATURE_ORDER
+            model_predict: Zero-argument callable returning the model's label
+
+        Returns:
+            (health label, LABEL_SOURCE_RULES or LABEL_SOURCE_MODEL)
+        """
+        label = self.decide(row)
+        if label is not None:
+            with self._lock:
+                self.decided += 1
+                check = self.sample_rate > 0 and random.random() < self.sample_rate
+            if check:
+                try:
+                    agreed = model_predict() == label
+                except Exception:
+                    # The rule label stands; a failed check is just not counted
+                    return label, LABEL_SOURCE_RULES
+                with self._lock:
+                    self.decisive_checked += 1
+                    self.decisive_agreed += agreed
+            return label, LABEL_SOURCE_RULES
+
+        label = model_predict()
+        row = np.asarray(row).reshape(-1)
+        rule_label = HEALTH_LABELS[int(self.scorer.classify(row[_SUGAR], row[_FAT], row[_SALT]))]
+        with self._lock:
+            self.ambiguous += 1
+            self.ambiguous_agreed += label == rule_label
+        return label, LABEL_SOURCE_MODEL
+
+    def stats(self) -> Dict:
+        """Return the rule/model split and their agreement rates."""
+        total = self.decided + self.ambiguous
+        return {
+            "margin": self.margin,
+            "decided_by_rules": self.decided,
+            "sent_to_model": self.ambiguous,
+            "rule_share": round(self.decided / total, 4) if total else 0.0,
+            "decisive_checked": self.decisive_checked,
+            "decisive_agreement": round(self.decisive_agreed / self.decisive_checked, 4) if self.decisive_checked else None,
+            "ambiguous_agreement": round(self.ambiguous_agreed / self.ambiguous, 4) if self.ambiguous else None
+        }
+
+
+def build_rule_fast_path(config: Optional[Settings] = None) -> RuleFastPath:
+    """Build a RuleFastPath from settings."""
+    config = config or settings
+    return RuleFastPath(
+        scorer=scorer if config is settings else NutritionScorer(config),
+        margin=config.RULE_FAST_PATH_MARGIN,
+        sample_rate=config.RULE_AGREEMENT_SAMPLE_RATE
+    )
+
+
+# Default fast path built from the global settings
+rule_fast_path = build_rule_fast_path()
@@ -0,0 +1,153 @@
+"""
+Stratified reservoir sampling of training rows from a stream of chunks.
+
+Every row gets a uniform random key, and each class keeps the rows with the
+smallest keys seen so far; the smallest k keys of a class are a uniform
+sample of k of its rows. The keys come from one seeded generator in stream
+order, so the sample depends only on the seed and the data, not on the
+chunk size. Rows whose key cannot make it into a full class are skipped
+without being copied, and accepted rows are merged in batches, so the work
+is linear in the stream and memory is bounded by the sample size.
+"""
+
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from utils.scoring import HEALTH_LABELS
+
+_KEY = '_sample_key'
+
+
+def balanced_quotas(available: np.ndarray, size: int) -> np.ndarray:
+    """
+    Split size across classes as evenly as their row counts allow.
+
+    Classes with fewer rows than an even share give all they have, and the
+    rest is shared among the larger classes.
+
+    Args:
+        available: Rows available per class
+        size: Total sample size
+
+    Returns:
+        Rows to take per class
+    """
+    quotas = np.zeros(len(available), dtype=np.int64)
+    remaining = size
+    order = np.argsort(available, kind='stable')
+    for i, index in enumerate(order):
+        quotas[index] = min(available[index], remaining // (len(order) - i))
+        remaining -= quotas[index]
+    return quotas
+
+
+def _smallest_keys(codes: np.ndarray, keys: np.ndarray, limits: np.ndarray) -> np.ndarray:
+    """Positions (ascending) of the limits[c] smallest-key rows of every class c."""
+    order = np.lexsort((keys, codes))
+    sorted_codes = codes[order]
+    group_starts = np.searchsorted(sorted_codes, np.arange(len(limits)))
+    rank = np.arange(len(order)) - group_starts[sorted_codes]
+    return np.sort(order[rank < limits[sorted_codes]])
+
+
+class StratifiedReservoirSampler:
+    """
+    Keeps a class-balanced sample of at most size rows from a stream of labeled chunks.
+
+    Each class keeps up to size candidates, so a class that turns out to be
+    rare can be made up for by the others when the sample is taken.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        classes: Sequence[str] = HEALTH_LABELS,
+        label_column: str = 'health_label',
+        random_state: int = 42
+    ):
+        if size <= 0:
+            raise ValueError(f"Sample size must be positive, got {size}")
+        self.size = size
+        self.classes = list(classes)
+        self.label_column = label_column
+        self._rng = np.random.default_rng(random_state)
+        # A row can only enter its class with a key below the threshold (keys are in [0, 1))
+        self._thresholds = np.full(len(self.classes), 2.0)
+        self._sample: Optional[pd.DataFrame] = None
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+
+        # Statistics
+        self.rows_seen = 0
+        self.class_counts = np.zeros(len(self.classes), dtype=np.int64)
+
+    def _codes(self, labels) -> np.ndarray:
+        return pd.Categorical(labels, categories=self.classes).codes
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """
+        Offer a labeled chunk to the sample.
+
+        Args:
+            chunk: Rows with the label column; rows with other labels are ignored
+        """
+        keys = self._rng.random(len(chunk))
+        codes = self._codes(chunk[self.label_column])
+        known = codes >= 0
+        self.class_counts += np.bincount(codes[known], minlength=len(self.classes))
+
+        accepted = np.flatnonzero(known & (keys < self._thresholds[np.maximum(codes, 0)]))
+        if len(accepted):
+            candidates = chunk.iloc[accepted].copy()
+            candidates[_KEY] = keys[accepted]
+            self._pending.append(candidates)
+            self._pending_rows += len(accepted)
+        self.rows_seen += len(chunk)
+
+        # Merging costs O(sample); waiting for as many pending rows keeps the total linear
+        if self._pending_rows >= max(self.size, 10_000):
+            self._merge()
+
+    def _merge(self) -> None:
+        if not self._pending:
+            return
+        # Kept rows come first and stay in stream order, so the sample does too
+        parts = ([self._sample] if self._sample is not None else []) + self._pending
+        combined = pd.concat(parts, ignore_index=True)
+        self._pending, self._pending_rows = [], 0
+
+        codes = self._codes(combined[self.label_column])
+        keys = combined[_KEY].to_numpy()
+        keep = _smallest_keys(codes, keys, np.full(len(self.classes), self.size))
+        self._sample = combined.take(keep).reset_index(drop=True)
+
+        # A full class only accepts keys below its largest kept key
+        kept_codes, kept_keys = codes[keep], keys[keep]
+        for code in range(len(self.classes)):
+            class_keys = kept_keys[kept_codes == code]
+            if len(class_keys) >= self.size:
+                self._thresholds[code] = class_keys.max()
+
+    def sample(self) -> pd.DataFrame:
+        """
+        The class-balanced sample of the rows seen so far, in stream order.
+
+        Returns:
+            At most size rows with the input columns and a fresh index
+        """
+        self._merge()
+        if self._sample is None:
+            return pd.DataFrame(columns=[self.label_column])
+
+        codes = self._codes(self._sample[self.label_column])
+        keys = self._sample[_KEY].to_numpy()
+        available = np.bincount(codes, minlength=len(self.classes))
+        keep = _smallest_keys(codes, keys, balanced_quotas(available, self.size))
+        return self._sample.take(keep).drop(columns=[_KEY]).reset_index(drop=True)
+
+    def stats(self) -> Dict:
+        """Rows seen per class."""
+        return {
+            "rows_seen": self.rows_seen,
+            "class_counts": dict(zip(self.classes, self.class_counts.tolist()))
+        }
@@ -0,0 +1,127 @@
+"""
+Collection of scanned products for incremental training.
+
+Each product scanned through the API is appended once (per process) to a
+JSONL file in the Open Food Facts dump layout, so the training data readers
+in utils.dataset can load it like any other dump. Labels are not stored;
+they are derived from the thresholds when the samples are used.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config import settings, Settings
+from utils.logger import logger
+from utils.scoring import FEATURE_ORDER
+
+
+class ScanSampleStore:
+    """
+    Buffers scanned products and appends them to a JSONL file.
+
+    Writes happen in batches of flush_every lines with a single append, so
+    worker processes sharing the file do not interleave partial lines.
+    Barcodes already recorded by this process (up to remember entries) are
+    skipped.
+    """
+
+    def __init__(self, path: Optional[str], flush_every: int = 64, remember: int = 100_000):
+        self.path = path
+        self.flush_every = flush_every
+        self.remember = remember
+        self._pending: List[str] = []
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.recorded = 0
+        self.duplicates = 0
+        self.written = 0
+        self.write_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(self, barcode: str, nutrition_data: Dict) -> bool:
+        """
+        Remember a scanned product for training.
+
+        Args:
+            barcode: Product barcode
+            nutrition_data: Preprocessed nutrition values (preprocess_api_data output)
+
+        Returns:
+            True if the product was queued for writing
+        """
+        if not self.enabled or not barcode:
+            return False
+        barcode = barcode.strip()
+        # energy_100g is already in kcal; store it under the dump's kcal key
+        nutriments = {
+            ('energy-kcal_100g' if name == 'energy_100g' else name): float(nutrition_data.get(name) or 0)
+            for name in FEATURE_ORDER
+        }
+        line = json.dumps({"code": barcode, "nutriments": nutriments}) + "\n"
+
+        with self._lock:
+            if barcode in self._seen:
+                self._seen.move_to_end(barcode)
+                self.duplicates += 1
+                return False
+            self._seen[barcode] = None
+            if len(self._seen) > self.remember:
+                self._seen.popitem(last=False)
+            self._pending.append(line)
+            self.recorded += 1
+            if len(self._pending) < self.flush_every:
+                return True
+            lines, self._pending = self._pending, []
+        self._write(lines)
+        return True
+
+    def flush(self) -> None:
+        """Write any buffered products."""
+        with self._lock:
+            lines, self._pending = self._pending, []
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines: List[str]) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Unbuffered: one append per batch, so concurrent writers never split a line
+            with open(self.path, "ab", buffering=0) as f:
+                f.write("".join(lines).encode("utf-8"))
+            with self._lock:
+                self.written += len(lines)
+        except OSError as e:
+            with self._lock:
+                self.write_errors += 1
+            logger.error(f"Could not write scan samples to {self.path}: {e}")
+
+    def stats(self) -> Dict:
+        """Return collection counters."""
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "recorded": self.recorded,
+            "duplicates": self.duplicates,
+            "written": self.written,
+            "pending": len(self._pending),
+            "write_errors": self.write_errors
+        }
+
+
+def build_scan_sample_store(config: Optional[Settings] = None) -> ScanSampleStore:
+    """Build a ScanSampleStore from settings."""
+    config = config or settings
+    return ScanSampleStore(path=config.SCAN_SAMPLES_PATH)
+
+
+# Default store built from the global settings
+scan_samples = build_scan_sample_store()
@@ -0,0 +1,412 @@
+"""
+Nutrition scoring engine for ScanLabel AI.
+Compiles the health thresholds from settings once and scores a whole batch
+of products in a single vectorized pass. A single product is scored with
+plain float comparisons against the same thresholds, which is far cheaper
+than numpy's per-call overhead on one row.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Union
+from config import settings, Settings
+
+
+# Feature order shared with the trained model
+FEATURE_ORDER = [
+    'energy_100g',
+    'fat_100g',
+    'sugars_100g',
+    'salt_100g',
+    'fiber_100g',
+    'proteins_100g'
+]
+
+# Health labels, indexed by label code
+HEALTH_LABELS = np.array(['Healthy', 'Moderate', 'Unhealthy'])
+HEALTHY, MODERATE, UNHEALTHY = 0, 1, 2
+# Code for products the rules cannot decide with confidence
+UNDECIDED = -1
+
+# Daily recommended values (for adults), in FEATURE_ORDER
+DAILY_VALUES = {
+    'energy': 2000.0,  # kcal
+    'fat': 70.0,       # g
+    'sugar': 50.0,     # g
+    'salt': 6.0,       # g
+    'fiber': 30.0,     # g
+    'protein': 50.0    # g
+}
+
+# "Very high" levels used for warnings (per 100g)
+SUGAR_VERY_HIGH = 22.5
+FAT_VERY_HIGH = 17.5
+SALT_VERY_HIGH = 1.5
+
+# Fiber and protein levels used for insights (per 100g)
+FIBER_HIGH = 6.0
+FIBER_LOW = 3.0
+PROTEIN_HIGH = 10.0
+PROTEIN_LOW = 3.0
+
+# Insight columns in the insight code matrix
+INSIGHT_NUTRIENTS = ['sugar', 'fat', 'salt', 'fiber', 'protein']
+
+# Insight levels per column; 0 always means "no insight"
+INSIGHT_NONE, INSIGHT_VERY_HIGH, INSIGHT_HIGH, INSIGHT_LOW = 0, 1, 2, 3
+
+# (insight type, text template) for every nutrient and level
+INSIGHT_TEMPLATES = {
+    ('sugar', INSIGHT_VERY_HIGH): ("warning", "Very high sugar ({value:.1f}g) - exceeds daily limit in small portions"),
+    ('sugar', INSIGHT_HIGH): ("caution", "High sugar content ({value:.1f}g) - consume in moderation"),
+    ('sugar', INSIGHT_LOW): ("positive", "Low sugar content ({value:.1f}g) - good choice"),
+    ('fat', INSIGHT_VERY_HIGH): ("warning", "Very high fat ({value:.1f}g) - limit consumption"),
+    ('fat', INSIGHT_HIGH): ("caution", "High fat content ({value:.1f}g)"),
+    ('fat', INSIGHT_LOW): ("positive", "Low fat content ({value:.1f}g)"),
+    ('salt', INSIGHT_VERY_HIGH): ("warning", "Very high salt ({value:.2f}g) - may increase blood pressure"),
+    ('salt', INSIGHT_HIGH): ("caution", "High salt content ({value:.2f}g)"),
+    ('salt', INSIGHT_LOW): ("positive", "Low salt content ({value:.2f}g)"),
+    ('fiber', INSIGHT_HIGH): ("positive", "High fiber ({value:.1f}g) - supports digestion"),
+    ('fiber', INSIGHT_LOW): ("info", "Low fiber ({value:.1f}g) - consider adding fiber-rich foods"),
+    ('protein', INSIGHT_HIGH): ("positive", "Good protein content ({value:.1f}g) - supports muscle health"),
+    ('protein', INSIGHT_LOW): ("info", "Low protein ({value:.1f}g)"),
+}
+
+# Short nutrient names, aligned with FEATURE_ORDER
+NUTRIENT_NAMES = ['energy', 'fat', 'sugar', 'salt', 'fiber', 'protein']
+
+_INSIGHT_LEVEL_NAMES = {
+    INSIGHT_VERY_HIGH: 'very_high',
+    INSIGHT_HIGH: 'high',
+    INSIGHT_LOW: 'low'
+}
+_INSIGHT_LEVEL_CODES = {name: level for level, name in _INSIGHT_LEVEL_NAMES.items()}
+
+# Label strings by label code, for the scalar path
+_LABEL_NAMES = tuple(str(label) for label in HEALTH_LABELS)
+
+
+def nutrition_to_array(nutrition_data: Dict) -> np.ndarray:
+    """
+    Convert a nutrition dictionary into a feature row in FEATURE_ORDER.
+
+    Args:
+        nutrition_data: Dictionary with nutrition values (missing values count as 0)
+
+    Returns:
+        1-D float64 array of length 6
+    """
+    return np.array(
+        [nutrition_data.get(col, 0) or 0 for col in FEATURE_ORDER],
+        dtype=np.float64
+    )
+
+
+class NutritionScorer:
+    """
+    Rule-based health classification, nutrition score, daily values and
+    insights, compiled once from a Settings instance.
+    """
+
+    def __init__(self, config: Optional[Settings] = None):
+        config = config or settings
+
+        self.sugar_healthy = config.SUGAR_HEALTHY_THRESHOLD
+        self.sugar_unhealthy = config.SUGAR_UNHEALTHY_THRESHOLD
+        self.fat_healthy = config.FAT_HEALTHY_THRESHOLD
+        self.fat_unhealthy = config.FAT_UNHEALTHY_THRESHOLD
+        self.salt_healthy = config.SALT_HEALTHY_THRESHOLD
+        self.salt_unhealthy = config.SALT_UNHEALTHY_THRESHOLD
+
+        self._col = {name: i for i, name in enumerate(NUTRIENT_NAMES)}
+
+        # Daily values laid out in FEATURE_ORDER so one division covers every nutrient
+        self._daily = np.array([DAILY_VALUES[name] for name in NUTRIENT_NAMES], dtype=np.float64)
+        self._daily_list = self._daily.tolist()
+
+        # Insight rules per nutrient: ordered (level, comparison, threshold), first match wins
+        self._insight_rules = {
+            'sugar': [(INSIGHT_VERY_HIGH, '>=', SUGAR_VERY_HIGH),
+                      (INSIGHT_HIGH, '>=', self.sugar_unhealthy),
+                      (INSIGHT_LOW, '<', self.sugar_healthy)],
+            'fat': [(INSIGHT_VERY_HIGH, '>=', FAT_VERY_HIGH),
+                    (INSIGHT_HIGH, '>=', self.fat_unhealthy),
+                    (INSIGHT_LOW, '<', self.fat_healthy)],
+            'salt': [(INSIGHT_VERY_HIGH, '>=', SALT_VERY_HIGH),
+                     (INSIGHT_HIGH, '>=', self.salt_unhealthy),
+                     (INSIGHT_LOW, '<', self.salt_healthy)],
+            'fiber': [(INSIGHT_HIGH, '>=', FIBER_HIGH),
+                      (INSIGHT_LOW, '<', FIBER_LOW)],
+            'protein': [(INSIGHT_HIGH, '>=', PROTEIN_HIGH),
+                        (INSIGHT_LOW, '<', PROTEIN_LOW)],
+        }
+        # The same rules as (name, column, [(level, is '>=', threshold)]) for the scalar path
+        self._scalar_insight_rules = [
+            (name, self._col[name], [(level, op == '>=', threshold) for level, op, threshold in self._insight_rules[name]])
+            for name in INSIGHT_NUTRIENTS
+        ]
+
+    def classify(self, sugar, fat, salt) -> np.ndarray:
+        """
+        Classify products with the threshold rules.
+
+        Unhealthy if any of sugar, fat or salt reaches its unhealthy threshold,
+        Healthy if all three are below their healthy threshold, else Moderate.
+        NaN values never satisfy a comparison, so they count toward Moderate.
+
+        Args:
+            sugar: Sugar values per 100g (scalar or array)
+            fat: Fat values per 100g (scalar or array)
+            salt: Salt values per 100g (scalar or array)
+
+        Returns:
+            Array of label codes (HEALTHY, MODERATE, UNHEALTHY)
+        """
+        sugar = np.asarray(sugar)
+        fat = np.asarray(fat)
+        salt = np.asarray(salt)
+
+        is_unhealthy = (
+            (sugar >= self.sugar_unhealthy) |
+            (fat >= self.fat_unhealthy) |
+            (salt >= self.salt_unhealthy)
+        )
+        is_healthy = (
+            (sugar < self.sugar_healthy) &
+            (fat < self.fat_healthy) &
+            (salt < self.salt_healthy)
+        )
+
+        codes = np.full(np.broadcast(sugar, fat, salt).shape, MODERATE, dtype=np.int8)
+        codes[is_healthy] = HEALTHY
+        codes[is_unhealthy] = UNHEALTHY
+        return codes
+
+    def decisive(self, sugar, fat, salt, margin: float = 0.0) -> np.ndarray:
+        """
+        Classify only the products the threshold rules settle with a margin.
+
+        Unhealthy if any of sugar, fat or salt is at least (1 + margin) times
+        its unhealthy threshold; Healthy if all three are below (1 - margin)
+        times their healthy threshold. Everything else, including NaN, is
+        UNDECIDED and left to the model.
+
+        Args:
+            sugar: Sugar values per 100g (scalar or array)
+            fat: Fat values per 100g (scalar or array)
+            salt: Salt values per 100g (scalar or array)
+            margin: Relative distance from the thresholds that counts as decisive
+
+        Returns:
+            Array of label codes (HEALTHY, UNHEALTHY or UNDECIDED)
+        """
+        sugar = np.asarray(sugar)
+        fat = np.asarray(fat)
+        salt = np.asarray(salt)
+        high = 1.0 + margin
+        low = 1.0 - margin
+
+        is_unhealthy = (
+            (sugar >= self.sugar_unhealthy * high) |
+            (fat >= self.fat_unhealthy * high) |
+            (salt >= self.salt_unhealthy * high)
+        )
+        is_healthy = (
+            (sugar < self.sugar_healthy * low) &
+            (fat < self.fat_healthy * low) &
+            (salt < self.salt_healthy * low)
+        )
+
+        codes = np.full(np.broadcast(sugar, fat, salt).shape, UNDECIDED, dtype=np.int8)
+        codes[is_healthy] = HEALTHY
+        codes[is_unhealthy] = UNHEALTHY
+        return codes
+
+    def score_batch(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of products in one vectorized pass.
+
+        Args:
+            features: Array of shape (n, 6) in FEATURE_ORDER
+
+        Returns:
+            Dictionary with:
+            - 'label_codes': (n,) rule-based label codes
+            - 'labels': (n,) rule-based label strings
+            - 'scores': (n,) unrounded nutrition scores (0-100)
+            - 'daily_values': (n, 6) daily value percentages in FEATURE_ORDER
+            - 'insight_codes': (n, 5) insight levels in INSIGHT_NUTRIENTS order
+        """
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        c = self._col
+        label_codes = self.classify(X[:, c['sugar']], X[:, c['fat']], X[:, c['salt']])
+
+        # Daily value percentages, capped at 100
+        dv = np.minimum(100.0, X / self._daily * 100.0)
+
+        # Health score (0-100): penalize sugar, fat and salt, reward fiber and protein
+        score = (
+            100.0
+            - np.minimum(30.0, dv[:, c['sugar']] * 0.3)
+            - np.minimum(25.0, dv[:, c['fat']] * 0.25)
+            - np.minimum(25.0, dv[:, c['salt']] * 0.25)
+            + np.minimum(10.0, dv[:, c['fiber']] * 0.1)
+            + np.minimum(10.0, dv[:, c['protein']] * 0.1)
+        )
+        score = np.clip(score, 0.0, 100.0)
+
+        insight_codes = np.zeros((X.shape[0], len(INSIGHT_NUTRIENTS)), dtype=np.int8)
+        for j, name in enumerate(INSIGHT_NUTRIENTS):
+            values = X[:, c[name]]
+            conditions = [
+                values >= threshold if op == '>=' else values < threshold
+                for _, op, threshold in self._insight_rules[name]
+            ]
+            levels = [level for level, _, _ in self._insight_rules[name]]
+            insight_codes[:, j] = np.select(conditions, levels, default=INSIGHT_NONE)
+
+        return {
+            'label_codes': label_codes,
+            'labels': HEALTH_LABELS[label_codes],
+            'scores': score,
+            'daily_values': dv,
+            'insight_codes': insight_codes
+        }
+
+    def score(self, nutrition_data: Union[Dict, Sequence[float], np.ndarray]) -> Dict:
+        """
+        Score a single product.
+
+        Args:
+            nutrition_data: Nutrition dictionary or a feature row in FEATURE_ORDER
+
+        Returns:
+            Dictionary with 'label', 'score', 'daily_values', 'insight_codes'
+            and the 'features' row the result was computed from
+        """
+        if isinstance(nutrition_data, dict):
+            row = nutrition_to_array(nutrition_data)
+        else:
+            row = np.asarray(nutrition_data, dtype=np.float64).ravel()
+
+        values = row.tolist()
+        # NaN compares unlike numpy in min(), so those rows (and malformed ones) take the batch path
+        if len(values) != len(FEATURE_ORDER) or any(value != value for value in values):
+            return self._score_vectorized(row)
+
+        energy, fat, sugar, salt, fiber, protein = values
+        if sugar >= self.sugar_unhealthy or fat >= self.fat_unhealthy or salt >= self.salt_unhealthy:
+            label_code = UNHEALTHY
+        elif sugar < self.sugar_healthy and fat < self.fat_healthy and salt < self.salt_healthy:
+            label_code = HEALTHY
+        else:
+            label_code = MODERATE
+
+        # Same operations, in the same order, as score_batch
+        dv = [min(100.0, value / daily * 100.0) for value, daily in zip(values, self._daily_list)]
+        score = (
+            100.0
+            - min(30.0, dv[2] * 0.3)
+            - min(25.0, dv[1] * 0.25)
+            - min(25.0, dv[3] * 0.25)
+            + min(10.0, dv[4] * 0.1)
+            + min(10.0, dv[5] * 0.1)
+        )
+        score = max(0.0, min(100.0, score))
+
+        insight_codes = []
+        for name, column, rules in self._scalar_insight_rules:
+            value = values[column]
+            for level, at_least, threshold in rules:
+                if (value >= threshold) if at_least else (value < threshold):
+                    insight_codes.append(f"{name}_{_INSIGHT_LEVEL_NAMES[level]}")
+                    break
+
+        return {
+            'label': _LABEL_NAMES[label_code],
+            'score': round(score, 1),
+            'daily_values': dict(zip(NUTRIENT_NAMES, dv)),
+            'insight_codes': insight_codes,
+            'features': row
+        }
+
+    def _score_vectorized(self, row: np.ndarray) -> Dict:
+        """Score one row through score_batch."""
+        batch = self.score_batch(row)
+        dv_row = batch['daily_values'][0]
+
+        return {
+            'label': str(batch['labels'][0]),
+            'score': round(float(batch['scores'][0]), 1),
+            'daily_values': {name: float(dv_row[i]) for i, name in enumerate(NUTRIENT_NAMES)},
+            'insight_codes': self.insight_names(batch['insight_codes'][0]),
+            'features': row
+        }
+
+    @staticmethod
+    def insight_names(codes: np.ndarray) -> List[str]:
+        """Convert one row of insight levels into codes like 'sugar_high'."""
+        return [
+            f"{name}_{_INSIGHT_LEVEL_NAMES[int(level)]}"
+            for name, level in zip(INSIGHT_NUTRIENTS, codes)
+            if level != INSIGHT_NONE
+        ]
+
+    def insights(self, result: Dict) -> List[Dict]:
+        """
+        Render the insight codes of a single-product result as display insights.
+
+        Args:
+            result: Output of score()
+
+        Returns:
+            List of {"type", "text"} dictionaries
+        """
+        row = result['features']
+        insights = []
+        for code in result['insight_codes']:
+            name, level = code.split('_', 1)
+            insight_type, template = INSIGHT_TEMPLATES[(name, _INSIGHT_LEVEL_CODES[level])]
+            value = row[self._col[name]]
+            insights.append({"type": insight_type, "text": template.format(value=value)})
+        return insights
+
+    def message(self, result: Dict, health_prediction: str, detected_items: List[str]) -> str:
+        """
+        Generate a human-readable health message for a single-product result.
+
+        Args:
+            result: Output of score()
+            health_prediction: Final health label (model or rules)
+            detected_items: List of detected allergens/additives
+
+        Returns:
+            Health message string
+        """
+        row = result['features']
+        codes = set(result['insight_codes'])
+        messages = []
+
+        if health_prediction == "Healthy":
+            messages.append("This product appears to be a healthy choice.")
+        elif health_prediction == "Moderate":
+            messages.append("This product has moderate nutritional value — consume in moderation.")
+        else:
+            messages.append("This product has high levels of sugar, fat, or salt — consume occasionally.")
+
+        # Add specific warnings for every nutrient at or above its unhealthy threshold
+        for name, label in (('sugar', 'sugar'), ('fat', 'fat'), ('salt', 'salt')):
+            if f"{name}_high" in codes or f"{name}_very_high" in codes:
+                value = row[self._col[name]]
+                messages.append(f"High {label} content ({value:.1f}g per 100g).")
+
+        if detected_items:
+            messages.append(f"Contains: {', '.join(detected_items[:5])}.")
+
+        return " ".join(messages)
+
+
+# Default engine built from the global settings
+scorer = NutritionScorer()
@@ -0,0 +1,264 @@
+"""
+Shadow evaluation of a candidate model on live traffic.
+
+A sampled fraction of scanned products is queued, together with the label
+the live model returned, to a background thread that runs the candidate
+model on them and records where the two disagree. The live request only
+pays for a random draw and a non-blocking queue put; when the queue is full
+the sample is dropped rather than waited for. Only products the live model
+labeled are shadowed; labels the threshold rules decided on their own say
+nothing about the live model and would skew the agreement figures.
+"""
+
+import collections
+import os
+import queue
+import random
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+from config import settings, Settings
+from utils.exceptions import ModelLoadError
+from utils.logger import logger
+from utils.model_registry import ModelVersion, model_version_id, source_mtime, validate_model
+from utils.predict import features_to_matrix, load_model, predict_health_batch
+from utils.rule_fast_path import LABEL_SOURCE_MODEL
+from utils.scoring import FEATURE_ORDER
+
+
+class ShadowEvaluator:
+    """
+    Runs a candidate model next to the live one and tracks disagreement.
+
+    The candidate is set with set_candidate(), or loaded from model_path by
+    the worker thread when the first sample arrives. Samples are predicted
+    in batches of up to batch_size rows.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        sample_rate: float = 0.1,
+        queue_size: int = 1000,
+        fast: bool = True,
+        batch_size: int = 64,
+        keep_recent: int = 20
+    ):
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.fast = fast
+        self.batch_size = batch_size
+
+        self._candidate: Optional[ModelVersion] = None
+        self._queue: "queue.Queue[Tuple[Dict, str, Optional[str]]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict] = collections.deque(maxlen=keep_recent)
+        self.last_error: Optional[str] = None
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.sampled = 0
+        self.dropped = 0
+        self.skipped_rules = 0
+        self.compared = 0
+        self.disagreements = 0
+        self.failed = 0
+        self.confusion: Dict[str, int] = {}
+        self._total_predict = 0.0
+        self._recent.clear()
+
+    @property
+    def candidate(self) -> Optional[ModelVersion]:
+        return self._candidate
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 and (self._candidate is not None or bool(self.model_path))
+
+    def set_candidate(self, path: str) -> ModelVersion:
+        """
+        Load and validate a candidate model and start shadowing it.
+
+        Statistics are reset so they describe only this candidate.
+
+        Raises:
+            ModelLoadError: If the file cannot be loaded or fails validation
+        """
+        started = time.perf_counter()
+        model = load_model(path, fast=self.fast)
+        load_ms = (time.perf_counter() - started) * 1000
+        if model is None:
+            raise ModelLoadError(f"Could not load shadow model from {path}")
+        try:
+            validate_model(model)
+        except Exception as e:
+            raise ModelLoadError(f"Shadow model {path} failed validation: {e}") from e
+
+        candidate = ModelVersion(model_version_id(model, path), model, path, source_mtime(path), load_ms)
+        with self._lock:
+            self._reset_counters()
+            self._candidate = candidate
+            self.model_path = path
+            self.last_error = None
+        logger.info(f"Shadowing candidate model {candidate.version} from {path}")
+        return candidate
+
+    def clear(self) -> None:
+        """Stop shadowing; queued samples are discarded by the worker."""
+        with self._lock:
+            self._candidate = None
+            self.model_path = None
+
+    def submit(
+        self,
+        nutrition_data: Dict,
+        live_label: str,
+        live_version: Optional[str] = None,
+        label_source: str = LABEL_SOURCE_MODEL
+    ) -> bool:
+        """
+        Maybe queue a live prediction for shadow evaluation. Never blocks.
+
+        Args:
+            nutrition_data: Nutrition values the live model predicted on
+            live_label: Label the live model returned
+            live_version: Live model version
+            label_source: What produced live_label; only model labels are queued
+
+        Returns:
+            True if the sample was queued
+        """
+        if not self.enabled:
+            return False
+        if label_source != LABEL_SOURCE_MODEL:
+            with self._lock:
+                self.skipped_rules += 1
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((nutrition_data, live_label, live_version))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.sampled += 1
+        return True
+
+    def _ensure_worker(self) -> None:
+        # Started lazily, and again after fork, since threads do not survive fork
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="scanlabel-shadow", daemon=True)
+            self._thread.start()
+
+    def _load_configured(self) -> Optional[ModelVersion]:
+        """Load the configured candidate on first use (in the worker thread)."""
+        path = self.model_path
+        if self._candidate is None and path:
+            try:
+                self.set_candidate(path)
+            except ModelLoadError as e:
+                logger.error(str(e))
+                with self._lock:
+                    self.last_error = str(e)
+                    self.model_path = None
+        return self._candidate
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.evaluate(items)
+            except Exception as e:
+                logger.error(f"Shadow evaluation error: {e}")
+
+    def evaluate(self, items: List[Tuple[Dict, str, Optional[str]]]) -> None:
+        """
+        Run the candidate on queued samples and record agreement.
+
+        Args:
+            items: (nutrition_data, live_label, live_version) tuples
+        """
+        candidate = self._load_configured()
+        if candidate is None:
+            return
+        started = time.perf_counter()
+        try:
+            X = features_to_matrix([item[0] for item in items])
+            labels = [str(label) for label in predict_health_batch(X, candidate.model)]
+        except Exception as e:
+            with self._lock:
+                self.failed += len(items)
+                self.last_error = str(e)
+            return
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            if self._candidate is not candidate:
+                # The candidate changed while predicting; these samples belong to the old one
+                return
+            self._total_predict += elapsed
+            for row, (_, live_label, live_version), label in zip(X, items, labels):
+                self.compared += 1
+                pair = f"{live_label}->{label}"
+                self.confusion[pair] = self.confusion.get(pair, 0) + 1
+                if label != live_label:
+                    self.disagreements += 1
+                    self._recent.append({
+                        "live": live_label,
+                        "live_version": live_version,
+                        "shadow": label,
+                        "features": {name: float(value) for name, value in zip(FEATURE_ORDER, row)}
+                    })
+
+    def stats(self) -> Dict:
+        """Candidate, sampling counters and agreement with the live model."""
+        candidate = self._candidate
+        return {
+            "enabled": self.enabled,
+            "candidate": candidate.describe() if candidate is not None else None,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "skipped_rules": self.skipped_rules,
+            "queued": self._queue.qsize(),
+            "compared": self.compared,
+            "disagreements": self.disagreements,
+            "disagreement_rate": round(self.disagreements / self.compared, 4) if self.compared else None,
+            "confusion": dict(self.confusion),
+            "failed": self.failed,
+            "avg_predict_ms": round(self._total_predict / self.compared * 1000, 4) if self.compared else 0.0,
+            "recent_disagreements": list(self._recent),
+            "last_error": self.last_error
+        }
+
+
+def build_shadow_evaluator(config: Optional[Settings] = None) -> ShadowEvaluator:
+    """Build a ShadowEvaluator from settings."""
+    config = config or settings
+    return ShadowEvaluator(
+        model_path=config.SHADOW_MODEL_PATH,
+        sample_rate=config.SHADOW_SAMPLE_RATE,
+        queue_size=config.SHADOW_QUEUE_SIZE,
+        fast=config.MODEL_FAST_INFERENCE
+    )
+
+
+# Default shadow evaluator built from the global settings
+shadow = build_shadow_evaluator()